@@ -0,0 +1,62 @@
+# Micro-benchmark of the OFCO label index (ofco_label_index.py)
+# Marc Hanauer @Orphanet 2025
+# Compares prefix / token / fuzzy lookups with a linear scan of the concept lines
+# (what grepping OFCO_thesaurus_ICF.csv does), and the q-gram pruned fuzzy search with the
+# banded DP run on every label of the length band
+# Usage: python benchmark_label_index.py [OFCO_thesaurus.owl] [iterations]
+
+import sys
+import time
+
+from ofco_loader import load_ofco
+from ofco_to_csv import extract_concepts
+from ofco_label_index import build_label_index, normalize, bounded_levenshtein
+
+OWL_FILE = "OFCO_thesaurus.owl"
+ITERATIONS = 2000
+
+QUERIES = ["Acquiring language", "Regulating urination", "learn", "self care", "walk"]
+FUZZY_QUERIES = ["Aquiring langage", "Regulatng urinaton", "Lerning to red"]
+
+
+def per_call_us(func, queries, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in queries:
+            func(query)
+    return (time.perf_counter() - start) / (iterations * len(queries)) * 1e6
+
+
+def main():
+    owl_file = sys.argv[1] if len(sys.argv) > 1 else OWL_FILE
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else ITERATIONS
+
+    model = load_ofco(owl_file)
+    start = time.perf_counter()
+    index = build_label_index(model)
+    build_ms = (time.perf_counter() - start) * 1000
+    rows = extract_concepts(model)
+
+    def linear_scan(query):
+        key = normalize(query)
+        return [row for row in rows if key in normalize(row[1])]
+
+    def fuzzy_scan(query, max_distance=2):
+        key = normalize(query)
+        return [label for label in index._keys
+                if bounded_levenshtein(key, label, max_distance) is not None]
+
+    print(f"Label index: {len(index)} labels, built in {build_ms:.1f} ms")
+    print(f"{'lookup':<14}{'per query':>14}")
+    for name, func, queries, n in (
+            ("prefix", index.prefix, QUERIES, iterations),
+            ("token", index.token, QUERIES, iterations),
+            ("fuzzy (k=2)", index.fuzzy, FUZZY_QUERIES, max(1, iterations // 10)),
+            ("fuzzy scan", fuzzy_scan, FUZZY_QUERIES, max(1, iterations // 10)),
+            ("search", index.search, QUERIES, max(1, iterations // 10)),
+            ("linear scan", linear_scan, QUERIES, max(1, iterations // 10))):
+        print(f"{name:<14}{per_call_us(func, queries, n):>11.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Benchmark: shared ofco_loader model vs rdflib RDF/XML parsing of OFCO_thesaurus.owl
+# Marc Hanauer @Orphanet 2025
+# pip install rdflib if needed (only for the reference path)
+# Usage: python benchmark_ofco_loader.py [OFCO_thesaurus.owl] [repeats]
+# Each path = load the ontology + extract the ofco_to_csv.py concept lines
+
+import sys
+import time
+import statistics
+
+from ofco_loader import load_ofco
+from ofco_to_csv import extract_concepts
+
+OWL_FILE = "OFCO_thesaurus.owl"
+REPEATS = 5
+
+
+def rdflib_path(owl_file):
+    """Previous implementation of ofco_to_csv.py (rdflib graph + per-triple lookups)"""
+    from rdflib import Graph, RDFS, Namespace, URIRef, RDF, OWL
+
+    OFCO = Namespace("https://w3id.org/ofco/")
+    EFO = Namespace("http://www.ebi.ac.uk/efo/")
+    ECO_0000218 = URIRef("http://purl.obolibrary.org/obo/ECO_0000218")
+
+    g = Graph()
+    g.parse(owl_file, format="xml")
+
+    data = []
+    for s in g.subjects(RDFS.label, None):
+        if (s, RDF.type, OWL.AnnotationProperty) in g:
+            continue
+        label = str(g.value(s, RDFS.label))
+        definition_val = g.value(s, EFO.definition)
+        definition = str(definition_val).replace('\n', ' ') if definition_val else ""
+        parents = [str(p) for p in g.objects(s, RDFS.subClassOf) if isinstance(p, URIRef)] or [""]
+        mappings = []
+        for axiom in g.subjects(OWL.annotatedSource, s):
+            if (axiom, OWL.annotatedProperty, OFCO.hasICFuri) in g:
+                code_val = g.value(axiom, OFCO.hasICFcode)
+                manual_val = g.value(axiom, ECO_0000218)
+                mappings.append((str(g.value(axiom, OWL.annotatedTarget)),
+                                 str(code_val) if code_val else "",
+                                 str(manual_val) if manual_val else ""))
+        if not mappings:
+            uris = [str(o) for o in g.objects(s, OFCO.hasICFuri)] or [""]
+            codes = [str(o) for o in g.objects(s, OFCO.hasICFcode)] or [""]
+            mappings = [(u, c, "") for u in uris for c in codes if u or c] or [("", "", "")]
+        for parent in parents:
+            for m in mappings:
+                data.append([str(s), label, definition, parent, *m])
+    return data
+
+
+def loader_path(owl_file):
+    """Shared ofco_loader model"""
+    return extract_concepts(load_ofco(owl_file))
+
+
+def measure(func, owl_file, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = func(owl_file)
+        timings.append(time.perf_counter() - start)
+    return timings, len(rows)
+
+
+def main():
+    owl_file = sys.argv[1] if len(sys.argv) > 1 else OWL_FILE
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else REPEATS
+
+    print(f"Benchmark on {owl_file} ({repeats} runs, load + concept extraction)")
+    results = {}
+    for name, func in (("ofco_loader", loader_path), ("rdflib", rdflib_path)):
+        try:
+            timings, rows = measure(func, owl_file, repeats)
+        except ImportError:
+            print(f"  {name:<12} skipped (pip install rdflib)")
+            continue
+        results[name] = statistics.median(timings)
+        print(f"  {name:<12} median {results[name] * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms   {rows} lines")
+
+    if len(results) == 2:
+        print(f"Speedup: x{results['rdflib'] / results['ofco_loader']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
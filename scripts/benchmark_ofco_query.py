@@ -0,0 +1,126 @@
+# Benchmark: local query engine (ofco_query.py) vs rdflib SPARQL on the queries of sparql/
+# Marc Hanauer @Orphanet 2025
+# pip install rdflib if needed (only for the reference path)
+# Both sides load OFCO_thesaurus.owl + Diseases_annotated_with_OFCO.owl, the results are
+# compared before timing (a mismatch is reported and the script exits with code 1)
+# Usage: python benchmark_ofco_query.py [OFCO_thesaurus.owl] [Diseases_annotated_with_OFCO.owl] [repeats]
+
+import os
+import sys
+import time
+from collections import Counter
+
+from ofco_query import open_store
+
+OWL_FILE = "OFCO_thesaurus.owl"
+ANNOTATIONS_FILE = "Diseases_annotated_with_OFCO.owl"
+SPARQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sparql")
+REPEATS = 5
+
+
+def sparql(name):
+    with open(os.path.join(SPARQL_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def local_queries(store):
+    """Same results as the SPARQL queries, as comparable Counters"""
+    def severe_motricity():
+        mask = store.select("MotorSkills", severity="Severe")
+        return Counter((d, a) for d, a, q in store.rows(mask))
+
+    def selfcares():
+        mask = store.select("SelfCare")
+        return Counter((d, a, q.get("hasSeverity")) for d, a, q in store.rows(mask))
+
+    def main_categories():
+        return Counter({top: count for top, label, count in store.count_by_top_category()})
+
+    def frequency_temporality():
+        return Counter(dict(store.count_by_qualifiers("InterpersonalSkills")))
+
+    return {
+        "get-count-by-main-categories.sparql": main_categories,
+        "get-diseases-by-severe-motricity-disabilities.sparql": severe_motricity,
+        "get-diseases-with-selfcares-issues.sparql": selfcares,
+        "get-Agregate-by-frequency-and-temporality.sparql": frequency_temporality,
+    }
+
+
+def rdflib_queries(graph):
+    """SPARQL files of sparql/ run with rdflib, results as Counters"""
+    def text(value):
+        return str(value) if value is not None else None
+
+    def run(name, row_key):
+        query = sparql(name)
+        return lambda: Counter(row_key(row) for row in graph.query(query))
+
+    def count_rows(name, key_fn, count_var):
+        query = sparql(name)
+        return lambda: Counter({key_fn(row): int(row[count_var]) for row in graph.query(query)})
+
+    return {
+        "get-count-by-main-categories.sparql": count_rows(
+            "get-count-by-main-categories.sparql", lambda r: text(r.topCategory), "diseaseCount"),
+        "get-diseases-by-severe-motricity-disabilities.sparql": run(
+            "get-diseases-by-severe-motricity-disabilities.sparql",
+            lambda r: (text(r.disorder), text(r.disabilityLabel))),
+        "get-diseases-with-selfcares-issues.sparql": run(
+            "get-diseases-with-selfcares-issues.sparql",
+            lambda r: (text(r.disorder), text(r.disability), text(r.severity))),
+        "get-Agregate-by-frequency-and-temporality.sparql": count_rows(
+            "get-Agregate-by-frequency-and-temporality.sparql",
+            lambda r: (text(r.frequency), text(r.temporality)), "count"),
+    }
+
+
+def best_of(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    owl_file = sys.argv[1] if len(sys.argv) > 1 else OWL_FILE
+    annotations_file = sys.argv[2] if len(sys.argv) > 2 else ANNOTATIONS_FILE
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else REPEATS
+
+    from rdflib import Graph
+
+    start = time.perf_counter()
+    store = open_store(owl_file, annotations_file)
+    local_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    graph = Graph()
+    graph.parse(owl_file, format="xml")
+    graph.parse(annotations_file, format="xml")
+    rdflib_load = time.perf_counter() - start
+
+    print(f"Associations: {len(store)}  OFCO classes: {len(store.hierarchy)}  triples: {len(graph)}")
+    print(f"{'':<56}{'rdflib':>12}{'local':>12}{'speedup':>10}")
+    print(f"{'load':<56}{rdflib_load * 1000:>9.1f} ms{local_load * 1000:>9.1f} ms"
+          f"{rdflib_load / local_load:>9.1f}x")
+
+    local = local_queries(store)
+    reference = rdflib_queries(graph)
+    mismatches = 0
+    for name, local_query in local.items():
+        rdflib_time, expected = best_of(reference[name], max(1, repeats // 5))
+        local_time, result = best_of(local_query, repeats)
+        if name.startswith("get-diseases-by-severe"):
+            # the SPARQL query returns the disability label
+            result = Counter({(d, store.hierarchy.label(a)): n for (d, a), n in result.items()})
+        same = result == expected
+        mismatches += not same
+        print(f"{name:<56}{rdflib_time * 1000:>9.1f} ms{local_time * 1000:>9.2f} ms"
+              f"{rdflib_time / local_time:>9.0f}x{'' if same else '  MISMATCH'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
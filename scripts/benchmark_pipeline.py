@@ -0,0 +1,214 @@
+# Benchmark harness of the OFCO pipeline scripts on synthetic datasets
+# Marc Hanauer @Orphanet 2025
+# For each scale, generate_synthetic_data.py writes a dataset (thesaurus, annotation XML and
+# mapping workbook, with their default file names) into a work directory, then each script is
+# run there in a fresh Python process: wall time (best of --repeats), throughput and peak memory
+# (max RSS of the process, Unix only) are recorded.
+# Results are written to a JSON file and compared with a stored baseline: a script slower or
+# using more memory than the baseline by more than --tolerance is a regression (exit code 1).
+# A step exiting with a non-zero code (error or crash) in any run is a failure: it is left out of
+# the timings, --save-baseline refuses to save, and the exit code is 1.
+#
+# Usage : python benchmark_pipeline.py [--scales 1 10] [--associations 4] [--thesaurus-scale 1]
+#                                      [--work-dir bench] [--repeats 3] [--output benchmark_results.json]
+#                                      [--baseline benchmark_baseline.json] [--save-baseline] [--tolerance 0.25]
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+
+from generate_synthetic_data import generate, OWL_FILE, WORKBOOK_FILE
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = "bench"
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+TOLERANCE = 0.25
+# differences below these are measurement noise (process start-up, page cache), never regressions
+NOISE = {"seconds": 0.05, "max_rss_kb": 4096}
+REPEATS = 3
+
+# script, arguments, size used for the throughput
+STEPS = [
+    ("disaxml_ofco_parser.py", ["--quiet"], "disorders"),
+    ("ofco_to_csv.py", [], "classes"),
+    ("ofco_checkmissinglabels.py", [], "classes"),
+    ("ofco_check_IRI_URI.py", [OWL_FILE], "classes"),
+    ("generate_sssom.py", ["--input", WORKBOOK_FILE, "--output", "mappings_sssom.tsv"], "mappings"),
+]
+
+# Runs a script as __main__ in this process and reports its peak memory on the last line,
+# an uncaught exception is printed and reported as a crash (exit code 1)
+RUNNER = """
+import sys, json, runpy, traceback
+sys.path.insert(0, {scripts!r})
+sys.argv = {argv!r}
+code = 0
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+except BaseException:
+    traceback.print_exc()
+    code = 1
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss // 1024 if sys.platform == "darwin" else rss
+except ImportError:
+    rss = None
+print(json.dumps({{"exit": code, "max_rss_kb": rss}}))
+"""
+
+
+def run_step(script, arguments, work_dir):
+    """Run one script in work_dir, returns (seconds, exit code, peak RSS in kB or None, last error line)"""
+    argv = [os.path.join(SCRIPTS_DIR, script)] + arguments
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", RUNNER.format(scripts=SCRIPTS_DIR, argv=argv)],
+                             cwd=work_dir, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    try:
+        report = json.loads(process.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        report = {"exit": process.returncode or 1, "max_rss_kb": None}
+    if process.returncode:
+        report["exit"] = process.returncode
+    # the last line of stdout is the runner report, the cause of a failure is on the line before or on stderr
+    errors = (process.stderr.strip().splitlines() or process.stdout.strip().splitlines()[:-1]) if report["exit"] else []
+    return seconds, report["exit"], report["max_rss_kb"], errors[-1] if errors else ""
+
+
+def benchmark_scale(scale, args):
+    """
+    Generate the dataset of one scale and time every step on it, a step with a non-zero exit code in
+    any run is left out of the timings and listed under "failed"
+    """
+    work_dir = os.path.join(args.work_dir, f"x{scale:g}")
+    if os.path.isdir(work_dir):
+        shutil.rmtree(work_dir)
+    start = time.perf_counter()
+    sizes = generate(work_dir, args.source, scale, args.associations, args.thesaurus_scale,
+                     args.depth, args.axioms, args.seed)
+    print(f"x{scale:g}: " + ", ".join(f"{v} {k}" for k, v in sizes.items())
+          + f" generated in {time.perf_counter() - start:.1f} s")
+    # the SQLite snapshot of the thesaurus is built once, as in normal use
+    run_step("ofco_snapshot.py", [OWL_FILE], work_dir)
+
+    steps, failed = {}, {}
+    for script, arguments, size in STEPS:
+        runs = [run_step(script, arguments, work_dir) for _ in range(args.repeats)]
+        crashed = [run for run in runs if run[1] != 0]
+        if crashed:
+            failed[script] = {"exit": crashed[0][1], "error": crashed[0][3]}
+            continue
+        seconds = min(run[0] for run in runs)
+        rss = [run[2] for run in runs if run[2] is not None]
+        steps[script] = {
+            "seconds": round(seconds, 4),
+            "throughput": round(sizes[size] / seconds, 1),
+            "unit": f"{size}/s",
+            "max_rss_kb": max(rss) if rss else None,
+        }
+    return {"sizes": sizes, "steps": steps, "failed": failed}
+
+
+def compare(results, baseline, tolerance):
+    """Rows (scale, script, metric, baseline, current, change) and the number of regressions"""
+    rows, regressions = [], 0
+    for scale, result in results["scales"].items():
+        reference = baseline.get("scales", {}).get(scale)
+        if reference is None:
+            continue
+        for script, current in result["steps"].items():
+            before = reference["steps"].get(script)
+            if before is None:
+                continue
+            for metric in ("seconds", "max_rss_kb"):
+                if not before.get(metric) or current.get(metric) is None:
+                    continue
+                change = current[metric] / before[metric] - 1
+                regression = change > tolerance and current[metric] - before[metric] > NOISE[metric]
+                regressions += regression
+                rows.append((scale, script, metric, before[metric], current[metric], change, regression))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the OFCO pipeline scripts on synthetic data")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10],
+                        help="annotation dataset sizes, in multiples of the 1x dataset")
+    parser.add_argument("--associations", type=float, default=4, help="mean associations per disorder")
+    parser.add_argument("--thesaurus-scale", type=float, default=1)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--axioms", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--source", default=OWL_FILE, help="real thesaurus extended by the generator")
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown / memory growth before a regression (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"Error: File '{args.source}' not found.")
+        return 2
+
+    results = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {k: getattr(args, k) for k in ("associations", "thesaurus_scale", "depth",
+                                                   "axioms", "seed", "repeats")},
+        "scales": {},
+    }
+    for scale in args.scales:
+        results["scales"][f"{scale:g}"] = benchmark_scale(scale, args)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'scale':<7}{'script':<30}{'time':>10}{'throughput':>22}{'peak RSS':>12}")
+    failed = 0
+    for scale, result in results["scales"].items():
+        for script, step in result["steps"].items():
+            rss = f"{step['max_rss_kb'] / 1024:.0f} MB" if step["max_rss_kb"] else "-"
+            print(f"x{scale:<6}{script:<30}{step['seconds']:>8.2f} s"
+                  f"{step['throughput']:>12.0f} {step['unit']:<9}{rss:>12}")
+        for script, step in result["failed"].items():
+            failed += 1
+            print(f"x{scale:<6}{script:<30}  failed, exit {step['exit']}: {step['error']}")
+    print(f"Results written to: {args.output}")
+
+    if args.save_baseline:
+        if failed:
+            print(f"Error: {failed} step(s) failed, baseline not saved.")
+            return 1
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline saved to: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline ({args.baseline}), run with --save-baseline to create it")
+        return 1 if failed else 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows, regressions = compare(results, baseline, args.tolerance)
+    print(f"\nComparison with {args.baseline} ({baseline.get('date')}, tolerance +{args.tolerance:.0%})")
+    for scale, script, metric, before, current, change, regression in rows:
+        mark = "✗" if regression else "✓"
+        print(f"{mark} x{scale:<6}{script:<30}{metric:<12}{before:>12}{current:>12}{change:>+9.1%}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Benchmark: all-pairs disease similarity (ofco_similarity.py)
+# Marc Hanauer @Orphanet 2025
+# Times the profile matrix build and the all-pairs top-k job for a few chunk sizes, with the peak
+# memory of the scoring (tracemalloc, NumPy blocks included). The top-k of a sample of disorders
+# is checked against a plain Python pairwise computation first (exit code 1 on a mismatch).
+# Larger inputs: generate_synthetic_data.py --scale 10 then disaxml_ofco_parser.py in that directory
+# Usage: python benchmark_similarity.py [OFCO_thesaurus.owl] [Diseases_annotated_with_OFCO.owl] [sample]
+
+import sys
+import math
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from ofco_query import open_store
+from ofco_similarity import profile_matrix, SimilarityIndex, METRICS, TOP_K
+
+OWL_FILE = "OFCO_thesaurus.owl"
+ANNOTATIONS_FILE = "Diseases_annotated_with_OFCO.owl"
+SAMPLE = 50
+CHUNK_SIZES = (64, 512, 4096)
+
+
+def profiles_of(matrix):
+    """Rows of a CSR matrix as {concept: weight} dicts"""
+    return [dict(zip(matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]],
+                     matrix.data[matrix.indptr[i]:matrix.indptr[i + 1]])) for i in range(matrix.shape[0])]
+
+
+def pairwise_top_k(profiles, row, metric, k):
+    """Reference: scores of one disorder against all the others, one pair at a time"""
+    mine = profiles[row]
+    scores = []
+    for other, theirs in enumerate(profiles):
+        if other == row:
+            continue
+        if metric == "cosine":
+            dot = sum(w * theirs[c] for c, w in mine.items() if c in theirs)
+            norm = math.sqrt(sum(w * w for w in mine.values())) * math.sqrt(sum(w * w for w in theirs.values()))
+            score = dot / norm if norm else 0.0
+        else:
+            union = len(mine.keys() | theirs.keys())
+            score = len(mine.keys() & theirs.keys()) / union if union else 0.0
+        if score > 0:
+            scores.append(score)
+    return sorted(scores, reverse=True)[:k]
+
+
+def main():
+    owl_file = sys.argv[1] if len(sys.argv) > 1 else OWL_FILE
+    annotations_file = sys.argv[2] if len(sys.argv) > 2 else ANNOTATIONS_FILE
+    sample = int(sys.argv[3]) if len(sys.argv) > 3 else SAMPLE
+
+    start = time.perf_counter()
+    store = open_store(owl_file, annotations_file)
+    load = time.perf_counter() - start
+    print(f"Disorders: {len(store.disorders)}  associations: {len(store)}  load: {load:.2f} s")
+
+    mismatches = 0
+    for propagate in (0.0, 0.5):
+        start = time.perf_counter()
+        matrix = profile_matrix(store, propagate)
+        build = time.perf_counter() - start
+        print(f"\npropagate={propagate}: matrix {matrix.shape[0]} x {matrix.shape[1]}, "
+              f"{matrix.nnz} non-zero, built in {build * 1000:.1f} ms")
+        print(f"{'':<22}{'chunk':>7}{'time':>10}{'pairs/s':>14}{'peak':>11}")
+        profiles = profiles_of(matrix)
+        for metric in METRICS:
+            index = SimilarityIndex(matrix, store.disorders, metric)
+            # correctness on a sample: same top-k scores as the pairwise reference
+            rng = np.random.default_rng(0)
+            rows = rng.choice(len(index), size=min(sample, len(index)), replace=False)
+            for row, (found, scores) in zip(rows, index.top_k(rows, TOP_K)):
+                expected = pairwise_top_k(profiles, row, metric, TOP_K)
+                if len(scores) != len(expected) or not np.allclose(scores, expected):
+                    mismatches += 1
+            for chunk_size in CHUNK_SIZES:
+                tracemalloc.start()
+                start = time.perf_counter()
+                deque(index.all_pairs(TOP_K, chunk_size), maxlen=0)
+                seconds = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                pairs = len(index) * (len(index) - 1)
+                print(f"{metric:<22}{chunk_size:>7}{seconds:>8.2f} s{pairs / seconds:>14.3g}"
+                      f"{peak / 2 ** 20:>8.1f} MB")
+    print(f"\n{mismatches} mismatch(es) against the pairwise reference")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,25 +4,46 @@ XML disabilities parser mixed with OFCO thesaurus
 Author: Marc Hanauer @Orphanet
 Updated: 2025-11 (uses blank nodes with rdf:type for associations)
 Option: --quiet  → hides warnings for missing DisabilityCategory mappings
+        --stream → constant-memory mode (iterparse, blocks written as they are generated)
+        --workers N → RDF generation sharded across N processes (same output as a single process)
+        --incremental → only disorders changed since the previous run are regenerated (sidecar manifest)
+        --format nt|nq [--chunk-size MB] [--gzip] → N-Triples / N-Quads for triple store bulk loaders
+        --profile-store [PATH] → also write the binary disability profile store (ofco_profile_store.py)
+        --languages fr=fr_funct_consequences.xml de=... → per-language disorder label triples and
+          label coverage report, language files processed in a process pool
+        --profile / --metrics-json [PATH] → time and memory per stage, disorders/s (ofco_metrics.py)
+        --verify → referential-integrity check of the output (ofco_verify_output.py), exit code 1 on errors
+Unmapped IDs are reported once per ID with their number of occurrences, at the end of the run
 """
 
 import xml.etree.ElementTree as ET
 import sys
+import re
+import mmap
+import os
+import json
+import hashlib
+import argparse
+import gzip
+import time
 import html  # for safe XML escaping
+from urllib.parse import quote
+from functools import partial
+from collections import deque, defaultdict, Counter
+from multiprocessing import Pool
+from ofco_loader import load_ofco, HAS_INTERNAL_REFERENCE, HAS_ORPHA_NUMBER
+from ofco_profile_store import ProfileStoreWriter, PROFILE_STORE_FILE
+import ofco_metrics
+from ofco_metrics import RunMetrics
+from ofco_verify_output import verify_output, print_report, OUTPUT_FILE as VERIFICATION_FILE
 
 # Configuration
 OFCO_FILE = 'OFCO_thesaurus.owl'
 XML_FILE = 'Disability_Orphanet_annotations.xml'
 OUTPUT_FILE = 'Diseases_annotated_with_OFCO.owl'
-
-# XML Namespaces
-NAMESPACES = {
-    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-    'owl': 'http://www.w3.org/2002/07/owl#',
-    'rdfs': 'http://www.w3.org/2000/01/rdf-schema#',
-    'ofco': 'https://w3id.org/ofco/',
-    'xsd': 'http://www.w3.org/2001/XMLSchema#'
-}
+MANIFEST_FILE = OUTPUT_FILE + '.manifest.json'
+MANIFEST_VERSION = 1
+LABEL_COVERAGE_FILE = 'Diseases_label_coverage.json'
 
 
 def xml_escape(text):
@@ -38,35 +59,13 @@ def convert_loss_of_ability(value):
     return conversion.get(value, 'unknown')
 
 
-def get_ontology_mappings(owl_tree):
-    """Extract Thesaurus OFCO concepts (RDF parsing)"""
-    disability_mapping = {}
-    orpha_number_mapping = {}
-    
+def get_ontology_mappings(model):
+    """Extract Thesaurus OFCO concepts (from the shared ofco_loader model)"""
     print('\033[96m Extract concepts from OFCO thesaurus...\033[0m')
-    root = owl_tree.getroot()
     
-    for cls in root.findall('.//owl:Class', NAMESPACES):
-        cls_about = cls.get('{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about')
-        if not cls_about:
-            continue
-        equiv = cls.find('owl:equivalentClass', NAMESPACES)
-        if equiv is None:
-            continue
-
-        intersection_of = equiv.find('.//owl:intersectionOf', NAMESPACES)
-        restrictions = intersection_of.findall('.//owl:Restriction', NAMESPACES) if intersection_of is not None else equiv.findall('.//owl:Restriction', NAMESPACES)
-
-        for restriction in restrictions:
-            prop_node = restriction.find('owl:onProperty', NAMESPACES)
-            val_node = restriction.find('owl:hasValue', NAMESPACES)
-            if prop_node is not None and val_node is not None:
-                prop = prop_node.get('{http://www.w3.org/1999/02/22-rdf-syntax-ns#}resource')
-                val = val_node.text
-                if prop == 'https://w3id.org/ofco/hasORPHANETDBInternalReference':
-                    disability_mapping[val] = cls_about
-                elif prop == 'https://w3id.org/ofco/hasORPHAnumber':
-                    orpha_number_mapping[val] = cls_about
+    # owl:equivalentClass owl:hasValue restrictions, value -> class IRI
+    disability_mapping = dict(model.restriction_index(HAS_INTERNAL_REFERENCE))
+    orpha_number_mapping = dict(model.restriction_index(HAS_ORPHA_NUMBER))
     
     print('\033[92m Mappings extracted from OFCO:\033[0m')
     print(f'\033[97m   - Disabilities: {len(disability_mapping)} entries\033[0m')
@@ -76,174 +75,809 @@ def get_ontology_mappings(owl_tree):
         'Disabilities': disability_mapping,
         'OrphaNumbers': orpha_number_mapping
     }
+RDF_HEADER = '\n'.join([
+    '<?xml version="1.0" encoding="UTF-8"?>',
+    '<rdf:RDF',
+    '    xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"',
+    '    xmlns:owl="http://www.w3.org/2002/07/owl#"',
+    '    xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"',
+    '    xmlns:ordo="http://www.orpha.net/ORDO/"',
+    '    xmlns:ofco="https://w3id.org/ofco/"',
+    '    xmlns:icf="http://id.who.int/icf/"',
+    '    xmlns:xsd="http://www.w3.org/2001/XMLSchema#">'
+])
+RDF_FOOTER = '\n\n</rdf:RDF>'
 
+# Raw DisorderDisabilityRelevance fragments, used to shard the XML file without parsing it
+RELEVANCE_PATTERN = re.compile(
+    rb'<DisorderDisabilityRelevance(?:\s[^>]*?)?(?:/>|>.*?</DisorderDisabilityRelevance>)', re.S
+)
+XML_ENCODING_PATTERN = re.compile(rb'^\s*<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
 
-def main():
-    """Main processing function"""
-    quiet_mode = "--quiet" in sys.argv
+ORPHACODE_PATTERN = re.compile(rb'<OrphaCode>\s*([^<\s]+)\s*</OrphaCode>')
+# Start of every owl:Class block written by format_owl_class()
+BLOCK_MARKER = '\n\n  \n  <owl:Class rdf:about="http://www.orpha.net/ORDO/Orphanet_'
 
-    print('\033[93m Loading OFCO...\033[0m')
-    
+# Disorders per task sent to a worker
+BATCH_SIZE = 500
+
+# N-Triples / N-Quads output
+OUTPUT_BASENAME = os.path.splitext(OUTPUT_FILE)[0]
+GRAPH_BASE = 'https://w3id.org/ofco/graph/'
+# Skolem IRIs (RDF 1.1 well-known genid) replacing the association blank nodes
+GENID_BASE = 'https://w3id.org/ofco/.well-known/genid/'
+RDF_TYPE = '<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>'
+XSD_BOOLEAN = 'http://www.w3.org/2001/XMLSchema#boolean'
+RDFS_LABEL = 'http://www.w3.org/2000/01/rdf-schema#label'
+OFCO_NS = 'https://w3id.org/ofco/'
+
+# Frequency / Temporality / Severity tags of an association and their OFCO predicates
+QUALIFIERS = [
+    ('FrequenceDisability', 'hasFrequency'),
+    ('TemporalityDisability', 'hasTemporality'),
+    ('SeverityDisability', 'hasSeverity')
+]
+
+
+def iter_relevances(xml_source):
+    """
+    Stream DisorderDisabilityRelevance elements with iterparse.
+    Each element is detached from its parent once the caller is done with it,
+    so memory stays flat whatever the size of the XML file.
+    """
+    parents = []
+    for event, elem in ET.iterparse(xml_source, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag == 'DisorderDisabilityRelevance':
+            yield elem
+            if parents:
+                parents[-1].remove(elem)
+            else:
+                elem.clear()
+
+
+def extract_disorder(relevance, mappings, warnings=None):
+    """
+    Extract one DisorderDisabilityRelevance as a record of OFCO IRIs
+    Returns None when the disorder has no OrphaCode or English name
+    Unmapped IDs are counted in the warnings Counter (if given): {(kind, ID): occurrences}
+    """
+    disorder = relevance.find('Disorder')
+    if disorder is None:
+        return None
+
+    orpha_code_elem = disorder.find('OrphaCode')
+    disorder_name_elem = disorder.find("Name[@lang='en']")
+    if orpha_code_elem is None or disorder_name_elem is None:
+        return None
+
+    record = {
+        'orpha_code': orpha_code_elem.text,
+        'name': disorder_name_elem.text,
+        'specific_management': None,
+        'category': None,
+        'reason': None,
+        'associations': []
+    }
+
+    # hasSpecificManagement stays on the disorder
+    specific_management = relevance.find('SpecificManagement')
+    if specific_management is not None and specific_management.text:
+        record['specific_management'] = 'true' if specific_management.text.lower().startswith('y') else 'false'
+
+    # DisabilityCategory (always include if mapped)
+    disability_category = relevance.find('DisabilityCategory')
+    if disability_category is not None:
+        orpha_number_node = disability_category.find('OrphaNumber')
+        if orpha_number_node is not None and orpha_number_node.text:
+            orpha_number = orpha_number_node.text.strip()
+            record['category'] = mappings['OrphaNumbers'].get(orpha_number)
+            if not record['category'] and warnings is not None:
+                warnings['DisabilityCategory OrphaNumber', orpha_number] += 1
+
+    # ReasonForNotApplicable (Processed after DisabilityCategory)
+    reason_not_applicable = relevance.find('ReasonForNotApplicable')
+    if reason_not_applicable is not None:
+        orpha_node = reason_not_applicable.find('OrphaNumber')
+        if orpha_node is not None and orpha_node.text:
+            orpha_number = orpha_node.text.strip()
+            # IRI mappings based on OrphaNumbers
+            record['reason'] = mappings['OrphaNumbers'].get(orpha_number)
+            if not record['reason'] and warnings is not None:
+                warnings['ReasonForNotApplicable OrphaNumber', orpha_number] += 1
+
+    # DisabilityDisorderAssociationList
+    for association in disorder.findall('DisabilityDisorderAssociationList/DisabilityDisorderAssociation'):
+        disability = association.find('Disability')
+        if disability is None:
+            continue
+        if disability.find("Name[@lang='en']") is None:
+            continue
+        disability_id = disability.get('id')
+
+        # Check disability URI
+        disability_uri = mappings['Disabilities'].get(disability_id)
+        if not disability_uri and warnings is not None:
+            warnings['Disability ID', disability_id] += 1
+
+        entry = {'disability_id': disability_id, 'disability': disability_uri}
+
+        # Frequency / Temporality / Severity
+        for tag, predicate in QUALIFIERS:
+            entry[predicate] = None
+            elem = association.find(tag)
+            if elem is not None and len(elem) > 0:
+                orpha_number_node = elem.find('OrphaNumber')
+                if orpha_number_node is not None and orpha_number_node.text:
+                    entry[predicate] = mappings['OrphaNumbers'].get(orpha_number_node.text)
+
+        # LossOfAbility
+        entry['lossOfAbility'] = None
+        loss_of_ability = association.find('LossOfAbility')
+        if loss_of_ability is not None and loss_of_ability.text:
+            loss_value = convert_loss_of_ability(loss_of_ability.text)
+            if loss_value in ('true', 'false'):
+                entry['lossOfAbility'] = loss_value
+
+        record['associations'].append(entry)
+
+    return record
+
+
+def format_owl_class(record):
+    """Serialize a disorder record as an owl:Class block (RDF/XML, blank node associations)"""
+    orpha_code = record['orpha_code']
+    lines = [
+        '',
+        f'  ',
+        f'  <owl:Class rdf:about="http://www.orpha.net/ORDO/Orphanet_{orpha_code}">'
+        f'    <ofco:hasOrphanetDiseaseLink rdf:resource="https://www.orpha.net/en/disease/detail/{orpha_code}"/>',
+        f'    <ofco:hasOrphanetDisabilityLink rdf:resource="https://www.orpha.net/en/disease/disability/detail/{orpha_code}"/>'
+    ]
+
+    if record['specific_management']:
+        lines.append(
+            f'    <ofco:hasSpecificManagement rdf:datatype="{XSD_BOOLEAN}">{record["specific_management"]}</ofco:hasSpecificManagement>'
+        )
+
+    if record['category']:
+        lines.extend([
+            f'    ',
+            f'    <ofco:hasDisabilityCategory rdf:resource="{record["category"]}"/>'
+        ])
+
+    if record['reason']:
+        lines.extend([
+            f'    ',
+            f'    <ofco:hasReasonForNotApplicable rdf:resource="{record["reason"]}"/>'
+        ])
+
+    # Associations - using blank nodes
+    for entry in record['associations']:
+        lines.extend([
+            '',
+            f'    ',
+            '    <ofco:hasDisabilityAnnotation rdf:parseType="Resource">',
+            '      <rdf:type rdf:resource="https://w3id.org/ofco/DisabilityDisorderAssociation"/>'
+        ])
+        if entry['disability']:
+            lines.append(f'      <ofco:concernsDisability rdf:resource="{entry["disability"]}"/>')
+        for tag, predicate in QUALIFIERS:
+            if entry[predicate]:
+                lines.append(f'      <ofco:{predicate} rdf:resource="{entry[predicate]}"/>')
+        if entry['lossOfAbility']:
+            lines.append(
+                f'      <ofco:lossOfAbility rdf:datatype="{XSD_BOOLEAN}">{entry["lossOfAbility"]}</ofco:lossOfAbility>'
+            )
+        lines.append('    </ofco:hasDisabilityAnnotation>')
+
+    lines.append('  </owl:Class>')
+    return '\n' + '\n'.join(lines)
+
+
+def iter_relevance_fragments(xml_file):
+    """
+    Yield (prolog, fragment) for each raw DisorderDisabilityRelevance of the XML file
+    (source order kept). Only a regex scan over the memory-mapped file, no XML parsing.
+    The prolog carries the encoding declared by the source, to parse fragments on their own.
+    """
+    with open(xml_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            declared = XML_ENCODING_PATTERN.match(data[:200])
+            encoding = declared.group(1) if declared else b'UTF-8'
+            prolog = b'<?xml version="1.0" encoding="' + encoding + b'"?>'
+            for match in RELEVANCE_PATTERN.finditer(data):
+                yield prolog, match.group(0)
+
+
+def iter_relevance_batches(xml_file, batch_size=BATCH_SIZE):
+    """Group raw DisorderDisabilityRelevance fragments into parseable <batch> documents"""
+    batch = []
+    for prolog, fragment in iter_relevance_fragments(xml_file):
+        batch.append(fragment)
+        if len(batch) == batch_size:
+            yield prolog + b'<batch>' + b''.join(batch) + b'</batch>'
+            batch = []
+    if batch:
+        yield prolog + b'<batch>' + b''.join(batch) + b'</batch>'
+
+
+# Read-only state of each worker process, set once by init_worker()
+_worker_state = {}
+
+
+def init_worker(mappings, formatter):
+    """Pool initializer: OFCO mappings are sent once per worker, not once per task"""
+    _worker_state['mappings'] = mappings
+    _worker_state['formatter'] = formatter
+
+
+def render_batch(payload):
+    """Worker task: serialize a batch of disorders, returns (text, processed disorders, associations, warnings)"""
+    mappings = _worker_state['mappings']
+    formatter = _worker_state['formatter']
+    warnings = Counter()
+    blocks = []
+    associations = 0
+    for relevance in ET.fromstring(payload):
+        record = extract_disorder(relevance, mappings, warnings)
+        if record is not None:
+            blocks.append(formatter(record))
+            associations += len(record['associations'])
+    return ''.join(blocks), len(blocks), associations, warnings
+
+
+def generate_parallel(out, mappings, workers, metrics, formatter=format_owl_class):
+    """
+    Shard disorders across a process pool and write the shards back in source order.
+    At most 2 batches per worker are in flight, so memory stays bounded.
+    """
+    processed_disorders = 0
+    pending = deque()
+    with Pool(workers, initializer=init_worker, initargs=(mappings, formatter)) as pool:
+        for payload in iter_relevance_batches(XML_FILE):
+            pending.append(pool.apply_async(render_batch, (payload,)))
+            if len(pending) >= 2 * workers:
+                processed_disorders += write_batch_result(out, pending.popleft().get(), metrics)
+        while pending:
+            processed_disorders += write_batch_result(out, pending.popleft().get(), metrics)
+    return processed_disorders
+
+
+def write_batch_result(out, result, metrics):
+    """Write one worker result, count its associations and warnings, returns the number of disorders written"""
+    text, processed, associations, warnings = result
+    metrics.count('associations', associations, stage='RDF generation')
+    metrics.add_warnings(warnings)
+    out.write(text)
+    return processed
+
+
+def file_sha256(path):
+    """SHA-256 of a file content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def mappings_sha256(mappings):
+    """SHA-256 of the OFCO mapping tables in use"""
+    return hashlib.sha256(json.dumps(mappings, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_previous_run(ofco_hash, maps_hash):
+    """
+    Load the manifest and the blocks of the previous output.
+    Returns (dict orpha_code -> deque of (hash, block)) or (None, reason) when a full rebuild is needed.
+    """
     try:
-        owl_tree = ET.parse(OFCO_FILE)
+        with open(MANIFEST_FILE, encoding='utf-8') as f:
+            manifest = json.load(f)
     except FileNotFoundError:
-        print(f'\033[91m Error: {OFCO_FILE} not found\033[0m')
-        sys.exit(1)
-    
-    mappings = get_ontology_mappings(owl_tree)
-    
-    print('\033[93m Loading XML dataset...\033[0m')
+        return None, 'no manifest found'
+    except ValueError:
+        return None, 'unreadable manifest'
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None, 'manifest version changed'
+    if manifest.get('ofco_sha256') != ofco_hash:
+        return None, f'{OFCO_FILE} changed'
+    if manifest.get('mappings_sha256') != maps_hash:
+        return None, 'OFCO mappings changed'
     try:
-        xml_tree = ET.parse(XML_FILE)
-        xml_root = xml_tree.getroot()
+        if file_sha256(OUTPUT_FILE) != manifest.get('output_sha256'):
+            return None, f'{OUTPUT_FILE} modified since last run'
+        with open(OUTPUT_FILE, encoding='utf-8', newline='') as f:
+            text = f.read()
     except FileNotFoundError:
-        print(f'\033[91m Error: {XML_FILE} not found\033[0m')
+        return None, f'{OUTPUT_FILE} not found'
+
+    if not text.startswith(RDF_HEADER) or not text.endswith(RDF_FOOTER):
+        return None, f'unexpected layout in {OUTPUT_FILE}'
+    blocks = iter(text[len(RDF_HEADER):-len(RDF_FOOTER)].split(BLOCK_MARKER)[1:])
+
+    previous = defaultdict(deque)
+    for orpha_code, digest, emitted in manifest['disorders']:
+        block = ''
+        if emitted:
+            block = BLOCK_MARKER + next(blocks, '')
+            if not block.startswith(BLOCK_MARKER + f'{orpha_code}"'):
+                return None, f'{OUTPUT_FILE} does not match the manifest'
+        previous[orpha_code].append((digest, block))
+    return previous, None
+
+
+def generate_incremental(out, mappings, warnings, previous):
+    """
+    Re-emit only the disorders whose source subtree changed since the previous run,
+    unchanged owl:Class blocks are copied from the previous output. Unmapped IDs of the
+    regenerated disorders are counted in warnings.
+    Returns (manifest entries, {'added': [...], 'changed': [...], 'removed': [...]})
+    """
+    entries = []
+    changes = {'added': [], 'changed': [], 'removed': []}
+    for prolog, fragment in iter_relevance_fragments(XML_FILE):
+        code_match = ORPHACODE_PATTERN.search(fragment)
+        orpha_code = code_match.group(1).decode('ascii', 'replace') if code_match else None
+        digest = hashlib.sha256(fragment).hexdigest()
+
+        old = previous[orpha_code].popleft() if previous.get(orpha_code) else None
+        if old is not None and old[0] == digest:
+            block = old[1]
+        else:
+            record = extract_disorder(ET.fromstring(prolog + fragment), mappings, warnings)
+            block = format_owl_class(record) if record is not None else ''
+            changes['added' if old is None else 'changed'].append(orpha_code)
+
+        out.write(block)
+        entries.append([orpha_code, digest, bool(block)])
+
+    changes['removed'] = [code for code, olds in previous.items() for _ in olds]
+    return entries, changes
+
+
+def write_manifest(entries, ofco_hash, maps_hash):
+    """Sidecar manifest of the output: source hash per OrphaCode and hashes of the inputs"""
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': XML_FILE,
+        'ofco_sha256': ofco_hash,
+        'mappings_sha256': maps_hash,
+        'output_sha256': file_sha256(OUTPUT_FILE),
+        'disorders': entries
+    }
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+
+def print_changes(changes):
+    """Report added, changed and removed disorders of an incremental run"""
+    for kind in ('added', 'changed', 'removed'):
+        codes = changes[kind]
+        shown = ', '.join(str(code) for code in codes[:20]) + (', ...' if len(codes) > 20 else '')
+        print(f'\033[97m   - Disorders {kind}: {len(codes)}\033[0m' + (f' ({shown})' if codes else ''))
+
+
+def format_ntriples(record, graph=None):
+    """
+    Serialize a disorder record as N-Triples (or N-Quads when a graph IRI is given).
+    Associations get stable skolemized IRIs built from OrphaCode and Disability id.
+    """
+    orpha_code = record['orpha_code']
+    disorder = f'<http://www.orpha.net/ORDO/Orphanet_{orpha_code}>'
+    suffix = f' <{graph}> .\n' if graph else ' .\n'
+    lines = [
+        disorder + f' {RDF_TYPE} <http://www.w3.org/2002/07/owl#Class>' + suffix,
+        disorder + f' <{OFCO_NS}hasOrphanetDiseaseLink> <https://www.orpha.net/en/disease/detail/{orpha_code}>' + suffix,
+        disorder + f' <{OFCO_NS}hasOrphanetDisabilityLink> <https://www.orpha.net/en/disease/disability/detail/{orpha_code}>' + suffix
+    ]
+    if record['specific_management']:
+        lines.append(disorder + f' <{OFCO_NS}hasSpecificManagement> "{record["specific_management"]}"^^<{XSD_BOOLEAN}>' + suffix)
+    if record['category']:
+        lines.append(disorder + f' <{OFCO_NS}hasDisabilityCategory> <{record["category"]}>' + suffix)
+    if record['reason']:
+        lines.append(disorder + f' <{OFCO_NS}hasReasonForNotApplicable> <{record["reason"]}>' + suffix)
+
+    seen = defaultdict(int)
+    for entry in record['associations']:
+        key = quote(f'{orpha_code}_{entry["disability_id"]}', safe='')
+        seen[key] += 1
+        if seen[key] > 1:
+            key += f'_{seen[key]}'
+        node = f'<{GENID_BASE}Orphanet_{key}>'
+        lines.append(disorder + f' <{OFCO_NS}hasDisabilityAnnotation> {node}' + suffix)
+        lines.append(node + f' {RDF_TYPE} <{OFCO_NS}DisabilityDisorderAssociation>' + suffix)
+        if entry['disability']:
+            lines.append(node + f' <{OFCO_NS}concernsDisability> <{entry["disability"]}>' + suffix)
+        for tag, predicate in QUALIFIERS:
+            if entry[predicate]:
+                lines.append(node + f' <{OFCO_NS}{predicate}> <{entry[predicate]}>' + suffix)
+        if entry['lossOfAbility']:
+            lines.append(node + f' <{OFCO_NS}lossOfAbility> "{entry["lossOfAbility"]}"^^<{XSD_BOOLEAN}>' + suffix)
+    return ''.join(lines)
+
+
+class ChunkedWriter:
+    """
+    Line-oriented output split into size-bounded (optionally gzip-compressed) files:
+    <base>.part0001.nt[.gz], <base>.part0002.nt[.gz]... or <base>.nt[.gz] when chunk_size is 0.
+    Files are only rotated between two writes, so a disorder is never split across chunks.
+    """
+
+    def __init__(self, base, extension, chunk_size=0, compress=False):
+        self.base = base
+        self.extension = extension + ('.gz' if compress else '')
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.files = []
+        self.current = None
+        self.written = 0
+
+    def _open_next(self):
+        if self.current is not None:
+            self.current.close()
+        if self.chunk_size:
+            path = f'{self.base}.part{len(self.files) + 1:04d}{self.extension}'
+        else:
+            path = self.base + self.extension
+        if self.compress:
+            self.current = gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            self.current = open(path, 'w', encoding='utf-8', buffering=1024 * 1024)
+        self.files.append(path)
+        self.written = 0
+
+    def write(self, text):
+        if self.current is None or (self.chunk_size and self.written >= self.chunk_size):
+            self._open_next()
+        self.current.write(text)
+        self.written += len(text)
+
+    def close(self):
+        if self.current is None:
+            self._open_next()
+        self.current.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_profile_store(path, mappings):
+    """
+    Profile store of the modes where records are built in other processes (--workers) or
+    not built for unchanged disorders (--incremental): one more streaming pass over the XML
+    """
+    profiles = ProfileStoreWriter(path)
+    with open(XML_FILE, 'rb') as xml_source:
+        for relevance in iter_relevances(xml_source):
+            record = extract_disorder(relevance, mappings)
+            if record is not None:
+                profiles.add(record)
+    profiles.close()
+    return len(profiles)
+
+
+def nt_literal(text, lang):
+    """N-Triples language-tagged literal"""
+    escaped = (text.strip().replace('\\', '\\\\').replace('"', '\\"')
+               .replace('\n', '\\n').replace('\r', '\\r'))
+    return f'"{escaped}"@{lang}'
+
+
+def parse_language_files(specs):
+    """['fr=fr_funct_consequences.xml', ...] -> {'fr': 'fr_funct_consequences.xml', ...}"""
+    languages = {}
+    for spec in specs:
+        lang, sep, path = spec.partition('=')
+        if not sep or not lang or not path:
+            raise ValueError(f'expected LANG=FILE, got {spec!r}')
+        languages[lang.strip().lower()] = path
+    return languages
+
+
+def render_language(task):
+    """
+    Worker task: disorder rdfs:label triples of one language file (written to their own
+    N-Triples file) and the names found for the disabilities. Uses the shared OFCO mappings
+    of init_worker(), the annotation structure itself is not rebuilt.
+    Returns (lang, output path, labelled OrphaCodes, {disability IRI: name}, warnings Counter)
+    """
+    lang, xml_file = task
+    mappings = _worker_state['mappings']
+    warnings = Counter()
+    output_path = f'{OUTPUT_BASENAME}.labels.{lang}.nt'
+    labelled = set()
+    disability_names = {}
+    with open(xml_file, 'rb') as xml_source, open(output_path, 'w', encoding='utf-8', buffering=1024 * 1024) as out:
+        for relevance in iter_relevances(xml_source):
+            disorder = relevance.find('Disorder')
+            if disorder is None:
+                continue
+            orpha_code = disorder.findtext('OrphaCode')
+            name = disorder.find(f"Name[@lang='{lang}']")
+            if not orpha_code or name is None or not name.text:
+                continue
+            orpha_code = orpha_code.strip()
+            labelled.add(orpha_code)
+            out.write(f'<http://www.orpha.net/ORDO/Orphanet_{orpha_code}> <{RDFS_LABEL}> {nt_literal(name.text, lang)} .\n')
+            for disability in disorder.iterfind('DisabilityDisorderAssociationList/DisabilityDisorderAssociation/Disability'):
+                disability_name = disability.find(f"Name[@lang='{lang}']")
+                iri = mappings['Disabilities'].get(disability.get('id'))
+                if iri is None:
+                    warnings[f'[{lang}] Disability ID', disability.get('id')] += 1
+                    continue
+                if disability_name is not None and disability_name.text:
+                    disability_names.setdefault(iri, disability_name.text.strip())
+    return lang, output_path, labelled, disability_names, warnings
+
+
+def generate_languages(languages, mappings, model, workers, metrics):
+    """
+    Multi-language mode: the language files are processed in a process pool (one task per
+    language, OFCO mappings sent once per worker). Writes one label file per language and the
+    label coverage report. Disorders are the ones of the main XML_FILE: the annotation
+    structure is language independent and is only built once, by the main run.
+    """
+    with open(XML_FILE, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            disorders = {m.group(1).decode('ascii') for m in ORPHACODE_PATTERN.finditer(data)}
+    concepts = sorted(set(model.classes) | set(model.annotation_properties))
+    tasks = sorted(languages.items())
+    with Pool(max(1, min(workers, len(tasks))), initializer=init_worker,
+              initargs=(mappings, None)) as pool:
+        results = pool.map(render_language, tasks)
+
+    report = {'source': XML_FILE, 'disorders': len(disorders), 'languages': {}}
+    for lang, output_path, labelled, disability_names, warnings in results:
+        metrics.add_warnings(warnings)
+        missing_concepts = [iri for iri in concepts if model.label(iri, lang) is None]
+        report['languages'][lang] = {
+            'source': languages[lang],
+            'labels_file': output_path,
+            'labelled_disorders': len(labelled & disorders),
+            'missing_disorder_labels': sorted(disorders - labelled, key=int),
+            'missing_ofco_labels': [
+                {'iri': iri, 'orphanet_name': disability_names.get(iri)} for iri in missing_concepts
+            ],
+        }
+    with open(LABEL_COVERAGE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def main():
+    """Main processing function"""
+    parser = argparse.ArgumentParser(description='Generate the diseases dataset annotated with OFCO thesaurus')
+    parser.add_argument('--quiet', action='store_true',
+                        help='hide warnings for missing DisabilityCategory mappings')
+    parser.add_argument('--stream', action='store_true',
+                        help='constant-memory mode (iterparse, blocks written as they are generated)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes for RDF generation (default: 1)')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f're-emit only disorders changed since the previous run (manifest: {MANIFEST_FILE})')
+    parser.add_argument('--format', choices=['rdfxml', 'nt', 'nq'], default='rdfxml',
+                        help='output format: RDF/XML (default), N-Triples or N-Quads (named graph per source)')
+    parser.add_argument('--chunk-size', type=int, default=0, metavar='MB',
+                        help='nt/nq only: split the output into chunks of about MB megabytes (default: one file)')
+    parser.add_argument('--gzip', action='store_true',
+                        help='nt/nq only: gzip-compress the output files')
+    parser.add_argument('--profile-store', nargs='?', const=PROFILE_STORE_FILE, metavar='PATH',
+                        help=f'also write the binary disability profile store (default path: {PROFILE_STORE_FILE})')
+    parser.add_argument('--languages', nargs='+', metavar='LANG=FILE',
+                        help=f'also process per-language XML files: label triples + coverage report ({LABEL_COVERAGE_FILE})')
+    parser.add_argument('--verify', action='store_true',
+                        help=f'rdfxml only: verify the output against OFCO_thesaurus.owl (report: {VERIFICATION_FILE})')
+    ofco_metrics.add_arguments(parser, __file__)
+    args = parser.parse_args()
+    try:
+        languages = parse_language_files(args.languages or [])
+    except ValueError as e:
+        parser.error(str(e))
+    # checked before any output is written, a missing file would otherwise stop the run after the main output
+    missing_languages = [path for path in languages.values() if not os.path.isfile(path)]
+    if missing_languages:
+        print(f'\033[91m Error: {", ".join(missing_languages)} not found\033[0m')
         sys.exit(1)
+    if args.incremental and args.format != 'rdfxml':
+        parser.error('--incremental only supports the rdfxml format')
+    if args.verify and args.format != 'rdfxml':
+        parser.error('--verify only supports the rdfxml format')
+    quiet_mode = args.quiet
+    stream_mode = args.stream
+    metrics = RunMetrics(__file__, trace_memory=args.profile)
+
+    print('\033[93m Loading OFCO...\033[0m')
     
-    print('\033[93m RDF generation...\033[0m')
-    output_lines = []
+    with metrics.stage('ontology load'):
+        try:
+            model = load_ofco(OFCO_FILE)
+        except FileNotFoundError:
+            print(f'\033[91m Error: {OFCO_FILE} not found\033[0m')
+            sys.exit(1)
+    
+    with metrics.stage('mapping extraction'):
+        mappings = get_ontology_mappings(model)
     
-    output_lines.extend([
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<rdf:RDF',
-        '    xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"',
-        '    xmlns:owl="http://www.w3.org/2002/07/owl#"',
-        '    xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"',
-        '    xmlns:ordo="http://www.orpha.net/ORDO/"',
-        '    xmlns:ofco="https://w3id.org/ofco/"',
-        '    xmlns:icf="http://id.who.int/icf/"',
-        '    xmlns:xsd="http://www.w3.org/2001/XMLSchema#">'
-    ])
+    if args.incremental:
+        # Incremental: previous output + manifest, full rebuild when OFCO or its mappings changed
+        print('\033[93m Checking previous run...\033[0m')
+        try:
+            open(XML_FILE, 'rb').close()
+        except FileNotFoundError:
+            print(f'\033[91m Error: {XML_FILE} not found\033[0m')
+            sys.exit(1)
+        with metrics.stage('previous run load'):
+            ofco_hash = file_sha256(OFCO_FILE)
+            maps_hash = mappings_sha256(mappings)
+            previous, reason = load_previous_run(ofco_hash, maps_hash)
+        if previous is None:
+            print(f'\033[93m Full rebuild: {reason}\033[0m')
+            previous = defaultdict(deque)
+        relevances = None
+    elif args.workers > 1:
+        # Workers: the XML file is sharded without being parsed in this process
+        print(f'\033[93m Sharding XML dataset across {args.workers} workers...\033[0m')
+        try:
+            open(XML_FILE, 'rb').close()
+        except FileNotFoundError:
+            print(f'\033[91m Error: {XML_FILE} not found\033[0m')
+            sys.exit(1)
+        relevances = None
+    elif stream_mode:
+        # Streaming: DisorderDisabilityRelevance elements are parsed and released one by one
+        # (the parse time is measured in the generation loop)
+        print('\033[93m Streaming XML dataset...\033[0m')
+        try:
+            xml_source = open(XML_FILE, 'rb')
+        except FileNotFoundError:
+            print(f'\033[91m Error: {XML_FILE} not found\033[0m')
+            sys.exit(1)
+        relevances = iter_relevances(xml_source)
+    else:
+        print('\033[93m Loading XML dataset...\033[0m')
+        with metrics.stage('XML load'):
+            try:
+                xml_tree = ET.parse(XML_FILE)
+                xml_root = xml_tree.getroot()
+            except FileNotFoundError:
+                print(f'\033[91m Error: {XML_FILE} not found\033[0m')
+                sys.exit(1)
+            relevances = xml_root.findall('.//DisorderDisabilityRelevance')
     
+    print('\033[93m RDF generation...\033[0m')
     processed_disorders = 0
+    warnings = Counter()
     
-    for relevance in xml_root.findall('.//DisorderDisabilityRelevance'):
-        disorder = relevance.find('Disorder')
-        if disorder is None:
-            continue
-        
-        orpha_code_elem = disorder.find('OrphaCode')
-        disorder_name_elem = disorder.find("Name[@lang='en']")
-        if orpha_code_elem is None or disorder_name_elem is None:
-            continue
-        
-        orpha_code = orpha_code_elem.text
-        disorder_name = xml_escape(disorder_name_elem.text)
-        
-        output_lines.extend([
-            '',
-            f'  ',
-            f'  <owl:Class rdf:about="http://www.orpha.net/ORDO/Orphanet_{orpha_code}">'
-            f'    <ofco:hasOrphanetDiseaseLink rdf:resource="https://www.orpha.net/en/disease/detail/{orpha_code}"/>',
-            f'    <ofco:hasOrphanetDisabilityLink rdf:resource="https://www.orpha.net/en/disease/disability/detail/{orpha_code}"/>'
-        ])
-        
-        # hasSpecificManagement stays on the disorder
-        specific_management = relevance.find('SpecificManagement')
-        if specific_management is not None and specific_management.text:
-            bool_val = 'true' if specific_management.text.lower().startswith('y') else 'false'
-            output_lines.append(
-                f'    <ofco:hasSpecificManagement rdf:datatype="xsd:boolean">{bool_val}</ofco:hasSpecificManagement>'
-            )
-        
-        # DisabilityCategory (always include if mapped)
-        disability_category = relevance.find('DisabilityCategory')
-        if disability_category is not None:
-            orpha_number_node = disability_category.find('OrphaNumber')
-            name_node = disability_category.find("Name[@lang='en']")
-            if orpha_number_node is not None and orpha_number_node.text:
-                orpha_number = orpha_number_node.text.strip()
-                category_uri = mappings['OrphaNumbers'].get(orpha_number)
-                if category_uri:
-                    output_lines.extend([
-                        f'    ',
-                        f'    <ofco:hasDisabilityCategory rdf:resource="{category_uri}"/>'
-                    ])
-                elif not quiet_mode:
-                    print(f'\033[93m Warning: DisabilityCategory OrphaNumber {orpha_number} not found in ontology\033[0m')
-        
-        # ReasonForNotApplicable (Processed after DisabilityCategory)
-        reason_not_applicable = relevance.find('ReasonForNotApplicable')
-        if reason_not_applicable is not None:
-            orpha_node = reason_not_applicable.find('OrphaNumber')
-            name_node = reason_not_applicable.find("Name[@lang='en']")
-            
-            if orpha_node is not None and orpha_node.text:
-                orpha_number = orpha_node.text.strip()
-                # IRI mappings based on OrphaNumbers
-                if orpha_number in mappings['OrphaNumbers']:
-                    uri = mappings['OrphaNumbers'][orpha_number]
-                    output_lines.extend([
-                        f'    ',
-                        f'    <ofco:hasReasonForNotApplicable rdf:resource="{uri}"/>'
-                    ])
-                elif not quiet_mode:
-                    print(f'\033[93m Warning: ReasonForNotApplicable OrphaNumber {orpha_number} not found in ontology\033[0m')
-        
-        # DisabilityDisorderAssociationList - using blank nodes
-        associations = disorder.findall('DisabilityDisorderAssociationList/DisabilityDisorderAssociation')
-        for association in associations:
-            disability = association.find('Disability')
-            if disability is None:
-                continue
-            disability_id = disability.get('id')
-            disability_name_elem = disability.find("Name[@lang='en']")
-            if disability_name_elem is None:
-                continue
-            disability_name = xml_escape(disability_name_elem.text)
-            
-            output_lines.extend([
-                '',
-                f'    ',
-                '    <ofco:hasDisabilityAnnotation rdf:parseType="Resource">',
-                '      <rdf:type rdf:resource="https://w3id.org/ofco/DisabilityDisorderAssociation"/>'
-            ])
-            
-            # Check disability URI
-            if disability_id in mappings['Disabilities']:
-                disability_uri = mappings['Disabilities'][disability_id]
-                output_lines.append(f'      <ofco:concernsDisability rdf:resource="{disability_uri}"/>')
-            else:
-                if not quiet_mode:
-                    print(f'\033[93m  Disability ID {disability_id} not found in ontology\033[0m')
-            
-            # Frequency / Temporality / Severity
-            for tag, predicate in [
-                ('FrequenceDisability', 'hasFrequency'),
-                ('TemporalityDisability', 'hasTemporality'),
-                ('SeverityDisability', 'hasSeverity')
-            ]:
-                elem = association.find(tag)
-                if elem is not None and len(elem) > 0:
-                    orpha_number_node = elem.find('OrphaNumber')
-                    if orpha_number_node is not None and orpha_number_node.text:
-                        orpha_number = orpha_number_node.text
-                        if orpha_number in mappings['OrphaNumbers']:
-                            uri = mappings['OrphaNumbers'][orpha_number]
-                            output_lines.append(f'      <ofco:{predicate} rdf:resource="{uri}"/>')
-            
-            # LossOfAbility
-            loss_of_ability = association.find('LossOfAbility')
-            if loss_of_ability is not None and loss_of_ability.text:
-                loss_value = convert_loss_of_ability(loss_of_ability.text)
-                if loss_value in ('true', 'false'):
-                    output_lines.append(
-                        f'      <ofco:lossOfAbility rdf:datatype="xsd:boolean">{loss_value}</ofco:lossOfAbility>'
-                    )
-            
-            output_lines.append('    </ofco:hasDisabilityAnnotation>')
-        
-        output_lines.append('  </owl:Class>')
-        processed_disorders += 1
+    if args.format == 'rdfxml':
+        formatter = format_owl_class
+        # Each owl:Class block goes straight to the (buffered) output file
+        # (a temporary file in incremental mode, the previous output is still read)
+        output_path = OUTPUT_FILE + '.tmp' if args.incremental else OUTPUT_FILE
+        output = open(output_path, 'w', encoding='utf-8', buffering=1024 * 1024)
+        output.write(RDF_HEADER)
+    else:
+        graph = None
+        if args.format == 'nq':
+            graph = GRAPH_BASE + quote(os.path.splitext(os.path.basename(XML_FILE))[0])
+        formatter = partial(format_ntriples, graph=graph)
+        output = ChunkedWriter(OUTPUT_BASENAME, '.' + args.format, args.chunk_size * 1024 * 1024, args.gzip)
+    
+    with output as f:
+        if args.incremental:
+            # regenerated blocks and copies of the unchanged ones, written as they come
+            with metrics.stage('RDF generation'):
+                entries, changes = generate_incremental(f, mappings, warnings, previous)
+            processed_disorders = sum(1 for entry in entries if entry[2])
+            metrics.count('regenerated_disorders', len(changes['added']) + len(changes['changed']), stage='RDF generation')
+        elif relevances is None:
+            # XML sharding, generation in the workers and write of their results overlap
+            with metrics.stage('RDF generation'):
+                processed_disorders = generate_parallel(f, mappings, args.workers, metrics, formatter)
+        else:
+            profiles = ProfileStoreWriter(args.profile_store) if args.profile_store else None
+            # XML load (streaming parse) / RDF generation / write times of the loop
+            clock = time.perf_counter
+            parse_seconds = generate_seconds = write_seconds = 0.0
+            associations = 0
+            # one tracemalloc peak for the loop, shared by its three stages
+            with metrics.peak('streaming loop'):
+                items = iter(relevances)
+                while True:
+                    start = clock()
+                    relevance = next(items, None)
+                    parsed = clock()
+                    parse_seconds += parsed - start
+                    if relevance is None:
+                        break
+                    record = extract_disorder(relevance, mappings, warnings)
+                    if record is None:
+                        generate_seconds += clock() - parsed
+                        continue
+                    text = formatter(record)
+                    generated = clock()
+                    generate_seconds += generated - parsed
+                    f.write(text)
+                    if profiles is not None:
+                        profiles.add(record)
+                    write_seconds += clock() - generated
+                    processed_disorders += 1
+                    associations += len(record['associations'])
+            metrics.add_time('XML load', parse_seconds, traced=False)
+            metrics.add_time('RDF generation', generate_seconds, traced=False)
+            metrics.add_time('write', write_seconds, traced=False)
+            metrics.count('associations', associations, stage='RDF generation')
+            if profiles is not None:
+                with metrics.stage('profile store'):
+                    profiles.close()
+        if args.format == 'rdfxml':
+            f.write(RDF_FOOTER)
+    metrics.count('disorders', processed_disorders, stage='RDF generation')
+    metrics.add_warnings(warnings)
     
-    output_lines.extend(['', '</rdf:RDF>'])
+    if stream_mode and relevances is not None:
+        xml_source.close()
     
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(output_lines))
+    if args.incremental:
+        with metrics.stage('write'):
+            os.replace(output_path, OUTPUT_FILE)
+            write_manifest(entries, ofco_hash, maps_hash)
+
+    if args.verify:
+        print('\033[93m Verifying output...\033[0m')
+        with metrics.stage('verification'):
+            verification = verify_output(OUTPUT_FILE, model, OFCO_FILE)
+        with open(VERIFICATION_FILE, 'w', encoding='utf-8') as f:
+            json.dump(verification, f, indent=2, ensure_ascii=False)
+        if verification['errors']:
+            print_report(verification)
+
+    if args.profile_store and relevances is None:
+        with metrics.stage('profile store'):
+            write_profile_store(args.profile_store, mappings)
+
+    if languages:
+        print(f'\033[93m Processing {len(languages)} language files...\033[0m')
+        try:
+            with metrics.stage('languages'):
+                coverage = generate_languages(languages, mappings, model, max(args.workers, os.cpu_count() or 1), metrics)
+        except FileNotFoundError as e:
+            print(f'\033[91m Error: {e.filename} not found\033[0m')
+            sys.exit(1)
+        metrics.count('languages', len(languages), stage='languages')
     
+    if not quiet_mode:
+        for line in metrics.warning_lines():
+            print(f'\033[93m {line}\033[0m')
     print('\033[92m\\o/ RDF disabilities conversion done!\033[0m')
     print(f'\033[97m   - Diseases processed: {processed_disorders}\033[0m')
-    print(f'\033[97m   - Output file: {OUTPUT_FILE}\033[0m')
+    if args.incremental:
+        print_changes(changes)
+    if args.format == 'rdfxml':
+        print(f'\033[97m   - Output file: {OUTPUT_FILE}\033[0m')
+    else:
+        print(f'\033[97m   - Output files: {", ".join(output.files)}\033[0m')
+    if args.profile_store:
+        print(f'\033[97m   - Profile store: {args.profile_store}\033[0m')
+    if languages:
+        for lang, stats in coverage['languages'].items():
+            print(f'\033[97m   - [{lang}] {stats["labels_file"]}: {stats["labelled_disorders"]}/{coverage["disorders"]} disorders labelled, '
+                  f'{len(stats["missing_ofco_labels"])} OFCO entities without a label\033[0m')
+        print(f'\033[97m   - Label coverage: {LABEL_COVERAGE_FILE}\033[0m')
+    if args.verify:
+        color = '91' if verification['errors'] else '97'
+        print(f'\033[{color}m   - Verification: {verification["errors"]} errors ({VERIFICATION_FILE})\033[0m')
+    metrics.report(args.metrics_json, profile=args.profile)
+    if args.verify and verification['errors']:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -1,9 +1,35 @@
+# Generate the ICF <> OFCO thesaurus mapping set in SSSOM format from the Excel mappings
+# The workbook is streamed with openpyxl read-only mode and processed by chunks of rows,
+# subject labels are computed with vectorized column operations (back-fill across the
+# hierarchy columns). The TSV starts with the SSSOM YAML metadata block (curie_map...).
+# subject_id is the ICF code as a CURIE (b144 and ICF:b144 -> ICF:b144). Mappings without an ICF
+# code (empty or "NC": the OFCO concept is mapped by URI only) are kept with subject_id
+# sssom:NoTermFound and a comment, rows without a relationship (hierarchy headings) are skipped.
+# --profile / --metrics-json [PATH]: workbook read / conversion / write time and memory (ofco_metrics.py)
+# Usage: python generate_sssom.py [--input xlsx] [--output tsv] [--profile] [--metrics-json [PATH]]
+
+import re
+import csv
+import argparse
 import pandas as pd
+from openpyxl import load_workbook
+import ofco_metrics
+from ofco_metrics import RunMetrics
 
 input_file = 'data/input/Mapping Orphanet-ICF 1.xlsx'
 output_file = 'data/input/mappings_sssom.tsv'
 
-df = pd.read_excel(input_file)
+# Rows read from the workbook per DataFrame chunk
+CHUNK_SIZE = 50000
+
+# Workbook columns: 0-4 hierarchy levels (label), 5 relationship to code, 6 ICF code,
+# 7 relationship to uri, 8 ICF uri
+HIERARCHY_COLUMNS = 5
+
+# ICF code of column 6, with or without its ICF: prefix (b144, d1320, ICF:e2400, s730)
+ICF_CODE_PATTERN = r'^(?:ICF:)?([bdes]\d+)$'
+NO_CODE_SUBJECT = 'sssom:NoTermFound'
+NO_CODE_COMMENT = 'No ICF code in the workbook: the OFCO concept of subject_label is mapped to the ICF entity by URI only'
 
 predicate_map = {
     'E': 'skos:exactMatch',
@@ -11,27 +37,166 @@ predicate_map = {
     'NTBT': 'skos:narrowMatch'
 }
 
-def get_subject_label(row):
-    for i in range(5):
-        val = row.iloc[i]
-        if pd.notna(val) and str(val).strip() != '':
-            return str(val).strip()
-    return ''
-
-sssom_df = pd.DataFrame({
-    'subject_id': df.iloc[:,6],
-    'subject_label': df.apply(get_subject_label, axis=1),
-    'predicate_id': df.iloc[:,7].map(predicate_map).fillna(df.iloc[:,7]),
-    'object_id': df.iloc[:,8],
+curie_map = {
+    'ICF': 'http://id.who.int/icf/',
+    'icd.entity': 'http://id.who.int/icd/entity/',
+    'orcid': 'https://orcid.org/',
+    'semapv': 'https://w3id.org/semapv/vocab/',
+    'skos': 'http://www.w3.org/2004/02/skos/core#',
+    'sssom': 'https://w3id.org/sssom/'
+}
+
+mapping_set = {
+    'mapping_set_id': 'https://w3id.org/ofco/mappings/ofco_icf.sssom.tsv',
+    'mapping_set_title': 'ICF 2025 <> OFCO thesaurus mappings',
+    'license': 'https://creativecommons.org/licenses/by/4.0/',
     'mapping_date': '2025-09-03',
-    'mapping_type': 'semapv:ManualMappingCuration',
-    'author_id': 'orcid.org/0000-0003-4308-6337', # Ana Rath
+    'subject_source_version': '2025-01',
+    'author_id': 'orcid:0000-0003-4308-6337',  # Ana Rath
     'author_label': 'Dr Rami Nadji',
-    #'curator_id': 'orcid.org/0009-0006-1234-2915|orcid.org/0000-0001-9773-4008' # pauline lubet | Andra Waagmeester
-    #'subject_source': 'http://who.int/icf' or 'icf:icf' or 'icd:icd11' TODO review 
-    'subject_source_version': '2025-01'
-})
-# Add comments ? license ? confidence ?
-
-sssom_df.to_csv(output_file, sep='\t', index=False)
-print(f"SSSOM generated in {output_file}")
+    #'curator_id': 'orcid:0009-0006-1234-2915|orcid:0000-0001-9773-4008' # pauline lubet | Andra Waagmeester
+    #'subject_source': 'http://who.int/icf' or 'icf:icf' or 'icd:icd11' TODO review
+}
+
+
+def iter_workbook_chunks(path, chunk_size=CHUNK_SIZE):
+    """Stream the first sheet of the workbook as DataFrames of chunk_size rows (header row skipped)"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=2, values_only=True)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk)
+    finally:
+        workbook.close()
+
+
+def to_sssom(df):
+    """
+    Vectorized conversion of a chunk of workbook rows to SSSOM rows: returns (SSSOM DataFrame,
+    number of rows with an ICF uri skipped for lack of a known relationship)
+    """
+    df = df.reindex(columns=range(9))
+    # Subject label: first non-empty hierarchy column (back-fill across the columns)
+    hierarchy = df.iloc[:, :HIERARCHY_COLUMNS].astype('string').apply(lambda col: col.str.strip())
+    subject_label = hierarchy.mask(hierarchy == '').bfill(axis=1).iloc[:, 0].fillna('')
+
+    relationship = df.iloc[:, 7].astype('string').str.strip()
+    predicate_id = relationship.map(predicate_map)
+    subject_id = 'ICF:' + df.iloc[:, 6].astype('string').str.strip().str.extract(ICF_CODE_PATTERN, expand=False)
+    object_id = df.iloc[:, 8].astype('string').str.strip()
+    # full IRIs -> CURIEs (SSSOM entity references), unknown namespaces are kept as is
+    for prefix, namespace in curie_map.items():
+        object_id = object_id.str.replace('^' + re.escape(namespace), f'{prefix}:', regex=True)
+
+    valid = predicate_id.notna() & object_id.notna()
+    skipped = int((object_id.notna() & ~valid).sum())
+    return pd.DataFrame({
+        'subject_id': subject_id.fillna(NO_CODE_SUBJECT),
+        'subject_label': subject_label,
+        'predicate_id': predicate_id,
+        'object_id': object_id,
+        'mapping_date': mapping_set['mapping_date'],
+        'mapping_justification': 'semapv:ManualMappingCuration',
+        'author_id': mapping_set['author_id'],
+        'author_label': mapping_set['author_label'],
+        'subject_source_version': mapping_set['subject_source_version'],
+        'comment': subject_id.isna().map({True: NO_CODE_COMMENT, False: ''}),
+    })[valid.to_numpy()], skipped
+
+
+def metadata_block():
+    """SSSOM metadata (YAML) as '#' comment lines"""
+    lines = ['curie_map:']
+    lines += [f'  {prefix}: {namespace}' for prefix, namespace in curie_map.items()]
+    for key in ('mapping_set_id', 'mapping_set_title', 'license', 'mapping_date'):
+        lines.append(f'{key}: {mapping_set[key]}')
+    return ''.join(f'#{line}\n' for line in lines)
+
+
+def read_sssom(path, with_lines=False):
+    """
+    Read a SSSOM TSV written by generate(): returns (metadata, rows)
+    metadata: dict of the '#' YAML block (only flat keys and the curie_map mapping are read)
+    rows: generator of dicts, CURIEs of object_id expanded to full IRIs with the curie_map
+    (with_lines: (line number in the file, dict) pairs, the metadata block and header counted)
+    """
+    f = open(path, encoding='utf-8', newline='')
+    metadata = {}
+    header_line = 1
+    line = f.readline()
+    while line.startswith('#'):
+        header_line += 1
+        text = line[1:].rstrip('\n')
+        if text.startswith('  ') and isinstance(metadata.get('curie_map'), dict):
+            prefix, _, namespace = text.strip().partition(': ')
+            metadata['curie_map'][prefix] = namespace
+        else:
+            key, _, value = text.partition(':')
+            metadata[key.strip()] = value.strip() or {}
+        line = f.readline()
+    prefixes = metadata.get('curie_map') or curie_map
+
+    def rows():
+        with f:
+            header = line.rstrip('\r\n').split('\t')
+            reader = csv.DictReader(f, fieldnames=header, delimiter='\t')
+            for row in reader:
+                prefix, sep, local = row['object_id'].partition(':')
+                if sep and prefix in prefixes:
+                    row['object_id'] = prefixes[prefix] + local
+                yield (header_line + reader.line_num, row) if with_lines else row
+
+    return metadata, rows()
+
+
+def generate(input_path, output_path, chunk_size=CHUNK_SIZE, metrics=None):
+    """
+    Write the SSSOM TSV, returns (mappings written, workbook rows with an ICF uri skipped for lack
+    of a known relationship), stage timings recorded in metrics if given
+    """
+    if metrics is None:
+        metrics = RunMetrics(__file__)
+    rows = skipped = 0
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(metadata_block())
+        chunks = iter_workbook_chunks(input_path, chunk_size)
+        while True:
+            # the stages of a chunk interleave: each one accumulates its time over the chunks
+            with metrics.stage('workbook read'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            with metrics.stage('SSSOM conversion'):
+                sssom_df, chunk_skipped = to_sssom(chunk)
+            with metrics.stage('write'):
+                sssom_df.to_csv(f, sep='\t', index=False, header=(rows == 0), lineterminator='\n')
+            rows += len(sssom_df)
+            skipped += chunk_skipped
+    metrics.count('mappings', rows, stage='SSSOM conversion')
+    return rows, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate SSSOM mappings from the Orphanet-ICF workbook')
+    parser.add_argument('--input', default=input_file, help=f'Excel mappings (default: {input_file})')
+    parser.add_argument('--output', default=output_file, help=f'SSSOM TSV (default: {output_file})')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows per processing chunk')
+    ofco_metrics.add_arguments(parser, __file__)
+    args = parser.parse_args()
+    metrics = RunMetrics(__file__, trace_memory=args.profile)
+
+    rows, skipped = generate(args.input, args.output, args.chunk_size, metrics)
+    print(f"SSSOM generated in {args.output} ({rows} mappings)")
+    if skipped:
+        print(f"Warning: {skipped} workbook rows with an ICF uri but no known relationship skipped")
+    metrics.report(args.metrics_json, profile=args.profile)
+
+
+if __name__ == '__main__':
+    main()
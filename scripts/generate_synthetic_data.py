@@ -0,0 +1,246 @@
+# Synthetic datasets for the OFCO pipeline benchmarks
+# Marc Hanauer @Orphanet 2025
+# Generates, at configurable sizes, files with the same structure as the real inputs:
+#   - OFCO_thesaurus.owl: the real thesaurus + synthetic classes in deep rdfs:subClassOf chains,
+#     each with label, efo:definition, ORPHANETDB internal reference restriction, hasICFuri
+#     and the matching owl:Axiom blocks (ECO_0000218, versionInfo, hasICFcode)
+#   - Disability_Orphanet_annotations.xml: DisorderDisabilityRelevance elements as read by
+#     disaxml_ofco_parser.py (disabilities, frequency / temporality / severity, LossOfAbility,
+#     SpecificManagement, DisabilityCategory / ReasonForNotApplicable)
+#   - Mapping Orphanet-ICF 1.xlsx: the mapping workbook layout read by generate_sssom.py
+# Files are written in streaming (no full document in memory) and are reproducible (--seed).
+#
+# Usage : python generate_synthetic_data.py --output-dir bench/x10 [--scale 10] [--associations 4]
+#                                           [--thesaurus-scale 10] [--depth 8] [--axioms 2] [--seed 42]
+
+import os
+import sys
+import random
+import argparse
+from xml.sax.saxutils import escape
+
+from openpyxl import Workbook
+
+from ofco_loader import (parse_ofco, axiom_value, OFCO_NS, HAS_INTERNAL_REFERENCE, HAS_ORPHA_NUMBER,
+                         HAS_ICF_URI, HAS_ICF_CODE, ECO_0000218)
+
+OWL_FILE = "OFCO_thesaurus.owl"
+XML_FILE = "Disability_Orphanet_annotations.xml"
+WORKBOOK_FILE = "Mapping Orphanet-ICF 1.xlsx"
+
+# Disorders of the 1x dataset (order of magnitude of the Orphanet functioning annotations)
+BASE_DISORDERS = 1000
+# First ORPHANETDB internal reference / OrphaCode of the synthetic entities
+SYNTHETIC_REFERENCE_START = 100000
+FIRST_ORPHA_CODE = 1000
+
+MANUAL_ASSERTIONS = (
+    ("E", "E (Exact mapping: the two concepts are equivalent)"),
+    ("BTNT", "BTNT (broader term maps to a narrower term)"),
+    ("NTBT", "NTBT (narrower term maps to a broader term)"),
+)
+
+WORDS = ("moving", "hand", "walking", "speech", "reading", "memory", "social", "care", "sleep",
+         "vision", "hearing", "eating", "learning", "school", "work", "play", "balance", "fine")
+
+
+def qualifier_numbers(model):
+    """OrphaNumbers of the qualifier values of the thesaurus, by parent class"""
+    numbers = {iri: number for number, iri in model.restriction_index(HAS_ORPHA_NUMBER).items()}
+
+    def under(parent):
+        return [numbers[c] for c in model.children(OFCO_NS + parent) if c in numbers]
+
+    return {
+        "FrequenceDisability": under("FrequencyAssociation"),
+        "TemporalityDisability": under("temporality"),
+        "SeverityDisability": under("SeverityDisability"),
+        "DisabilityCategory": [numbers[OFCO_NS + c] for c in ("NotApplicable", "NoFunctionalDisability")
+                               if OFCO_NS + c in numbers],
+        "ReasonForNotApplicable": under("NotApplicable"),
+    }
+
+
+def _synthetic_class(rng, number, reference, parent, axioms):
+    iri = f"{OFCO_NS}Synthetic{number}"
+    words = " ".join(rng.choice(WORDS) for _ in range(3))
+    lines = [
+        f'    <!-- {iri} -->',
+        '',
+        f'    <owl:Class rdf:about="{iri}">',
+        '        <owl:equivalentClass>',
+        '            <owl:Class>',
+        '                <owl:intersectionOf rdf:parseType="Collection">',
+        '                    <owl:Restriction>',
+        '                        <owl:onProperty rdf:resource="https://w3id.org/ofco/hasORPHANETDBInternalReference"/>',
+        f'                        <owl:hasValue rdf:datatype="http://www.w3.org/2001/XMLSchema#integer">{reference}</owl:hasValue>',
+        '                    </owl:Restriction>',
+        '                </owl:intersectionOf>',
+        '            </owl:Class>',
+        '        </owl:equivalentClass>',
+        f'        <rdfs:subClassOf rdf:resource="{parent}"/>',
+        f'        <efo:definition xml:lang="en">Synthetic concept {number}: {words}.</efo:definition>',
+        f'        <rdfs:label xml:lang="en">Synthetic {words} {number}</rdfs:label>',
+    ]
+    mappings = [(f"http://id.who.int/icd/entity/{9000000000 + number * 10 + i}",
+                 f"ICF:d{number}{i}", rng.choice(MANUAL_ASSERTIONS)[1]) for i in range(axioms)]
+    lines += [f'        <hasICFuri rdf:resource="{uri}"/>' for uri, code, manual in mappings]
+    lines.append('    </owl:Class>')
+    for uri, code, manual in mappings:
+        lines += [
+            '    <owl:Axiom>',
+            f'        <owl:annotatedSource rdf:resource="{iri}"/>',
+            '        <owl:annotatedProperty rdf:resource="https://w3id.org/ofco/hasICFuri"/>',
+            f'        <owl:annotatedTarget rdf:resource="{uri}"/>',
+            f'        <obo:ECO_0000218>{manual}</obo:ECO_0000218>',
+            '        <owl:versionInfo>ICF 2025-01</owl:versionInfo>',
+            f'        <hasICFcode>{code}</hasICFcode>',
+            '    </owl:Axiom>',
+        ]
+    return iri, "\n".join(lines) + "\n\n\n\n"
+
+
+def write_thesaurus(source, path, extra_classes, depth=8, axioms=2, seed=42):
+    """
+    Real thesaurus + extra_classes synthetic classes, in rdfs:subClassOf chains of depth classes
+    hanging from random classes under ActivitiesAndParticipation. Returns the synthetic IRIs.
+    """
+    rng = random.Random(seed)
+    model = parse_ofco(source)
+    anchors = _descendants(model, OFCO_NS + "ActivitiesAndParticipation")
+    with open(source, encoding="utf-8") as f:
+        text = f.read()
+    end = text.rindex("</rdf:RDF>")
+    created = []
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(text[:end])
+        parent = None
+        for number in range(extra_classes):
+            if number % depth == 0:
+                parent = rng.choice(anchors)
+            iri, block = _synthetic_class(rng, number, SYNTHETIC_REFERENCE_START + number, parent, axioms)
+            out.write(block)
+            created.append(iri)
+            parent = iri
+        out.write(text[end:])
+    return created
+
+
+def _descendants(model, root):
+    """rdfs:subClassOf descendants of root (root excluded)"""
+    found, stack = {}, list(model.children(root))
+    while stack:
+        iri = stack.pop()
+        if iri not in found:
+            found[iri] = True
+            stack.extend(model.children(iri))
+    return list(found)
+
+
+def write_annotations(path, disability_ids, qualifiers, disorders, associations=4, seed=42):
+    """DisorderDisabilityRelevance XML, associations per disorder drawn around the given mean"""
+    rng = random.Random(seed)
+    written = 0
+    with open(path, "w", encoding="utf-8", buffering=1024 * 1024) as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        out.write('<JDBOR date="2025-01-01 00:00:00" version="1.3.0 / 4.1.7 [2025-01-01] (orientdb version)" '
+                  'copyright="Orphanet (c) 2025">\n')
+        out.write(f'<DisorderDisabilityRelevanceList count="{disorders}">\n')
+        for i in range(disorders):
+            code = FIRST_ORPHA_CODE + i
+            parts = [f'<DisorderDisabilityRelevance><Disorder id="{i}"><OrphaCode>{code}</OrphaCode>'
+                     f'<ExpertLink lang="en">http://www.orpha.net/consor/cgi-bin/OC_Exp.php?lng=en&amp;Expert={code}</ExpertLink>'
+                     f'<Name lang="en">{escape(f"Synthetic disorder {code}")}</Name>'
+                     '<DisorderType id="21394"><Name lang="en">Disease</Name></DisorderType>']
+            count = max(0, min(2 * associations, len(disability_ids), int(rng.expovariate(1 / associations) + 0.5)))
+            category = None
+            if count == 0 and qualifiers["DisabilityCategory"]:
+                category = rng.choice(qualifiers["DisabilityCategory"])
+            parts.append(f'<DisabilityDisorderAssociationList count="{count}">')
+            # a disorder concerns each disability once (checked by ofco_verify_output.py)
+            for disability in rng.sample(disability_ids, count):
+                parts.append(f'<DisabilityDisorderAssociation><Disability id="{disability}">'
+                             f'<Name lang="en">Disability {disability}</Name></Disability>')
+                for tag in ("FrequenceDisability", "TemporalityDisability", "SeverityDisability"):
+                    if qualifiers[tag] and rng.random() < 0.85:
+                        parts.append(f'<{tag}><OrphaNumber>{rng.choice(qualifiers[tag])}</OrphaNumber>'
+                                     f'<Name lang="en">{tag}</Name></{tag}>')
+                parts.append(f'<LossOfAbility>{rng.choice("yyn")}</LossOfAbility>'
+                             '<Type>Disability</Type><Defined>y</Defined></DisabilityDisorderAssociation>')
+            parts.append('</DisabilityDisorderAssociationList></Disorder>')
+            parts.append(f'<SpecificManagement>{rng.choice(("yes", "no"))}</SpecificManagement>')
+            if category:
+                parts.append(f'<DisabilityCategory><OrphaNumber>{category}</OrphaNumber>'
+                             '<Name lang="en">Not applicable</Name></DisabilityCategory>')
+                if qualifiers["ReasonForNotApplicable"] and rng.random() < 0.5:
+                    parts.append(f'<ReasonForNotApplicable><OrphaNumber>{rng.choice(qualifiers["ReasonForNotApplicable"])}'
+                                 '</OrphaNumber><Name lang="en">Reason</Name></ReasonForNotApplicable>')
+            parts.append('</DisorderDisabilityRelevance>\n')
+            out.write("".join(parts))
+            written += count
+        out.write('</DisorderDisabilityRelevanceList>\n</JDBOR>\n')
+    return written
+
+
+def write_workbook(path, model):
+    """Mapping workbook (layout of 'Mapping Orphanet-ICF 1.xlsx') from the owl:Axiom ICF mappings"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Feuil1")
+    sheet.append(["Tag", None, None, None, None, "relationship to code", "ICF code",
+                  "relationship to uri", "ICF uri"])
+    rows = 0
+    for axiom in model.axioms:
+        if axiom.property != HAS_ICF_URI:
+            continue
+        level = [None] * 5
+        level[rows % 5] = model.label(axiom.source, "en") or ""
+        relationship = axiom_value(axiom, ECO_0000218).split(" ", 1)[0]
+        sheet.append(level + [relationship, axiom_value(axiom, HAS_ICF_CODE) or None, relationship, axiom.target])
+        rows += 1
+    workbook.save(path)
+    return rows
+
+
+def generate(output_dir, source=OWL_FILE, scale=1, associations=4, thesaurus_scale=1,
+             depth=8, axioms=2, seed=42):
+    """Write the three files in output_dir, returns their sizes (disorders, associations, classes...)"""
+    os.makedirs(output_dir, exist_ok=True)
+    source_model = parse_ofco(source)
+    extra = int(len(source_model.classes) * (thesaurus_scale - 1))
+    owl_path = os.path.join(output_dir, OWL_FILE)
+    write_thesaurus(source, owl_path, extra, depth, axioms, seed)
+
+    model = parse_ofco(owl_path)
+    disability_ids = sorted(model.restriction_index(HAS_INTERNAL_REFERENCE), key=int)
+    disorders = int(BASE_DISORDERS * scale)
+    written = write_annotations(os.path.join(output_dir, XML_FILE), disability_ids,
+                                qualifier_numbers(model), disorders, associations, seed)
+    mappings = write_workbook(os.path.join(output_dir, WORKBOOK_FILE), model)
+    return {"disorders": disorders, "associations": written, "classes": len(model.classes),
+            "axioms": len(model.axioms), "mappings": mappings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic OFCO pipeline inputs")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--source", default=OWL_FILE, help=f"real thesaurus to extend (default: {OWL_FILE})")
+    parser.add_argument("--scale", type=float, default=1, help=f"disorders = {BASE_DISORDERS} x scale")
+    parser.add_argument("--associations", type=float, default=4, help="mean associations per disorder")
+    parser.add_argument("--thesaurus-scale", type=float, default=1, help="classes = real classes x scale")
+    parser.add_argument("--depth", type=int, default=8, help="length of the synthetic subClassOf chains")
+    parser.add_argument("--axioms", type=int, default=2, help="ICF mappings (owl:Axiom) per synthetic class")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        sizes = generate(args.output_dir, args.source, args.scale, args.associations,
+                         args.thesaurus_scale, args.depth, args.axioms, args.seed)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    print(f"Synthetic data in {args.output_dir}: " + ", ".join(f"{v} {k}" for k, v in sizes.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+# Resolver of the ICF entities targeted by ofco:hasICFuri, checked against the WHO ICF release
+# Marc Hanauer @Orphanet 2025
+# Every hasICFuri of OFCO_thesaurus.owl (owl:Axiom mappings and direct values) is resolved:
+#   - from a local ICF JSON dump (--dump): the whole file is walked once and every object with an
+#     "@id" (or "id" / "uri") and a "code" is indexed by its entity ID (the digits ending the URI)
+#   - otherwise from an ICD-API compatible HTTP endpoint (--api-url, {id} replaced by the entity ID)
+#     with an asyncio client: --concurrency keep-alive connections reused for all requests,
+#     --retries with exponential backoff on connection errors, 429 and 5xx (Retry-After honoured)
+# Resolved entities (found or 404) are kept in a persistent SQLite cache keyed by entity URI
+# (icf_entities.sqlite): a second run only queries the URIs it has never seen, --refresh ignores it.
+# The cache records the API URL that filled it and is emptied when opened with another one.
+# Checks: every URI ends with an entity ID, exists, its code matches ofco:hasICFcode (ICF:d110 == d110).
+# Output : JSON report (OFCO_ICF_resolution.json), exit code 1 when a URI is malformed, unknown, has
+# another code or could not be resolved. icf_stub_server.py serves a dump (or the OFCO mappings) locally
+# to test the client: python icf_resolver.py --api-url http://127.0.0.1:8081/icd/entity/{id}
+#
+# Usage : python icf_resolver.py [--dump icf_2025.json | --api-url URL] [--owl OFCO_thesaurus.owl]
+#                                [--cache icf_entities.sqlite] [--concurrency 8] [--retries 3]
+#                                [--output OFCO_ICF_resolution.json] [--refresh]
+# ICD-API access token (Bearer): environment variable ICD_API_TOKEN
+
+import os
+import re
+import ssl
+import sys
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from ofco_loader import load_ofco, axiom_value, HAS_ICF_CODE
+from ofco_icf_index import code_key
+
+OWL_FILE = "OFCO_thesaurus.owl"
+CACHE_FILE = "icf_entities.sqlite"
+OUTPUT_FILE = "OFCO_ICF_resolution.json"
+API_URL = "https://id.who.int/icd/release/11/2025-01/icf/{id}"
+CONCURRENCY = 8
+RETRIES = 3
+TIMEOUT = 30
+BACKOFF = 0.5
+TOKEN_VARIABLE = "ICD_API_TOKEN"
+CACHE_SCHEMA_VERSION = "1"
+
+ENTITY_ID_PATTERN = re.compile(r"/(\d+)/?$")
+
+# status: 200 found, 404 unknown, None not resolved (network / server errors after the retries)
+ICFEntity = namedtuple("ICFEntity", "uri status code title")
+ICFTarget = namedtuple("ICFTarget", "concept uri code")
+
+
+def entity_id(uri):
+    """'http://id.who.int/icd/entity/1367471462' -> '1367471462' (None if the URI has no entity ID)"""
+    match = ENTITY_ID_PATTERN.search(uri or "")
+    return match.group(1) if match else None
+
+
+def _title(value):
+    """ICD-API titles are {"@language": "en", "@value": "..."}, dumps may use plain strings"""
+    if isinstance(value, dict):
+        return value.get("@value")
+    return value
+
+
+def parse_entity(uri, payload):
+    """ICFEntity of an ICD-API entity response"""
+    return ICFEntity(uri, 200, payload.get("code") or None, _title(payload.get("title")))
+
+
+def load_icf_dump(path):
+    """{entity ID: (code, title)} of every object of a JSON dump with an @id / id / uri and a code"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    index = {}
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            key = entity_id(str(node.get("@id") or node.get("id") or node.get("uri") or ""))
+            if key and node.get("code"):
+                index.setdefault(key, (node["code"], _title(node.get("title"))))
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return index
+
+
+def icf_targets(model):
+    """ICFTarget of every hasICFuri: owl:Axiom mappings (with their hasICFcode) and direct values"""
+    targets = []
+    for iri in model.classes:
+        axioms = model.icf_axioms(iri)
+        for axiom in axioms:
+            targets.append(ICFTarget(iri, axiom.target, axiom_value(axiom, HAS_ICF_CODE)))
+        mapped = {axiom.target for axiom in axioms}
+        entity = model.get(iri)
+        codes = entity.icf_codes if len(entity.icf_uris) == 1 else ()
+        for uri in entity.icf_uris:
+            if uri not in mapped:
+                targets.append(ICFTarget(iri, uri, codes[0] if len(codes) == 1 else None))
+    return targets
+
+
+class EntityCache:
+    """
+    Persistent SQLite cache of resolved entities (found or 404), keyed by entity URI. The meta table
+    records the API URL that filled it: opened for another source, the cache is emptied
+    (previous_source is then the URL it was filled from)
+    """
+
+    def __init__(self, path, source):
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS entities (uri TEXT PRIMARY KEY, status INTEGER NOT NULL, "
+                                    "code TEXT, title TEXT, fetched TEXT NOT NULL)")
+            meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+            self.previous_source = meta.get("source") if meta.get("source") != source else None
+            if meta.get("schema_version") != CACHE_SCHEMA_VERSION or meta.get("source") != source:
+                self.connection.execute("DELETE FROM entities")
+                self.connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                            [("schema_version", CACHE_SCHEMA_VERSION), ("source", source)])
+
+    def get_many(self, uris):
+        found = {}
+        uris = list(uris)
+        for start in range(0, len(uris), 500):
+            chunk = uris[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT uri, status, code, title FROM entities WHERE uri IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((row[0], ICFEntity(*row)) for row in rows)
+        return found
+
+    def put_many(self, entities):
+        fetched = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?)",
+                                        [(e.uri, e.status, e.code, e.title, fetched)
+                                         for e in entities if e.status is not None])
+
+    def close(self):
+        self.connection.close()
+
+
+class HTTPStatusError(Exception):
+    """Retryable answer (429, 5xx), the connection can be reused when keep_alive"""
+
+    def __init__(self, status, retry_after=None, keep_alive=False):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+        self.keep_alive = keep_alive
+
+
+class ICDAPIClient:
+    """
+    asyncio HTTP/1.1 client of an ICD-API compatible endpoint: concurrency workers, each one
+    reusing its keep-alive connection, requests retried with exponential backoff
+    """
+
+    def __init__(self, url_template=API_URL, concurrency=CONCURRENCY, retries=RETRIES, timeout=TIMEOUT,
+                 token=None, language="en"):
+        self.url_template = url_template
+        parts = urlsplit(url_template)
+        self.host = parts.hostname
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.headers = {"Host": self.host if parts.port is None else f"{self.host}:{parts.port}",
+                        "Accept": "application/json", "Accept-Language": language, "API-Version": "v2"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self.requests = 0
+        self.retried = 0
+        self.connections = 0
+
+    def path(self, uri):
+        parts = urlsplit(self.url_template.replace("{id}", entity_id(uri)))
+        return parts.path + (f"?{parts.query}" if parts.query else "")
+
+    async def _connect(self):
+        self.connections += 1
+        return await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+
+    async def _get(self, connection, path):
+        """One request on an open connection, returns (status, body, keep-alive)"""
+        reader, writer = connection
+        head = f"GET {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in self.headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1"))
+        await writer.drain()
+        self.requests += 1
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by the server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if status == 429 or status >= 500:
+            retry_after = headers.get("retry-after", "")
+            raise HTTPStatusError(status, float(retry_after) if retry_after.isdigit() else None, keep_alive)
+        return status, body, keep_alive
+
+    async def _resolve(self, connection, uri):
+        """(ICFEntity, connection to reuse or None)"""
+        for attempt in range(self.retries + 1):
+            try:
+                if connection is None:
+                    connection = await self._connect()
+                status, body, keep_alive = await asyncio.wait_for(self._get(connection, self.path(uri)), self.timeout)
+                if not keep_alive:
+                    connection[1].close()
+                    connection = None
+                if status == 200:
+                    return parse_entity(uri, json.loads(body)), connection
+                return ICFEntity(uri, status if status == 404 else None, None, None), connection
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError,
+                    HTTPStatusError) as e:
+                if connection is not None and not getattr(e, "keep_alive", False):
+                    connection[1].close()
+                    connection = None
+                if attempt == self.retries:
+                    break
+                self.retried += 1
+                delay = getattr(e, "retry_after", None) or BACKOFF * 2 ** attempt * (1 + random.random())
+                await asyncio.sleep(delay)
+        return ICFEntity(uri, None, None, None), None
+
+    async def _worker(self, queue, results):
+        connection = None
+        try:
+            while True:
+                try:
+                    uri = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                results[uri], connection = await self._resolve(connection, uri)
+        finally:
+            if connection is not None:
+                connection[1].close()
+
+    async def resolve_many(self, uris):
+        """{uri: ICFEntity} of many URIs, at most concurrency requests in flight"""
+        queue = asyncio.Queue()
+        for uri in uris:
+            queue.put_nowait(uri)
+        results = {}
+        await asyncio.gather(*(self._worker(queue, results) for _ in range(min(self.concurrency, len(uris)))))
+        return results
+
+
+def resolve(uris, dump=None, client=None, cache=None):
+    """
+    {uri: ICFEntity}: from the dump index if given, otherwise from the cache then the API client
+    (entities found or unknown are added to the cache). URIs without an entity ID are skipped
+    """
+    uris = sorted(uri for uri in set(uris) if entity_id(uri))
+    if dump is not None:
+        entities = {}
+        for uri in uris:
+            found = dump.get(entity_id(uri))
+            entities[uri] = ICFEntity(uri, 200, *found) if found else ICFEntity(uri, 404, None, None)
+        return entities
+    entities = cache.get_many(uris) if cache is not None else {}
+    missing = [uri for uri in uris if uri not in entities]
+    if missing:
+        fetched = asyncio.run(client.resolve_many(missing))
+        if cache is not None:
+            cache.put_many(fetched.values())
+        entities.update(fetched)
+    return entities
+
+
+def check_targets(targets, entities):
+    """Findings {'malformed_uri': [...], 'unknown_uri': [...], 'code_mismatch': [...], 'unresolved': [...]}"""
+    findings = {"malformed_uri": [], "unknown_uri": [], "code_mismatch": [], "unresolved": []}
+    for target in targets:
+        row = {"concept": target.concept, "uri": target.uri, "hasICFcode": target.code}
+        if not entity_id(target.uri):
+            findings["malformed_uri"].append(row)
+            continue
+        entity = entities[target.uri]
+        if entity.status is None:
+            findings["unresolved"].append(row)
+        elif entity.status != 200:
+            findings["unknown_uri"].append(row)
+        elif target.code and code_key(target.code) != code_key(entity.code or ""):
+            findings["code_mismatch"].append({**row, "icf_code": entity.code, "icf_title": entity.title})
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the hasICFuri targets of OFCO against the WHO ICF release")
+    parser.add_argument("--dump", help="local ICF JSON dump (no HTTP requests)")
+    parser.add_argument("--api-url", default=API_URL, help=f"ICD-API entity URL, {{id}} = entity ID (default: {API_URL})")
+    parser.add_argument("--owl", default=OWL_FILE)
+    parser.add_argument("--cache", default=CACHE_FILE, help=f"persistent cache of the API responses (default: {CACHE_FILE})")
+    parser.add_argument("--refresh", action="store_true", help="query the API again for every URI")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="parallel keep-alive connections")
+    parser.add_argument("--retries", type=int, default=RETRIES)
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds per connection / request")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    try:
+        targets = icf_targets(load_ofco(args.owl))
+        dump = load_icf_dump(args.dump) if args.dump else None
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    uris = {target.uri for target in targets}
+    print(f"{len(targets)} hasICFuri mappings, {len(uris)} distinct ICF URIs")
+
+    start = time.perf_counter()
+    client = cache = None
+    if dump is not None:
+        print(f"ICF dump {args.dump}: {len(dump)} entities")
+    else:
+        client = ICDAPIClient(args.api_url, args.concurrency, args.retries, args.timeout, os.environ.get(TOKEN_VARIABLE))
+        if args.refresh and os.path.exists(args.cache):
+            os.remove(args.cache)
+        cache = EntityCache(args.cache, args.api_url)
+        if cache.previous_source:
+            print(f"Cache {args.cache} was filled from {cache.previous_source}, emptied")
+    try:
+        entities = resolve(uris, dump, client, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    seconds = time.perf_counter() - start
+    if client is not None:
+        print(f"{args.api_url}: {client.requests} requests, {client.retried} retries, "
+              f"{client.connections} connections, {seconds:.2f} s (cache: {args.cache})")
+
+    findings = check_targets(targets, entities)
+    report = {
+        "ontology": args.owl,
+        "source": args.dump or args.api_url,
+        "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "mappings": len(targets),
+        "uris": len(uris),
+        "findings": findings,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for name, rows in findings.items():
+        print(f"{'✓' if not rows else '✗'} {name:<16} {len(rows):>5}")
+        for row in rows[:5]:
+            print(f"      {row['concept'].rsplit('/', 1)[-1]}: {row['uri']} {row['hasICFcode'] or ''}"
+                  + (f" -> {row['icf_code']}" if "icf_code" in row else ""))
+    print(f"✓ Results written to: {args.output}")
+    return 1 if any(findings.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
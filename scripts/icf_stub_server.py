@@ -0,0 +1,138 @@
+# Local stub of the ICD-API entity endpoint, to test icf_resolver.py without the WHO servers
+# Marc Hanauer @Orphanet 2025
+# GET /.../{entity ID} answers {"@id", "code", "title": {"@language", "@value"}} like the ICD-API,
+# 404 for unknown entities. Entities come from an ICF JSON dump (--dump, same loader as
+# icf_resolver.py) or, by default, from the hasICFuri targets of OFCO_thesaurus.owl.
+# Faults can be injected to exercise the client: --missing N entities dropped (404), --wrong-codes N
+# entities with another code, --fail-rate P answers 503 at random, --close-rate P closes the
+# keep-alive connection after the response, --delay S seconds per request. HTTP/1.1 keep-alive.
+#
+# Usage : python icf_stub_server.py [--port 8081] [--dump icf_2025.json] [--owl OFCO_thesaurus.owl]
+#                                   [--missing 0] [--wrong-codes 0] [--fail-rate 0] [--close-rate 0] [--delay 0]
+# then  : python icf_resolver.py --api-url http://127.0.0.1:8081/icd/entity/{id} --cache stub_cache.sqlite
+
+import sys
+import json
+import random
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+from ofco_loader import load_ofco
+from icf_resolver import load_icf_dump, entity_id, icf_targets
+
+OWL_FILE = "OFCO_thesaurus.owl"
+HOST = "127.0.0.1"
+PORT = 8081
+REASONS = {200: "OK", 404: "Not Found", 503: "Service Unavailable"}
+
+
+def entities_from_ofco(model):
+    """{entity ID: (code, title)} of the hasICFuri targets of OFCO (code without the ICF: prefix)"""
+    entities = {}
+    for target in icf_targets(model):
+        key = entity_id(target.uri)
+        if key:
+            code = target.code.split(":", 1)[-1] if target.code else None
+            entities.setdefault(key, (code, model.label(target.concept)))
+    return entities
+
+
+def inject_faults(entities, missing, wrong_codes, seed):
+    """Drop missing entities and give wrong_codes others a wrong code, returns the changed IDs"""
+    rng = random.Random(seed)
+    keys = sorted(entities)
+    changed = rng.sample(keys, min(len(keys), missing + wrong_codes))
+    for key in changed[:missing]:
+        del entities[key]
+    for key in changed[missing:]:
+        code, title = entities[key]
+        entities[key] = ((code or "") + "9", title)
+    return changed[:missing], changed[missing:]
+
+
+class StubServer:
+    def __init__(self, entities, fail_rate=0.0, close_rate=0.0, delay=0.0, seed=42):
+        self.entities = entities
+        self.fail_rate = fail_rate
+        self.close_rate = close_rate
+        self.delay = delay
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    def answer(self, target):
+        if self.rng.random() < self.fail_rate:
+            return 503, {"error": "injected failure"}
+        key = entity_id(urlsplit(target).path)
+        if key not in self.entities:
+            return 404, {"error": "unknown entity"}
+        code, title = self.entities[key]
+        return 200, {"@id": f"http://id.who.int/icd/entity/{key}", "code": code,
+                     "title": {"@language": "en", "@value": title or ""}}
+
+    async def handle(self, reader, writer):
+        """One connection: requests answered in order until the client or the fault injection closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                status, payload = self.answer(request_line.decode("latin-1").split()[1])
+                body = json.dumps(payload).encode("utf-8")
+                keep_alive = self.rng.random() >= self.close_rate
+                writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                              "Content-Type: application/json\r\n"
+                              f"Content-Length: {len(body)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(stub, host=HOST, port=PORT):
+    server = await asyncio.start_server(stub.handle, host, port)
+    print(f"ICD-API stub on http://{host}:{port}/icd/entity/{{id}} (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the ICD-API entity endpoint")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--dump", help="ICF JSON dump (default: the ICF mappings of --owl)")
+    parser.add_argument("--owl", default=OWL_FILE)
+    parser.add_argument("--missing", type=int, default=0, help="entities dropped (404)")
+    parser.add_argument("--wrong-codes", type=int, default=0, help="entities served with another code")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--close-rate", type=float, default=0.0, help="share of responses closing the connection")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        entities = load_icf_dump(args.dump) if args.dump else entities_from_ofco(load_ofco(args.owl))
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    dropped, wrong = inject_faults(entities, args.missing, args.wrong_codes, args.seed)
+    print(f"{len(entities)} entities" + (f", dropped: {' '.join(dropped)}" if dropped else "")
+          + (f", wrong codes: {' '.join(wrong)}" if wrong else ""))
+    try:
+        asyncio.run(serve(StubServer(entities, args.fail_rate, args.close_rate, args.delay, args.seed), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# Load test of the OFCO lookup service (ofco_service.py)
+# Marc Hanauer @Orphanet 2025
+# --connections asyncio clients with keep-alive connections send --requests requests in total,
+# a mix of concept / ICF code / label search / disease profile lookups (and batches with --batch)
+# built from OFCO_thesaurus.owl and the profile store. Reports requests/s and p50 / p90 / p99
+# latency per endpoint and overall, non-200 responses are counted as errors (exit code 1).
+#
+# Usage : python loadtest_ofco_service.py [--url http://127.0.0.1:8080] [--requests 20000]
+#                                         [--connections 32] [--batch 0] [--seed 42]
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import quote, urlsplit
+
+from ofco_loader import load_ofco
+from ofco_to_csv import get_axiom_mappings
+from ofco_profile_store import ProfileStore, PROFILE_STORE_FILE
+
+OWL_FILE = "OFCO_thesaurus.owl"
+URL = "http://127.0.0.1:8080"
+REQUESTS = 20000
+CONNECTIONS = 32
+
+
+def build_requests(model, orpha_codes, count, batch=0, seed=42):
+    """[(endpoint, method, target, body)] drawn at random over the thesaurus and the disorders"""
+    rng = random.Random(seed)
+    concepts = [iri for iri in model.classes if model.label(iri)]
+    codes = sorted({m["code"] for iri in concepts for m in get_axiom_mappings(model, iri) if m["code"]})
+    words = sorted({w for iri in concepts for w in model.label(iri).split() if len(w) > 3})
+    kinds = [
+        ("concept", lambda: ("GET", "/concept/" + quote(rng.choice(concepts), safe=""), None)),
+        ("icf", lambda: ("GET", "/icf/" + quote(rng.choice(codes)), None)),
+        ("search", lambda: ("GET", "/search?q=" + quote(rng.choice(words)[:rng.randint(3, 8)]), None)),
+    ]
+    if orpha_codes:
+        kinds.append(("disease", lambda: ("GET", f"/disease/{rng.choice(orpha_codes)}", None)))
+    if batch:
+        kinds.append(("batch/concepts", lambda: ("POST", "/batch/concepts", {"iris": rng.sample(concepts, min(batch, len(concepts)))})))
+        if orpha_codes:
+            kinds.append(("batch/diseases", lambda: ("POST", "/batch/diseases",
+                                                     {"orpha_codes": rng.sample(orpha_codes, min(batch, len(orpha_codes)))})))
+    requests = []
+    for _ in range(count):
+        name, make = rng.choice(kinds)
+        method, target, payload = make()
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        requests.append((name, method, target, body))
+    return requests
+
+
+async def client(host, port, queue, latencies, errors):
+    """One keep-alive connection sending requests from the queue until it is empty"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                name, method, target, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            head = f"{method} {target} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n"
+            start = time.perf_counter()
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                if key.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.setdefault(name, []).append(time.perf_counter() - start)
+            if status != 200:
+                errors[name] = errors.get(name, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(url, requests, connections):
+    parts = urlsplit(url)
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies, errors = {}, {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(parts.hostname, parts.port or 80, queue, latencies, errors)
+                           for _ in range(min(connections, len(requests)))))
+    return time.perf_counter() - start, latencies, errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of ofco_service.py")
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--connections", type=int, default=CONNECTIONS)
+    parser.add_argument("--batch", type=int, default=0, help="also send batch requests of this many items")
+    parser.add_argument("--owl", default=OWL_FILE)
+    parser.add_argument("--profiles", default=PROFILE_STORE_FILE)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        model = load_ofco(args.owl)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    orpha_codes = []
+    if os.path.exists(args.profiles):
+        with ProfileStore(args.profiles) as store:
+            orpha_codes = [int(code) for code in store.keys()]
+    requests = build_requests(model, orpha_codes, args.requests, args.batch, args.seed)
+
+    try:
+        seconds, latencies, errors = asyncio.run(run(args.url, requests, args.connections))
+    except OSError as e:
+        print(f"Error: cannot reach {args.url}: {e}")
+        return 2
+
+    print(f"{len(requests)} requests, {args.connections} connections: {seconds:.2f} s, "
+          f"{len(requests) / seconds:.0f} requests/s")
+    print(f"{'endpoint':<18}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'errors':>8}")
+    everything = []
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        everything.extend(values)
+        print(f"{name:<18}{len(values):>8}" + "".join(f"{percentile(values, p) * 1000:>7.2f} ms" for p in (0.5, 0.9, 0.99))
+              + f"{errors.get(name, 0):>8}")
+    everything.sort()
+    print(f"{'all':<18}{len(everything):>8}" + "".join(f"{percentile(everything, p) * 1000:>7.2f} ms" for p in (0.5, 0.9, 0.99))
+          + f"{sum(errors.values()):>8}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,102 @@
 # Marc Hanauer @Orphanet 2025
 # Check if thesaurus classes with ICF URI Exact mapping are unique
 # Check classes without ICF URI (could be legit, not systematic errors)
-# NB: input/ouput files defined at the end of script
-# TODO : use filename as argument
+# Input : OFCO_thesaurus.owl (read through its SQLite snapshot, see ofco_snapshot.py)
+#         or a CSV generated by ofco_to_csv.py, or its normalized export (ofco_to_csv.py --xlsx / --parquet)
+# Usage : python ofco_check_IRI_URI.py [OFCO_thesaurus.owl|OFCO_thesaurus_ICF.csv|OFCO_thesaurus.xlsx|
+#                                       OFCO_thesaurus.icf_mappings.parquet] [report file]
+#                                     [--profile] [--metrics-json [PATH]]
 import csv
+import argparse
 from collections import defaultdict
 from datetime import datetime
+import ofco_metrics
+from ofco_metrics import RunMetrics
 
-def analyze_ofco_icf_mappings(filename, output_filename):
+def read_csv_rows(filename):
+    """
+    Yield (IRI, hasICFuri, ManualAssertion) from a CSV/TSV export
+    (ofco_to_csv.py column names 'ICF URI' / 'Manual Mapping' are accepted too)
+    """
+    with open(filename, 'r', encoding='utf-8-sig') as f:
+        # Detect separator (tab or semicolon)
+        first_line = f.readline()
+        separator = '\t' if '\t' in first_line else ';'
+        f.seek(0)
+        
+        reader = csv.DictReader(f, delimiter=separator)
+        
+        for row in reader:
+            # Stop at the annotation properties section of ofco_to_csv.py
+            if (row.get('IRI') or '').startswith('--- SECTION'):
+                break
+            yield (
+                (row.get('IRI') or '').strip(),
+                (row.get('hasICFuri') or row.get('ICF URI') or '').strip(),
+                (row.get('ManualAssertion') or row.get('Manual Mapping') or '').strip()
+            )
+
+
+def read_ofco_rows(owl_file):
+    """Yield (IRI, hasICFuri, ManualAssertion) straight from the ontology snapshot (no CSV round-trip)"""
+    from ofco_loader import load_ofco
+    from ofco_to_csv import extract_concepts
+    for iri, label, definition, parent, uri, code, manual in extract_concepts(load_ofco(owl_file)):
+        yield iri, uri, manual
+
+
+def read_table_rows(filename):
+    """
+    Yield (IRI, hasICFuri, ManualAssertion) from the normalized export of ofco_to_csv.py: every
+    concept once (no mapping) then the icf_mappings table. filename is the .xlsx workbook or any
+    <base>.<table>.parquet file of the export
+    """
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(filename, read_only=True)
+        try:
+            for row in workbook['concepts'].iter_rows(min_row=2, values_only=True):
+                yield row[0] or '', '', ''
+            for row in workbook['icf_mappings'].iter_rows(min_row=2, values_only=True):
+                yield row[0] or '', row[1] or '', row[3] or ''
+        finally:
+            workbook.close()
+    else:
+        import pandas as pd
+        base = filename[:-len('.parquet')].rsplit('.', 1)[0]
+        for iri in pd.read_parquet(f'{base}.concepts.parquet', columns=['IRI'])['IRI'].fillna(''):
+            yield iri, '', ''
+        mappings = pd.read_parquet(f'{base}.icf_mappings.parquet', columns=['IRI', 'ICF URI', 'Manual Mapping']).fillna('')
+        yield from mappings.itertuples(index=False, name=None)
+
+
+def analyze_ofco_icf_mappings(filename, output_filename, metrics=None):
     """
     Analyze the OFCO-ICF thesaurus file and perform two checks:
     1. Identify IRIs without hasICFuri
     2. Identify duplicate hasICFuri for exact mappings (E)
+    Stage timings are recorded in metrics (a RunMetrics) if given.
     """
+    if metrics is None:
+        metrics = RunMetrics(__file__)
     
     # Data structures for analysis
     iri_to_icf = defaultdict(list)  # IRI -> list of (hasICFuri, ManualAssertion)
     icf_to_iris = defaultdict(list)  # hasICFuri -> list of IRIs with exact mapping
     all_iris = set()  # All unique OFCO IRIs
     
-    # Read the file
-    with open(filename, 'r', encoding='utf-8') as f:
-        # Detect separator (tab or semicolon)
-        first_line = f.readline()
-        separator = '\t' if '\t' in first_line else ';'
-        f.seek(0)
-        
-        reader = csv.DictReader(f, delimiter=separator)
-        
-        for row in reader:
-            iri = row['IRI'].strip()
-            has_icf_uri = row.get('hasICFuri', '').strip()
-            manual_assertion = row.get('ManualAssertion', '').strip()
-            
+    # Read the ontology (snapshot) or a CSV export
+    if filename.lower().endswith('.owl'):
+        rows = read_ofco_rows(filename)
+    elif filename.lower().endswith(('.xlsx', '.parquet')):
+        rows = read_table_rows(filename)
+    else:
+        rows = read_csv_rows(filename)
+    
+    rows_read = 0
+    with metrics.stage("mapping read"):
+        for iri, has_icf_uri, manual_assertion in rows:
+            rows_read += 1
             # Collect all OFCO IRIs (exclude ECO IRIs)
             if iri and not iri.startswith('http://purl.obolibrary.org'):
                 all_iris.add(iri)
@@ -44,6 +108,8 @@ def analyze_ofco_icf_mappings(filename, output_filename):
                 # If it's an exact mapping, record for duplicate checking
                 if manual_assertion.startswith('E (Exact mapping'):
                     icf_to_iris[has_icf_uri].append(iri)
+    metrics.count("mapping_rows", rows_read, stage="mapping read")
+    metrics.count("iris", len(all_iris))
     
     # === CHECK 1: IRIs without hasICFuri ===
     print("=" * 80)
@@ -92,7 +158,8 @@ def analyze_ofco_icf_mappings(filename, output_filename):
     print("=" * 80)
     
     # === WRITE OUTPUT FILE ===
-    write_output_file(output_filename, all_iris, iris_without_icf, duplicated_icf)
+    with metrics.stage("write"):
+        write_output_file(output_filename, all_iris, iris_without_icf, duplicated_icf)
     print(f"\n✓ Results written to: {output_filename}")
     
     return {
@@ -157,11 +224,18 @@ def write_output_file(filename, all_iris, iris_without_icf, duplicated_icf):
 
 if __name__ == "__main__":
     # Input and output filenames
-    input_filename = "OFCO_thesaurus_ICF.csv"
-    output_filename = "OFCO_ICF_validation_report.txt"
+    parser = argparse.ArgumentParser(description="Check the ICF URIs of the OFCO thesaurus classes")
+    parser.add_argument("input", nargs="?", default="OFCO_thesaurus.owl", help="OFCO_thesaurus.owl or a CSV export")
+    parser.add_argument("output", nargs="?", default="OFCO_ICF_validation_report.txt", help="report file")
+    ofco_metrics.add_arguments(parser, __file__)
+    args = parser.parse_args()
+    input_filename = args.input
+    output_filename = args.output
+    metrics = RunMetrics(__file__, trace_memory=args.profile)
     
     try:
-        results = analyze_ofco_icf_mappings(input_filename, output_filename)
+        results = analyze_ofco_icf_mappings(input_filename, output_filename, metrics)
+        metrics.report(args.metrics_json, profile=args.profile)
     except FileNotFoundError:
         print(f"Error: File '{input_filename}' not found.")
         print("Please check the file path.")
@@ -1,11 +1,17 @@
 # Check if a label always exists for classes and annotations properties in OFCO_thesaurus.owl
-# pip install rdflib if needed
+# Uses the shared ofco_loader model (no rdflib parsing)
 # Marc Hanauer @Orphanet 2025
 # Generate output file as list of IRI (without label)
+# Other languages: python ofco_checkmissinglabels.py en fr de -> one report per language
+# (missing_english_labels.txt for en, missing_<lang>_labels.txt otherwise), the OWL file is loaded once
+# --profile / --metrics-json [PATH]: time and memory per stage (ofco_metrics.py)
 
 
 import logging
-from rdflib import Graph, RDF, RDFS, OWL, URIRef
+import argparse
+import ofco_metrics
+from ofco_metrics import RunMetrics
+from ofco_loader import load_ofco, OWL_ANNOTATION_PROPERTY
 
 # Configuration
 OWL_FILE = "OFCO_thesaurus.owl"
@@ -14,15 +20,22 @@ OUTPUT_FILE = "missing_english_labels.txt"
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-def check_missing_en_labels():
+def output_file(lang):
+    return OUTPUT_FILE if lang == "en" else f"missing_{lang}_labels.txt"
+
+
+def check_missing_en_labels(languages=("en",), metrics=None):
     """
     Parses the OWL file and identifies Classes and Annotation Properties
-    that lack an rdfs:label with an English language tag.
+    that lack an rdfs:label with an English language tag (or each language of languages).
+    Stage timings are recorded in metrics (a RunMetrics) if given.
     """
+    if metrics is None:
+        metrics = RunMetrics(__file__)
     logging.info(f"Loading OWL file: {OWL_FILE}...")
-    g = Graph()
     try:
-        g.parse(OWL_FILE, format="xml")
+        with metrics.stage("ontology load"):
+            model = load_ofco(OWL_FILE)
     except FileNotFoundError:
         logging.error(f"File not found: {OWL_FILE}")
         return
@@ -30,40 +43,35 @@ def check_missing_en_labels():
         logging.error(f"Error parsing file: {e}")
         return
 
-    logging.info(f"Graph loaded successfully. Total triples: {len(g)}")
+    logging.info(f"Ontology loaded successfully. Total entities: {len(model)}")
 
     # Set to store entities (URIs) to check (using set to avoid duplicates)
-    entities_to_check = set()
-    
-    # We are interested in owl:Class and owl:AnnotationProperty
-    target_types = [OWL.Class, OWL.AnnotationProperty]
-
+    # We are interested in owl:Class and owl:AnnotationProperty (named entities only)
     logging.info("Collecting Classes and Annotation Properties...")
-    for rdf_type in target_types:
-        for subject in g.subjects(RDF.type, rdf_type):
-            # We only check URIs (ignoring Blank Nodes)
-            if isinstance(subject, URIRef):
-                entities_to_check.add(subject)
+    entities_to_check = set(model.classes) | set(model.annotation_properties)
 
     logging.info(f"Total entities to verify: {len(entities_to_check)}")
 
+    metrics.count("entities", len(entities_to_check) * len(languages), stage="label check")
+    for lang in languages:
+        with metrics.stage("label check"):
+            write_report(model, entities_to_check, lang, output_file(lang))
+
+
+def write_report(model, entities_to_check, lang, output):
+    """Report of the entities without an rdfs:label in one language"""
+    language = "English" if lang == "en" else f"'{lang}'"
     missing_labels = []
 
     for entity in entities_to_check:
-        has_en_label = False
-        
-        # Iterate over all rdfs:label values for this entity
-        for label in g.objects(entity, RDFS.label):
-            # Check if language tag exists and starts with 'en' (case insensitive)
-            # This covers 'en', 'en-US', 'en-GB', etc.
-            if label.language and label.language.lower().startswith('en'):
-                has_en_label = True
-                break
+        # Check if language tag exists and starts with lang (case insensitive)
+        # This covers 'en', 'en-US', 'en-GB', etc.
+        has_label = model.label(entity, lang) is not None
         
-        if not has_en_label:
+        if not has_label:
             # Determine type for reporting purposes
             entity_type = "Class"
-            if (entity, RDF.type, OWL.AnnotationProperty) in g:
+            if OWL_ANNOTATION_PROPERTY in model.get(entity).types:
                 entity_type = "AnnotationProperty"
             
             missing_labels.append(f"{entity} [{entity_type}]")
@@ -73,8 +81,8 @@ def check_missing_en_labels():
 
     # Write results to the output file
     try:
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            f.write(f"Report: Entities missing English rdfs:label\n")
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(f"Report: Entities missing {language} rdfs:label\n")
             f.write(f"Source file: {OWL_FILE}\n")
             f.write(f"Total found: {len(missing_labels)}\n")
             f.write("=" * 60 + "\n\n")
@@ -83,13 +91,23 @@ def check_missing_en_labels():
                 for item in missing_labels:
                     f.write(f"{item}\n")
             else:
-                f.write("No entities found missing English labels.\n")
+                f.write(f"No entities found missing {language} labels.\n")
         
-        logging.info(f"Analysis complete. Found {len(missing_labels)} entities missing English labels.")
-        logging.info(f"Results written to: {OUTPUT_FILE}")
+        logging.info(f"Analysis complete. Found {len(missing_labels)} entities missing {language} labels.")
+        logging.info(f"Results written to: {output}")
 
     except IOError as e:
         logging.error(f"Error writing to output file: {e}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Report the OFCO entities without an rdfs:label per language")
+    parser.add_argument("languages", nargs="*", default=["en"], help="language tags (default: en)")
+    ofco_metrics.add_arguments(parser, __file__)
+    args = parser.parse_args()
+    metrics = RunMetrics(__file__, trace_memory=args.profile)
+    check_missing_en_labels([lang.lower() for lang in args.languages], metrics)
+    metrics.report(args.metrics_json, profile=args.profile)
+
+
 if __name__ == "__main__":
-    check_missing_en_labels()
\ No newline at end of file
+    main()
\ No newline at end of file
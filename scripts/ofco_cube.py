@@ -0,0 +1,198 @@
+# Materialized aggregate cube of the disorder annotations
+# Marc Hanauer @Orphanet 2025
+# Aggregation stage run after disaxml_ofco_parser.py : the DisabilityDisorderAssociation of
+# Diseases_annotated_with_OFCO.owl (loaded with ofco_query.py) are counted once into a dense
+# NumPy cube  category x severity x frequency x temporality x lossOfAbility
+#   - category: main OFCO categories (direct subclasses of ActivitiesAndParticipation), an
+#     association is counted in each main category its disability is strictly below (subClassOf+,
+#     as get-count-by-main-categories.sparql: a disability that is a main category itself is in none)
+#   - severity / frequency / temporality: subclasses of SeverityDisability, FrequencyAssociation
+#     and temporality, lossOfAbility: false / true
+#   - each axis ends with an "" slot for associations without a category or a qualifier
+# Distinct disorder counts are not additive: a disorder x category bitmap is saved next to the
+# cube for them. Both are written to one .npz file, every roll-up / slice is then a NumPy sum
+# over the cube instead of a live aggregate query.
+#
+# Usage : python ofco_cube.py build [--owl OFCO_thesaurus.owl] [--annotations Diseases_annotated_with_OFCO.owl]
+#                                   [--output Diseases_annotated_with_OFCO.cube.npz]
+#         python ofco_cube.py show category severity [--cube ...] [--where severity=Severe ...]
+
+import sys
+import argparse
+
+import numpy as np
+
+from ofco_loader import OFCO_NS
+from ofco_query import open_store, expand, short, ROOT_CATEGORY, OWL_FILE, ANNOTATIONS_FILE
+
+CUBE_FILE = "Diseases_annotated_with_OFCO.cube.npz"
+
+# axis name -> (store qualifier, OFCO class whose subclasses are the axis values)
+QUALIFIER_AXES = {
+    "severity": ("hasSeverity", OFCO_NS + "SeverityDisability"),
+    "frequency": ("hasFrequency", OFCO_NS + "FrequencyAssociation"),
+    "temporality": ("hasTemporality", OFCO_NS + "temporality"),
+}
+AXES = ("category", "severity", "frequency", "temporality", "lossOfAbility")
+ABSENT = ""
+
+
+class AggregateCube:
+    """
+    counts: int64 array, one axis per name of AXES
+    labels: axis name -> array of axis values (IRIs, 'true'/'false', "" = absent)
+    disorders: IRIs of the disorders, disorder_categories: bool array disorders x categories
+    """
+
+    def __init__(self, counts, labels, disorders, disorder_categories):
+        self.counts = counts
+        self.labels = labels
+        self.disorders = disorders
+        self.disorder_categories = disorder_categories
+        self._positions = {axis: {value: i for i, value in enumerate(labels[axis])} for axis in AXES}
+
+    def _index(self, axis, value):
+        if axis == "lossOfAbility":
+            value = str(value).lower() if value is not None else ABSENT
+        elif value:
+            value = expand(value)
+        position = self._positions[axis].get(value if value is not None else ABSENT)
+        if position is None:
+            raise KeyError(f"{value!r} is not a value of the {axis} axis")
+        return position
+
+    def slice(self, **where):
+        """Sub-cube with the given axes fixed, e.g. slice(severity='Severe', lossOfAbility=True)"""
+        index = tuple(self._index(axis, where[axis]) if axis in where else slice(None)
+                      for axis in AXES)
+        return self.counts[index]
+
+    def count(self, **where):
+        """Number of associations matching the given axis values"""
+        return int(self.slice(**where).sum())
+
+    def rollup(self, *keep, **where):
+        """Counts summed over every axis not in keep (after slicing with where), axes in keep order"""
+        unknown = [axis for axis in (*keep, *where) if axis not in AXES]
+        if unknown:
+            raise KeyError(f"unknown axis: {', '.join(unknown)}")
+        remaining = [axis for axis in AXES if axis not in where]
+        sub = self.slice(**where)
+        summed = sub.sum(axis=tuple(i for i, axis in enumerate(remaining) if axis not in keep))
+        kept = [axis for axis in remaining if axis in keep]
+        return np.transpose(summed, [kept.index(axis) for axis in keep]) if keep else summed
+
+    def disorders_by_category(self):
+        """Distinct disorders per main category: [(category IRI, count)]"""
+        counts = self.disorder_categories.sum(axis=0)
+        return [(category, int(n)) for category, n in zip(self.labels["category"], counts)]
+
+    def save(self, path):
+        np.savez_compressed(
+            path, counts=self.counts, disorders=np.asarray(self.disorders, dtype=str),
+            disorder_categories=np.packbits(self.disorder_categories, axis=0),
+            disorder_count=np.int64(len(self.disorders)),
+            **{f"labels_{axis}": np.asarray(self.labels[axis], dtype=str) for axis in AXES})
+
+
+def load_cube(path=CUBE_FILE):
+    with np.load(path) as data:
+        labels = {axis: data[f"labels_{axis}"].tolist() for axis in AXES}
+        size = int(data["disorder_count"])
+        disorder_categories = np.unpackbits(data["disorder_categories"], axis=0, count=size).astype(bool)
+        return AggregateCube(data["counts"], labels, data["disorders"].tolist(), disorder_categories)
+
+
+def _axis_codes(store, qualifier, parent):
+    """Values of a qualifier axis (ontology order, then unexpected values) and the code of each association"""
+    vocabulary = store.vocabularies[qualifier]
+    values = list(store.hierarchy.model.children(parent))
+    values += sorted(v for v in vocabulary if v not in values)
+    values.append(ABSENT)
+    remap = np.array([values.index(v) for v in vocabulary] + [len(values) - 1], dtype=np.intp)
+    # store code -1 (absent) picks the last entry of remap
+    return values, remap[store.qualifiers[qualifier]]
+
+
+def build_cube(store, root=ROOT_CATEGORY):
+    """Count the associations of an AnnotationStore (ofco_query.py) into an AggregateCube"""
+    hierarchy = store.hierarchy
+    categories = [c for c in hierarchy.model.children(expand(root)) if c in hierarchy.ids]
+    labels = {"category": categories + [ABSENT], "lossOfAbility": ["false", "true", ABSENT]}
+    codes = {"lossOfAbility": np.where(store.loss_of_ability < 0, 2, store.loss_of_ability)}
+    for axis, (qualifier, parent) in QUALIFIER_AXES.items():
+        labels[axis], codes[axis] = _axis_codes(store, qualifier, parent)
+
+    # association x main category membership (subClassOf+: the category itself is cleared, as in
+    # AnnotationStore.count_by_top_category), unknown disabilities in no category
+    known = store.disability >= 0
+    category_ids = np.array([hierarchy.ids[c] for c in categories], dtype=np.intp)
+    member = np.zeros((len(store), len(categories)), dtype=bool)
+    member[known] = hierarchy.ancestors[np.ix_(store.disability[known], category_ids)]
+    member &= store.disability[:, None] != category_ids[None, :]
+    rows, cats = np.nonzero(member)
+    orphans = np.flatnonzero(~member.any(axis=1))
+    rows = np.concatenate([rows, orphans])
+    cats = np.concatenate([cats, np.full(len(orphans), len(categories))])
+
+    counts = np.zeros([len(labels[axis]) for axis in AXES], dtype=np.int64)
+    np.add.at(counts, (cats, codes["severity"][rows], codes["frequency"][rows],
+                       codes["temporality"][rows], codes["lossOfAbility"][rows]), 1)
+
+    disorder_categories = np.zeros((len(store.disorders), len(labels["category"])), dtype=bool)
+    disorder_categories[store.disorder[rows], cats] = True
+    return AggregateCube(counts, labels, list(store.disorders), disorder_categories)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate cube of the OFCO disorder annotations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the cube from the parser output")
+    build.add_argument("--owl", default=OWL_FILE)
+    build.add_argument("--annotations", default=ANNOTATIONS_FILE)
+    build.add_argument("--output", default=CUBE_FILE)
+    show = sub.add_parser("show", help="roll-up of the cube on some axes")
+    show.add_argument("axes", nargs="*", help=f"axes to keep, among {', '.join(AXES)}")
+    show.add_argument("--cube", default=CUBE_FILE)
+    show.add_argument("--where", action="append", default=[], metavar="AXIS=VALUE")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        try:
+            store = open_store(args.owl, args.annotations)
+        except FileNotFoundError as e:
+            print(f"Error: File '{e.filename}' not found.")
+            return 2
+        cube = build_cube(store)
+        cube.save(args.output)
+        print(f"Cube {' x '.join(f'{a}({len(cube.labels[a])})' for a in AXES)}: "
+              f"{int(cube.counts.sum())} association counts, {len(cube.disorders)} disorders -> {args.output}")
+        return 0
+
+    where = {}
+    for item in args.where:
+        axis, sep, value = item.partition("=")
+        if not sep or not axis:
+            show.error(f"--where expects AXIS=VALUE, got {item!r}")
+        where[axis] = value
+    try:
+        cube = load_cube(args.cube)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    try:
+        result = cube.rollup(*args.axes, **where)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        return 2
+    if not args.axes:
+        print(int(result))
+        return 0
+    for index in zip(*np.nonzero(result)):
+        values = [short(cube.labels[axis][i]) or "-" for axis, i in zip(args.axes, index)]
+        print("\t".join(values) + f"\t{int(result[index])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+# Semantic diff between two releases of OFCO_thesaurus.owl or of the disorder annotations
+# Marc Hanauer @Orphanet 2025
+# Both versions are normalized into canonical records, one tab-separated line per fact, subject first:
+#   - thesaurus: concept / type / label / definition / parent / ICF mapping (owl:Axiom or hasICFuri) /
+#     restriction records per entity
+#   - annotations (Diseases_annotated_with_OFCO.owl or Disability_Orphanet_annotations.xml):
+#     disorder / specific management / category / reason / association (disability, frequency,
+#     temporality, severity, lossOfAbility) records per OrphaCode
+# Records are sorted with an external merge sort (sorted runs of --run-size lines in temporary
+# files, then heapq.merge), so large annotation files are never held in memory, and a single
+# sorted-merge pass over the two streams gives the changes of each subject: added / removed
+# entities, changed labels, definitions, ICF codes, association qualifiers...
+# Output: a human-readable changelog (OFCO_diff.txt) and the same changes as JSON (OFCO_diff.json)
+#
+# Usage : python ofco_diff.py OLD NEW [--kind auto|thesaurus|annotations] [--output OFCO_diff.txt]
+#                             [--json OFCO_diff.json] [--run-size 200000]
+
+import os
+import sys
+import json
+import heapq
+import argparse
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import Counter
+from itertools import groupby
+
+from ofco_loader import parse_ofco, axiom_value, HAS_ICF_CODE, ECO_0000218, OFCO_NS, RDF_NS, OWL_NS
+
+OUTPUT_FILE = "OFCO_diff.txt"
+JSON_FILE = "OFCO_diff.json"
+RUN_SIZE = 200000
+
+# record kind -> number of fields (after subject and kind) identifying a fact: the other fields
+# are its value, so a removed + an added record with the same identity is reported as a change
+IDENTITY = {
+    "label": 1,          # lang -> text
+    "definition": 1,     # lang -> text
+    "icf": 1,            # ICF URI -> code, manual assertion
+    "association": 1,    # disability -> frequency, temporality, severity, lossOfAbility
+    "management": 0,     # -> true / false
+    "category": 0,
+    "reason": 0,
+}
+
+_ABOUT = "{%s}about" % RDF_NS
+_RESOURCE = "{%s}resource" % RDF_NS
+_OWL_CLASS = "{%s}Class" % OWL_NS
+_ORDO_PREFIX = "http://www.orpha.net/ORDO/Orphanet_"
+_DISORDER_PROPERTIES = {
+    "{%s}hasSpecificManagement" % OFCO_NS: "management",
+    "{%s}hasDisabilityCategory" % OFCO_NS: "category",
+    "{%s}hasReasonForNotApplicable" % OFCO_NS: "reason",
+}
+_ANNOTATION = "{%s}hasDisabilityAnnotation" % OFCO_NS
+_ASSOCIATION_PROPERTIES = ["{%s}%s" % (OFCO_NS, name) for name in
+                           ("concernsDisability", "hasFrequency", "hasTemporality", "hasSeverity", "lossOfAbility")]
+
+
+def _field(value):
+    """Record field: no tab / newline, None -> ''"""
+    if value is None:
+        return ""
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def record(*fields):
+    return "\t".join(_field(f) for f in fields)
+
+
+def thesaurus_records(path):
+    """Canonical records of an OFCO thesaurus"""
+    model = parse_ofco(path)
+    for entity in model.entities.values():
+        iri = entity.iri
+        yield record(iri, "concept")
+        for entity_type in entity.types:
+            yield record(iri, "type", entity_type)
+        for text, lang in entity.labels:
+            yield record(iri, "label", lang, text.strip())
+        for text, lang in entity.definitions:
+            yield record(iri, "definition", lang, " ".join(text.split()))
+        for parent in entity.parents:
+            yield record(iri, "parent", parent)
+        for prop, value in entity.restrictions:
+            yield record(iri, "restriction", prop, value)
+        mapped = set()
+        for axiom in model.icf_axioms(iri):
+            mapped.add(axiom.target)
+            yield record(iri, "icf", axiom.target, axiom_value(axiom, HAS_ICF_CODE), axiom_value(axiom, ECO_0000218))
+        for uri in entity.icf_uris:
+            if uri not in mapped:
+                yield record(iri, "icf", uri, "", "")
+
+
+def _release(parents, element):
+    if parents:
+        parents[-1].remove(element)
+    else:
+        element.clear()
+
+
+def output_annotation_records(path):
+    """Canonical records of the parser output (RDF/XML), streamed disorder by disorder"""
+    parents = []
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag != _OWL_CLASS or len(parents) != 1:
+            continue
+        subject = "ORPHA:" + element.get(_ABOUT, "").replace(_ORDO_PREFIX, "")
+        yield record(subject, "disorder")
+        for child in element:
+            if child.tag in _DISORDER_PROPERTIES:
+                yield record(subject, _DISORDER_PROPERTIES[child.tag], child.get(_RESOURCE) or (child.text or "").strip())
+            elif child.tag == _ANNOTATION:
+                values = [child.find(prop) for prop in _ASSOCIATION_PROPERTIES]
+                yield record(subject, "association", *[
+                    "" if value is None else value.get(_RESOURCE) or (value.text or "").strip() for value in values])
+        _release(parents, element)
+
+
+def source_annotation_records(path):
+    """Canonical records of an Orphanet annotation XML (Disability_Orphanet_annotations.xml), raw IDs"""
+    from disaxml_ofco_parser import iter_relevances, QUALIFIERS
+    with open(path, "rb") as xml_source:
+        for relevance in iter_relevances(xml_source):
+            code = relevance.findtext("Disorder/OrphaCode")
+            if not code:
+                continue
+            subject = "ORPHA:" + code.strip()
+            yield record(subject, "disorder")
+            management = relevance.findtext("SpecificManagement")
+            if management:
+                yield record(subject, "management", management.strip())
+            for tag, kind in (("DisabilityCategory", "category"), ("ReasonForNotApplicable", "reason")):
+                number = relevance.findtext(f"{tag}/OrphaNumber")
+                if number:
+                    yield record(subject, kind, number.strip())
+            for association in relevance.iterfind("Disorder/DisabilityDisorderAssociationList/DisabilityDisorderAssociation"):
+                disability = association.find("Disability")
+                yield record(subject, "association",
+                             disability.get("id") if disability is not None else "",
+                             *[(association.findtext(f"{tag}/OrphaNumber") or "").strip() for tag, _ in QUALIFIERS],
+                             (association.findtext("LossOfAbility") or "").strip())
+
+
+def detect_kind(path):
+    """'thesaurus', 'output' (parser output) or 'source' (Orphanet XML), from the start of the file"""
+    with open(path, "rb") as f:
+        head = f.read(65536)
+    if b"<JDBOR" in head or b"<DisorderDisabilityRelevance" in head:
+        return "source"
+    if b'rdf:about="' + _ORDO_PREFIX.encode("ascii") in head:
+        return "output"
+    return "thesaurus"
+
+
+RECORD_READERS = {
+    "thesaurus": thesaurus_records,
+    "output": output_annotation_records,
+    "source": source_annotation_records,
+}
+
+
+def _read_run(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line[:-1]
+
+
+def external_sort(records, tmp_dir, run_size=RUN_SIZE):
+    """Sorted iterator over records: sorted runs of run_size lines spilled to tmp_dir, then merged"""
+    runs = []
+    while True:
+        chunk = [line for _, line in zip(range(run_size), records)]
+        if not chunk:
+            break
+        chunk.sort()
+        if len(chunk) < run_size and not runs:
+            # everything fits in one run
+            return iter(chunk)
+        path = os.path.join(tmp_dir, f"run{len(runs):05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in chunk)
+        runs.append(path)
+    return heapq.merge(*(_read_run(path) for path in runs))
+
+
+def _subject(line):
+    return line.split("\t", 1)[0]
+
+
+def merge_subjects(old, new):
+    """Sorted-merge of two sorted record streams: yields (subject, old records, new records)"""
+    old_groups = groupby(old, key=_subject)
+    new_groups = groupby(new, key=_subject)
+    old_item = next(old_groups, None)
+    new_item = next(new_groups, None)
+    while old_item is not None or new_item is not None:
+        if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+            yield old_item[0], list(old_item[1]), []
+            old_item = next(old_groups, None)
+        elif old_item is None or new_item[0] < old_item[0]:
+            yield new_item[0], [], list(new_item[1])
+            new_item = next(new_groups, None)
+        else:
+            old_records, new_records = list(old_item[1]), list(new_item[1])
+            if old_records != new_records:
+                yield old_item[0], old_records, new_records
+            old_item = next(old_groups, None)
+            new_item = next(new_groups, None)
+
+
+def _unescape(field):
+    return field.replace("\\t", "\t").replace("\\n", "\n").replace("\\r", "\r").replace("\\\\", "\\")
+
+
+def subject_changes(subject, old_records, new_records):
+    """Changes of one subject: [{'subject', 'change', 'kind', 'key', 'old', 'new'}]"""
+    if old_records == new_records:
+        return []
+    old_counts, new_counts = Counter(old_records), Counter(new_records)
+    removed = sorted((old_counts - new_counts).elements())
+    added = sorted((new_counts - old_counts).elements())
+    if not old_records:
+        return [{"subject": subject, "change": "added", "kind": "entity",
+                 "new": [_split(r)[1:] for r in new_records if _split(r)[0] not in ("concept", "disorder")]}]
+    if not new_records:
+        return [{"subject": subject, "change": "removed", "kind": "entity"}]
+
+    changes = []
+    by_identity = {}
+    for change, records in (("removed", removed), ("added", added)):
+        for line in records:
+            kind, *fields = _split(line)
+            size = IDENTITY.get(kind)
+            key = (kind, tuple(fields[:size])) if size is not None else (kind, tuple(fields))
+            by_identity.setdefault(key, {"removed": [], "added": []})[change].append(fields)
+    for (kind, key), sides in by_identity.items():
+        size = IDENTITY.get(kind, len(key))
+        pairs = min(len(sides["removed"]), len(sides["added"]))
+        for old, new in zip(sides["removed"][:pairs], sides["added"][:pairs]):
+            changes.append({"subject": subject, "change": "changed", "kind": kind, "key": list(key),
+                            "old": old[size:], "new": new[size:]})
+        for old in sides["removed"][pairs:]:
+            changes.append({"subject": subject, "change": "removed", "kind": kind, "key": list(key), "old": old[size:]})
+        for new in sides["added"][pairs:]:
+            changes.append({"subject": subject, "change": "added", "kind": kind, "key": list(key), "new": new[size:]})
+    return changes
+
+
+def _split(line):
+    return [_unescape(field) for field in line.split("\t")[1:]]
+
+
+def _short(value):
+    return value.rsplit("/", 1)[-1].rsplit("#", 1)[-1] if "://" in value else value
+
+
+def describe(change):
+    """One changelog line"""
+    subject = _short(change["subject"])
+    if change["kind"] == "entity":
+        return f"{'+' if change['change'] == 'added' else '-'} {subject}"
+    key = " ".join(_short(k) for k in change.get("key", []) if k)
+    label = f"{change['kind']} {key}".strip()
+    if change["change"] == "changed":
+        old = " | ".join(_short(v) for v in change["old"])
+        new = " | ".join(_short(v) for v in change["new"])
+        return f"~ {subject}: {label}: {old} -> {new}"
+    sign = "+" if change["change"] == "added" else "-"
+    values = " | ".join(_short(v) for v in change.get("new" if sign == "+" else "old", []) if v)
+    return f"{sign} {subject}: {label}" + (f": {values}" if values else "")
+
+
+def diff(old_path, new_path, kind="auto", output=OUTPUT_FILE, json_output=JSON_FILE, run_size=RUN_SIZE):
+    """Write the changelog and its JSON version, returns the summary {change kind: count}"""
+    kinds = [detect_kind(path) for path in (old_path, new_path)]
+    if kind == "thesaurus":
+        kinds = ["thesaurus", "thesaurus"]
+    elif kind == "annotations" and "thesaurus" in kinds:
+        raise ValueError("--kind annotations: expected the parser output or the Orphanet XML")
+    if kinds[0] != kinds[1]:
+        raise ValueError(f"cannot compare a {kinds[0]} file with a {kinds[1]} file")
+    summary = Counter()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        streams = []
+        for i, (path, file_kind) in enumerate(zip((old_path, new_path), kinds)):
+            run_dir = os.path.join(tmp_dir, str(i))
+            os.mkdir(run_dir)
+            streams.append(external_sort(RECORD_READERS[file_kind](path), run_dir, run_size))
+        with open(output, "w", encoding="utf-8") as text, open(json_output, "w", encoding="utf-8") as js:
+            text.write(f"Changes from {old_path} to {new_path}\n" + "=" * 60 + "\n")
+            js.write(json.dumps({"old": old_path, "new": new_path})[:-1] + ', "changes": [\n')
+            first = True
+            for subject, old_records, new_records in merge_subjects(*streams):
+                for change in subject_changes(subject, old_records, new_records):
+                    summary[f"{change['kind']} {change['change']}"] += 1
+                    text.write(describe(change) + "\n")
+                    js.write(("" if first else ",\n") + json.dumps(change, ensure_ascii=False))
+                    first = False
+            js.write('\n], "summary": ' + json.dumps(dict(sorted(summary.items()))) + "}\n")
+            text.write("=" * 60 + "\n")
+            for name, count in sorted(summary.items()):
+                text.write(f"{name}: {count}\n")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic diff of two OFCO thesaurus or annotation releases")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--kind", choices=["auto", "thesaurus", "annotations"], default="auto")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--json", default=JSON_FILE)
+    parser.add_argument("--run-size", type=int, default=RUN_SIZE, help="records sorted in memory per run")
+    args = parser.parse_args()
+
+    try:
+        summary = diff(args.old, args.new, args.kind, args.output, args.json, args.run_size)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    for name, count in sorted(summary.items()):
+        print(f"{name:<28}{count:>8}")
+    print(f"{sum(summary.values())} changes -> {args.output}, {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
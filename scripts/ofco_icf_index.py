@@ -0,0 +1,171 @@
+# Hierarchical index of the ICF codes mapped to OFCO concepts
+# Marc Hanauer @Orphanet 2025
+# ICF codes encode their hierarchy in their prefix (d1 > d13 > d132 > d1320), so once sorted every
+# "under d13" query is one contiguous slice. The ofco:hasICFcode / ofco:hasICFuri owl:Axiom mappings
+# of OFCO_thesaurus.owl are stored as parallel arrays sorted by normalized code (d1320):
+#   - code -> ICF URIs / OFCO concepts: exact, prefix (subtree) and range queries by bisect, O(log n)
+#   - ICF URI -> codes / concepts and OFCO concept -> codes / URIs: dictionaries
+#   - batch queries (thousands of codes) with one NumPy searchsorted over the sorted codes
+# With a profile store (disaxml_ofco_parser.py --profile-store) the disorders annotated with the
+# concepts of a subtree are found too.
+#
+# Usage : python ofco_icf_index.py d13 [ICF:b7 ...] [--range d110 d129] [--diseases] [--owl OFCO_thesaurus.owl]
+#                                  [--profiles Diseases_annotated_with_OFCO.profiles]
+
+import os
+import sys
+import argparse
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from ofco_loader import load_ofco, axiom_value, HAS_ICF_CODE, ECO_0000218
+from ofco_profile_store import ProfileStore, PROFILE_STORE_FILE
+
+OWL_FILE = "OFCO_thesaurus.owl"
+# sorts after every character of a code: key + _END bounds the subtree of key
+_END = "￿"
+
+ICFMapping = namedtuple("ICFMapping", "code uri concept manual")
+
+
+def code_key(code):
+    """'ICF:d1320', 'icf:D1320 ', 'd1320' -> 'd1320'"""
+    code = code.strip()
+    if ":" in code:
+        code = code.split(":", 1)[1]
+    return code.lower()
+
+
+class ICFCodeIndex:
+    """
+    ICF code <-> ICF entity URI <-> OFCO concept index. mappings: list of ICFMapping sorted by
+    normalized code, keys: the normalized codes (parallel sorted list)
+    """
+
+    def __init__(self, mappings):
+        rows = sorted((code_key(m.code), m) for m in mappings if m.code)
+        self.keys = [key for key, m in rows]
+        self.mappings = [m for key, m in rows]
+        self._sorted_keys = np.array(self.keys, dtype=str)
+        self._by_uri = {}
+        self._by_concept = {}
+        for m in self.mappings:
+            self._by_uri.setdefault(m.uri, []).append(m)
+            self._by_concept.setdefault(m.concept, []).append(m)
+
+    def __len__(self):
+        return len(self.mappings)
+
+    def _slice(self, start, stop):
+        return self.mappings[start:stop]
+
+    def exact(self, code):
+        """Mappings of exactly this code"""
+        key = code_key(code)
+        return self._slice(bisect_left(self.keys, key), bisect_right(self.keys, key))
+
+    def prefix(self, code):
+        """Mappings of the code and all the codes under it ('d13' -> d130 ... d1399)"""
+        key = code_key(code)
+        return self._slice(bisect_left(self.keys, key), bisect_left(self.keys, key + _END))
+
+    def range(self, first, last):
+        """Mappings of the codes from first to last, the subtree of last included ('d110', 'd129')"""
+        return self._slice(bisect_left(self.keys, code_key(first)),
+                           bisect_left(self.keys, code_key(last) + _END))
+
+    def by_uri(self, uri):
+        return list(self._by_uri.get(uri, ()))
+
+    def by_concept(self, iri):
+        return list(self._by_concept.get(iri, ()))
+
+    def concepts_under(self, code):
+        """OFCO concepts mapped anywhere under a code (sorted IRIs)"""
+        return sorted({m.concept for m in self.prefix(code)})
+
+    def _bounds(self, codes, subtree):
+        keys = np.array([code_key(c) for c in codes], dtype=str)
+        starts = np.searchsorted(self._sorted_keys, keys, side="left")
+        if subtree:
+            stops = np.searchsorted(self._sorted_keys, np.char.add(keys, _END), side="left")
+        else:
+            stops = np.searchsorted(self._sorted_keys, keys, side="right")
+        return starts, stops
+
+    def exact_many(self, codes):
+        """{code: mappings} for many codes, one vectorized search"""
+        if not len(self.keys):
+            return {code: [] for code in codes}
+        starts, stops = self._bounds(codes, subtree=False)
+        return {code: self.mappings[a:b] for code, a, b in zip(codes, starts, stops)}
+
+    def prefix_many(self, codes):
+        """{code: mappings of the code and its subtree} for many codes, one vectorized search"""
+        if not len(self.keys):
+            return {code: [] for code in codes}
+        starts, stops = self._bounds(codes, subtree=True)
+        return {code: self.mappings[a:b] for code, a, b in zip(codes, starts, stops)}
+
+
+def build_icf_index(model):
+    """ICFCodeIndex of the owl:Axiom ICF mappings of an OFCOModel"""
+    mappings = [ICFMapping(axiom_value(a, HAS_ICF_CODE), a.target, a.source, axiom_value(a, ECO_0000218))
+                for iri in model.classes for a in model.icf_axioms(iri)]
+    return ICFCodeIndex(mappings)
+
+
+def diseases_with_concepts(profiles, concepts):
+    """Sorted OrphaCodes of a ProfileStore annotated with any of the concept IRIs"""
+    keys = profiles.keys()
+    codes, concept_ids = profiles.concept_rows(keys)[:2]
+    if not len(concept_ids):
+        return []
+    unique_ids = np.unique(concept_ids)
+    wanted = np.array([profiles.iri(int(i)) in concepts for i in unique_ids], dtype=bool)
+    selected = wanted[np.searchsorted(unique_ids, concept_ids)]
+    return np.unique(codes[selected]).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ICF code prefix / range queries over the OFCO mappings")
+    parser.add_argument("codes", nargs="*", help="ICF codes or prefixes (d13, ICF:b7)")
+    parser.add_argument("--range", nargs=2, metavar=("FIRST", "LAST"), help="codes from FIRST to LAST (subtree of LAST included)")
+    parser.add_argument("--diseases", action="store_true", help="also list the disorders annotated with the concepts")
+    parser.add_argument("--owl", default=OWL_FILE)
+    parser.add_argument("--profiles", default=PROFILE_STORE_FILE)
+    args = parser.parse_args()
+    if not args.codes and not args.range:
+        parser.error("give ICF codes or --range")
+
+    try:
+        index = build_icf_index(load_ofco(args.owl))
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    profiles = None
+    if args.diseases:
+        if not os.path.exists(args.profiles):
+            print(f"Error: File '{args.profiles}' not found (run disaxml_ofco_parser.py --profile-store).")
+            return 2
+        profiles = ProfileStore(args.profiles)
+
+    queries = list(index.prefix_many(args.codes).items()) if args.codes else []
+    if args.range:
+        queries.append((f"{args.range[0]}..{args.range[1]}", index.range(*args.range)))
+    for query, found in queries:
+        concepts = sorted({m.concept for m in found})
+        print(f"{query}: {len(found)} mappings, {len(concepts)} OFCO concepts")
+        for m in found:
+            print(f"\t{m.code}\t{m.concept.rsplit('/', 1)[-1]}\t{m.uri}")
+        if profiles is not None:
+            orpha_codes = diseases_with_concepts(profiles, set(concepts))
+            print(f"\t{len(orpha_codes)} disorders: {' '.join(map(str, orpha_codes[:50]))}"
+                  + (" ..." if len(orpha_codes) > 50 else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
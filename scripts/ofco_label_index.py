@@ -0,0 +1,252 @@
+# In-memory label search index for OFCO concepts
+# Marc Hanauer @Orphanet 2025
+# Built from the concept lines extracted by ofco_to_csv.py (IRI, label, parents, ICF codes).
+# Labels are normalized (case and diacritic insensitive) and indexed as:
+#   - a sorted array of labels     -> prefix search with bisect
+#   - an inverted index of tokens  -> token search (last token used as a prefix)
+#   - an inverted index of q-grams -> bounded edit distance (fuzzy) search: k edits destroy at most
+#     k * q distinct q-grams of the query, so only labels sharing enough q-grams with it (counted
+#     from the posting lists) and within k of its length are checked with the banded DP
+#
+# Usage : python ofco_label_index.py "acquiring lang" [--mode prefix|token|fuzzy|all] [--max-distance 2]
+
+import re
+import sys
+import argparse
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain
+
+from ofco_loader import load_ofco
+from ofco_to_csv import extract_concepts
+
+OWL_FILE = "OFCO_thesaurus.owl"
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# q-gram length of the fuzzy search index
+QGRAM = 2
+
+
+def normalize(text):
+    """'Régulating  URINATION' -> 'regulating urination'"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped.casefold()).strip()
+
+
+def qgrams(key):
+    """Distinct q-grams of a normalized label ('walk' -> {'wa', 'al', 'lk'})"""
+    return {key[i:i + QGRAM] for i in range(len(key) - QGRAM + 1)}
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Edit distance between a and b, or None if it is greater than max_distance.
+    Only the diagonal band of width 2 * max_distance + 1 of the DP matrix is computed.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if a == b:
+        return 0
+    too_far = max_distance + 1
+    size = len(a) + 1
+    previous = [j if j <= max_distance else too_far for j in range(size)]
+    for i in range(1, len(b) + 1):
+        cb = b[i - 1]
+        current = [too_far] * size
+        row_min = too_far
+        if i <= max_distance:
+            current[0] = row_min = i
+        for j in range(max(1, i - max_distance), min(len(a), i + max_distance) + 1):
+            cost = previous[j - 1] + (a[j - 1] != cb)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return None
+        previous = current
+    distance = previous[len(a)]
+    return distance if distance <= max_distance else None
+
+
+class LabelIndex:
+    """
+    Label search over OFCO concepts. Each result is a dict:
+    {'iri', 'label', 'matched', 'parents', 'icf_codes'}
+    """
+
+    def __init__(self, concepts):
+        # concepts: iri -> {'label', 'labels', 'parents', 'icf_codes'}
+        self.concepts = concepts
+        entries = []  # (normalized label, iri, original label)
+        for iri, concept in concepts.items():
+            for label in concept["labels"]:
+                key = normalize(label)
+                if key:
+                    entries.append((key, iri, label))
+        entries = sorted(set(entries))
+        self._keys = [entry[0] for entry in entries]
+        self._entries = entries
+
+        tokens = defaultdict(set)
+        grams = defaultdict(list)
+        by_length = defaultdict(list)
+        for position, (key, iri, label) in enumerate(entries):
+            for token in key.split():
+                tokens[token].add(position)
+            for gram in qgrams(key):
+                grams[gram].append(position)
+            by_length[len(key)].append(position)
+        self._tokens = dict(tokens)
+        self._token_keys = sorted(tokens)
+        self._grams = dict(grams)
+        self._by_length = dict(by_length)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _result(self, position, **extra):
+        key, iri, label = self._entries[position]
+        concept = self.concepts[iri]
+        return {"iri": iri, "label": concept["label"], "matched": label,
+                "parents": concept["parents"], "icf_codes": concept["icf_codes"], **extra}
+
+    def _unique(self, positions, limit):
+        results, seen = [], set()
+        for position in positions:
+            iri = self._entries[position][1]
+            if iri in seen:
+                continue
+            seen.add(iri)
+            results.append(position)
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def prefix(self, query, limit=20):
+        """Concepts with a label starting with query"""
+        key = normalize(query)
+        start = bisect_left(self._keys, key)
+        stop = bisect_left(self._keys, key + "￿", start)
+        return [self._result(p) for p in self._unique(range(start, stop), limit)]
+
+    def _token_positions(self, token, as_prefix):
+        if not as_prefix:
+            return self._tokens.get(token, set())
+        positions = set()
+        start = bisect_left(self._token_keys, token)
+        for candidate in self._token_keys[start:]:
+            if not candidate.startswith(token):
+                break
+            positions |= self._tokens[candidate]
+        return positions
+
+    def token(self, query, limit=20):
+        """Concepts having all the query tokens in a label (the last one as a prefix)"""
+        tokens = normalize(query).split()
+        if not tokens:
+            return []
+        sets = [self._token_positions(t, i == len(tokens) - 1) for i, t in enumerate(tokens)]
+        sets.sort(key=len)
+        positions = set(sets[0])
+        for other in sets[1:]:
+            positions &= other
+            if not positions:
+                return []
+        return [self._result(p) for p in self._unique(sorted(positions), limit)]
+
+    def _fuzzy_candidates(self, key, max_distance):
+        """
+        Labels that can be within max_distance edits of key: sharing at least
+        |q-grams(key)| - max_distance * QGRAM distinct q-grams with it, within max_distance of its length.
+        Queries too short for the q-gram bound fall back to the labels of the length band.
+        """
+        grams = qgrams(key)
+        threshold = len(grams) - max_distance * QGRAM
+        if threshold <= 0:
+            return [position for length in range(len(key) - max_distance, len(key) + max_distance + 1)
+                    for position in self._by_length.get(length, ())]
+        counts = Counter(chain.from_iterable(self._grams.get(gram, ()) for gram in grams))
+        return [position for position, common in counts.items()
+                if common >= threshold and abs(len(self._keys[position]) - len(key)) <= max_distance]
+
+    def fuzzy(self, query, max_distance=2, limit=20):
+        """Concepts with a label within max_distance edits of query, closest first"""
+        key = normalize(query)
+        scored = []
+        for position in self._fuzzy_candidates(key, max_distance):
+            distance = bounded_levenshtein(key, self._keys[position], max_distance)
+            if distance is not None:
+                scored.append((distance, position))
+        scored.sort()
+        distances = dict((p, d) for d, p in reversed(scored))
+        return [self._result(p, distance=distances[p])
+                for p in self._unique((p for _, p in scored), limit)]
+
+    def search(self, query, max_distance=2, limit=20):
+        """Prefix matches, then token matches, then fuzzy matches (no duplicates)"""
+        results, seen = [], set()
+        for found in (self.prefix(query, limit), self.token(query, limit),
+                      self.fuzzy(query, max_distance, limit)):
+            for result in found:
+                if result["iri"] not in seen:
+                    seen.add(result["iri"])
+                    results.append(result)
+        return results[:limit]
+
+
+def build_label_index(model):
+    """LabelIndex over the concepts of ofco_to_csv.py (all rdfs:label of each concept are indexed)"""
+    concepts = {}
+    for iri, label, definition, parent, uri, code, manual in extract_concepts(model):
+        concept = concepts.setdefault(iri, {
+            "label": label,
+            "labels": [text for text, lang in model.get(iri).labels],
+            "parents": [],
+            "icf_codes": [],
+        })
+        if parent and parent not in concept["parents"]:
+            concept["parents"].append(parent)
+        if code and code not in concept["icf_codes"]:
+            concept["icf_codes"].append(code)
+    return LabelIndex(concepts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search OFCO concepts by label")
+    parser.add_argument("query")
+    parser.add_argument("--owl", default=OWL_FILE)
+    parser.add_argument("--mode", choices=["prefix", "token", "fuzzy", "all"], default="all")
+    parser.add_argument("--max-distance", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    index = build_label_index(load_ofco(args.owl))
+    if args.mode == "prefix":
+        results = index.prefix(args.query, args.limit)
+    elif args.mode == "token":
+        results = index.token(args.query, args.limit)
+    elif args.mode == "fuzzy":
+        results = index.fuzzy(args.query, args.max_distance, args.limit)
+    else:
+        results = index.search(args.query, args.max_distance, args.limit)
+
+    if not results:
+        print("No concept found.")
+        return 1
+    for result in results:
+        print(f"{result['label']}  <{result['iri']}>")
+        if result["matched"] != result["label"]:
+            print(f"    matched label: {result['matched']}")
+        print(f"    parents: {', '.join(result['parents']) or '-'}")
+        print(f"    ICF codes: {', '.join(result['icf_codes']) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
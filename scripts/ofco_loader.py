@@ -0,0 +1,262 @@
+# Shared loader for OFCO_thesaurus.owl
+# Marc Hanauer @Orphanet 2025
+# Parses the RDF/XML file once with ElementTree into a compact, indexed, read-only model
+# (no rdflib, no per-triple objects). Used by ofco_to_csv.py, ofco_checkmissinglabels.py
+# and disaxml_ofco_parser.py
+# load_ofco() reads the model from the SQLite snapshot (ofco_snapshot.py) when it is up to date
+#
+# Usage:
+#   from ofco_loader import load_ofco
+#   model = load_ofco("OFCO_thesaurus.owl")
+#   model.label("https://w3id.org/ofco/AcquiringLanguage")
+
+import sqlite3
+import xml.etree.ElementTree as ET
+from collections import namedtuple, defaultdict
+from types import MappingProxyType
+from urllib.parse import urljoin
+
+OWL_FILE = "OFCO_thesaurus.owl"
+
+# Namespaces
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS_NS = "http://www.w3.org/2000/01/rdf-schema#"
+OWL_NS = "http://www.w3.org/2002/07/owl#"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+OFCO_NS = "https://w3id.org/ofco/"
+OBO_NS = "http://purl.obolibrary.org/obo/"
+EFO_NS = "http://www.ebi.ac.uk/efo/"
+
+# IRIs
+OWL_CLASS = OWL_NS + "Class"
+OWL_ANNOTATION_PROPERTY = OWL_NS + "AnnotationProperty"
+HAS_ICF_URI = OFCO_NS + "hasICFuri"
+HAS_ICF_CODE = OFCO_NS + "hasICFcode"
+HAS_INTERNAL_REFERENCE = OFCO_NS + "hasORPHANETDBInternalReference"
+HAS_ORPHA_NUMBER = OFCO_NS + "hasORPHAnumber"
+ECO_0000218 = OBO_NS + "ECO_0000218"  # manual assertion
+EFO_DEFINITION = EFO_NS + "definition"
+OWL_VERSION_INFO = OWL_NS + "versionInfo"
+
+# ElementTree tags
+_ABOUT = "{%s}about" % RDF_NS
+_RESOURCE = "{%s}resource" % RDF_NS
+_LANG = "{%s}lang" % XML_NS
+_BASE = "{%s}base" % XML_NS
+_DESCRIPTION = "{%s}Description" % RDF_NS
+_TYPE = "{%s}type" % RDF_NS
+_AXIOM = "{%s}Axiom" % OWL_NS
+_LABEL = "{%s}label" % RDFS_NS
+_SUBCLASS_OF = "{%s}subClassOf" % RDFS_NS
+_EQUIVALENT_CLASS = "{%s}equivalentClass" % OWL_NS
+_RESTRICTION = "{%s}Restriction" % OWL_NS
+_ON_PROPERTY = "{%s}onProperty" % OWL_NS
+_HAS_VALUE = "{%s}hasValue" % OWL_NS
+_DEFINITION = "{%s}definition" % EFO_NS
+_ICF_URI = "{%s}hasICFuri" % OFCO_NS
+_ICF_CODE = "{%s}hasICFcode" % OFCO_NS
+_ANNOTATED_SOURCE = "{%s}annotatedSource" % OWL_NS
+_ANNOTATED_PROPERTY = "{%s}annotatedProperty" % OWL_NS
+_ANNOTATED_TARGET = "{%s}annotatedTarget" % OWL_NS
+
+# labels / definitions: tuples of (text, language or None)
+# restrictions: tuples of (property IRI, value) from owl:equivalentClass owl:hasValue restrictions
+Entity = namedtuple("Entity", "iri types labels definitions parents icf_uris icf_codes restrictions")
+# annotations: tuple of (property IRI, value)
+Axiom = namedtuple("Axiom", "source property target annotations")
+
+
+def axiom_value(axiom, prop):
+    """First value of an annotation on an owl:Axiom ('' if absent)"""
+    for key, value in axiom.annotations:
+        if key == prop:
+            return value
+    return ""
+
+
+def _tag_iri(tag):
+    """'{ns}local' -> 'nslocal'"""
+    return tag[1:].replace("}", "", 1) if tag.startswith("{") else tag
+
+
+class OFCOModel:
+    """
+    Read-only, indexed view of the OFCO thesaurus
+    - entities: IRI -> Entity (document order)
+    - axioms: tuple of owl:Axiom annotations
+    """
+
+    def __init__(self, entities, axioms):
+        self.entities = MappingProxyType(entities)
+        self.axioms = tuple(axioms)
+
+        axioms_by_source = defaultdict(list)
+        for axiom in self.axioms:
+            axioms_by_source[axiom.source].append(axiom)
+        self._axioms_by_source = {k: tuple(v) for k, v in axioms_by_source.items()}
+
+        children = defaultdict(list)
+        by_restriction = defaultdict(dict)
+        for entity in entities.values():
+            for parent in entity.parents:
+                children[parent].append(entity.iri)
+            if OWL_CLASS in entity.types:
+                for prop, value in entity.restrictions:
+                    by_restriction[prop][value] = entity.iri
+        self._children = {k: tuple(v) for k, v in children.items()}
+        self._by_restriction = {k: MappingProxyType(v) for k, v in by_restriction.items()}
+
+        self.classes = tuple(e.iri for e in entities.values() if OWL_CLASS in e.types)
+        self.annotation_properties = tuple(
+            e.iri for e in entities.values() if OWL_ANNOTATION_PROPERTY in e.types
+        )
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, iri):
+        return iri in self.entities
+
+    def get(self, iri):
+        return self.entities.get(iri)
+
+    def label(self, iri, lang="en"):
+        """First rdfs:label of an entity in a language ('en' matches 'en-GB'...), None if absent"""
+        entity = self.entities.get(iri)
+        if entity is None:
+            return None
+        for text, label_lang in entity.labels:
+            if lang is None or (label_lang and label_lang.lower().startswith(lang)):
+                return text
+        return None
+
+    def children(self, iri):
+        """Direct rdfs:subClassOf children"""
+        return self._children.get(iri, ())
+
+    def axioms_for(self, source, prop=None):
+        """owl:Axiom annotating a source entity (optionally only on one property)"""
+        axioms = self._axioms_by_source.get(source, ())
+        if prop is None:
+            return axioms
+        return tuple(a for a in axioms if a.property == prop)
+
+    def icf_axioms(self, source):
+        """owl:Axiom annotating hasICFuri of an entity"""
+        return self.axioms_for(source, HAS_ICF_URI)
+
+    def restriction_index(self, prop):
+        """owl:hasValue restriction value -> class IRI, e.g. hasORPHAnumber '423907' -> ofco:Severe"""
+        return self._by_restriction.get(prop, MappingProxyType({}))
+
+
+def load_ofco(owl_file=OWL_FILE, use_snapshot=True):
+    """
+    Load OFCO_thesaurus.owl as an OFCOModel, through its SQLite snapshot
+    (built or refreshed when the OWL file hash changed). Falls back to XML parsing
+    when the snapshot cannot be written.
+    """
+    if use_snapshot:
+        from ofco_snapshot import load_model
+        try:
+            return load_model(owl_file)
+        except (OSError, sqlite3.Error):
+            pass
+    return parse_ofco(owl_file)
+
+
+def parse_ofco(owl_file=OWL_FILE):
+    """Parse OFCO_thesaurus.owl (RDF/XML) into an OFCOModel"""
+    root = ET.parse(owl_file).getroot()
+    base = root.get(_BASE, "")
+
+    def resolve(iri):
+        if iri is None or ":" in iri:
+            return iri
+        return urljoin(base, iri)
+
+    raw = {}
+
+    def entity(iri):
+        if iri not in raw:
+            raw[iri] = {"types": [], "labels": [], "definitions": [], "parents": [],
+                        "icf_uris": [], "icf_codes": [], "restrictions": []}
+        return raw[iri]
+
+    axioms = []
+    for node in root:
+        if node.tag == _AXIOM:
+            axioms.append(_read_axiom(node, resolve))
+            continue
+        iri = resolve(node.get(_ABOUT))
+        if iri is None:
+            continue
+        data = entity(iri)
+        if node.tag != _DESCRIPTION:
+            data["types"].append(_tag_iri(node.tag))
+
+        for prop in node:
+            tag = prop.tag
+            resource = resolve(prop.get(_RESOURCE))
+            if tag == _LABEL:
+                data["labels"].append((prop.text or "", prop.get(_LANG)))
+            elif tag == _DEFINITION:
+                data["definitions"].append((prop.text or "", prop.get(_LANG)))
+            elif tag == _SUBCLASS_OF:
+                if resource:
+                    data["parents"].append(resource)
+            elif tag == _ICF_URI:
+                if resource:
+                    data["icf_uris"].append(resource)
+            elif tag == _ICF_CODE:
+                data["icf_codes"].append(prop.text or "")
+            elif tag == _TYPE:
+                if resource:
+                    data["types"].append(resource)
+            elif tag == _EQUIVALENT_CLASS:
+                for restriction in prop.iter(_RESTRICTION):
+                    on_property = restriction.find(_ON_PROPERTY)
+                    has_value = restriction.find(_HAS_VALUE)
+                    if on_property is not None and has_value is not None:
+                        data["restrictions"].append((resolve(on_property.get(_RESOURCE)), has_value.text))
+
+            # Named nodes nested in a property element (typed node elements)
+            for nested in prop.iter():
+                nested_iri = nested.get(_ABOUT)
+                if nested_iri and nested.tag != _DESCRIPTION:
+                    entity(resolve(nested_iri))["types"].append(_tag_iri(nested.tag))
+
+    entities = {
+        iri: Entity(iri, *(tuple(dict.fromkeys(data[k])) if k == "types" else tuple(data[k])
+                           for k in ("types", "labels", "definitions", "parents",
+                                     "icf_uris", "icf_codes", "restrictions")))
+        for iri, data in raw.items()
+    }
+    return OFCOModel(entities, axioms)
+
+
+def _read_axiom(node, resolve):
+    source = prop_iri = target = None
+    annotations = []
+    for child in node:
+        value = resolve(child.get(_RESOURCE))
+        if value is None:
+            value = child.text or ""
+        if child.tag == _ANNOTATED_SOURCE:
+            source = value
+        elif child.tag == _ANNOTATED_PROPERTY:
+            prop_iri = value
+        elif child.tag == _ANNOTATED_TARGET:
+            target = value
+        else:
+            annotations.append((_tag_iri(child.tag), value))
+    return Axiom(source, prop_iri, target, tuple(annotations))
+
+
+if __name__ == "__main__":
+    import sys
+    model = load_ofco(sys.argv[1] if len(sys.argv) > 1 else OWL_FILE)
+    print(f"Entities: {len(model)}")
+    print(f"Classes: {len(model.classes)}")
+    print(f"Annotation properties: {len(model.annotation_properties)}")
+    print(f"Axioms: {len(model.axioms)}")
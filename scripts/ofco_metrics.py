@@ -0,0 +1,207 @@
+# Run metrics of the OFCO pipeline scripts (--profile / --metrics-json)
+# Marc Hanauer @Orphanet 2025
+# Shared instrumentation of disaxml_ofco_parser.py, ofco_to_csv.py, ofco_checkmissinglabels.py,
+# ofco_check_IRI_URI.py and generate_sssom.py:
+#   - wall time per stage (ontology load, mapping extraction, XML load, RDF generation, write...),
+#     a stage entered several times accumulates its time
+#   - peak memory: max RSS of the process and of its worker processes, and with --profile the
+#     tracemalloc peak of the Python allocations of each stage (tracing slows the run down).
+#     Stages timed by the caller in a hot loop (add_time) share one peak, recorded around the
+#     whole loop with peak(): their own tracemalloc peaks would all be the loop maximum
+#   - counters and throughputs (disorders/s, associations/s), measured over the stage given to count()
+#   - unmapped-ID warnings aggregated by kind: {kind: {ID: occurrences}} instead of one line each
+# --metrics-json writes everything as one JSON document per run, to be tracked over releases.
+#
+# Usage:
+#   metrics = RunMetrics("disaxml_ofco_parser.py", trace_memory=args.profile)
+#   with metrics.stage("ontology load"):
+#       model = load_ofco(OWL_FILE)
+#   metrics.count("disorders", processed, stage="RDF generation")
+#   metrics.warn("Disability ID", disability_id)
+#   metrics.report(args.metrics_json, profile=args.profile)
+
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_VERSION = 1
+# IDs listed per warning kind in the console summary (the JSON document has them all)
+SHOWN_IDS = 10
+
+
+def max_rss_kb(who="self"):
+    """Peak resident set size in kB of this process ('self') or of its finished children, None if unknown"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+
+
+def metrics_file(script):
+    """Default metrics document of a script: disaxml_ofco_parser.py -> disaxml_ofco_parser.metrics.json"""
+    return os.path.splitext(os.path.basename(script))[0] + ".metrics.json"
+
+
+def add_arguments(parser, script):
+    """--profile and --metrics-json [PATH] options of a script"""
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time and memory of each stage (Python allocations traced with tracemalloc)")
+    parser.add_argument("--metrics-json", nargs="?", const=metrics_file(script), metavar="PATH",
+                        help=f"write the run metrics as JSON (default path: {metrics_file(script)})")
+
+
+class RunMetrics:
+    """Stage timings, counters, memory peaks and aggregated warnings of one run"""
+
+    def __init__(self, script, trace_memory=False):
+        self.script = os.path.basename(script)
+        self.trace_memory = trace_memory
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.stages = {}
+        self.counters = Counter()
+        self.counter_stages = {}
+        self.warnings = defaultdict(Counter)
+        self.peaks = {}
+        self._start = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of the run, with --profile its tracemalloc peak is recorded too"""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, traced=True):
+        """
+        Add time measured by the caller to a stage (hot loops timed with time.perf_counter()),
+        with --profile the tracemalloc peak since the last stage() started is recorded too,
+        unless traced is False (the stages of a loop: their common peak is recorded by peak())
+        """
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+        if self.trace_memory and traced:
+            peak = tracemalloc.get_traced_memory()[1] // 1024
+            entry["peak_traced_kb"] = max(entry.get("peak_traced_kb", 0), peak)
+
+    @contextmanager
+    def peak(self, name):
+        """With --profile, one tracemalloc peak for a block whose time is split between stages with add_time()"""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        try:
+            yield self
+        finally:
+            if self.trace_memory:
+                self.peaks[name] = max(self.peaks.get(name, 0), tracemalloc.get_traced_memory()[1] // 1024)
+
+    def count(self, name, n=1, stage=None):
+        """Add n to a counter, its throughput is n / seconds of stage (of the whole run by default)"""
+        self.counters[name] += n
+        if stage is not None:
+            self.counter_stages[name] = stage
+
+    def warn(self, kind, key, n=1):
+        """One more occurrence of an unmapped ID"""
+        self.warnings[kind][str(key)] += n
+
+    def add_warnings(self, warnings):
+        """Merge a Counter {(kind, ID): occurrences} (collected by a worker process for instance)"""
+        for (kind, key), n in warnings.items():
+            self.warn(kind, key, n)
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def throughput(self):
+        """{'<counter>_per_s': rate} over the stage of each counter"""
+        rates = {}
+        total = self.elapsed()
+        for name, n in self.counters.items():
+            stage = self.counter_stages.get(name)
+            seconds = self.stages[stage]["seconds"] if stage in self.stages else total
+            rates[f"{name}_per_s"] = round(n / seconds, 1) if seconds > 0 else None
+        return rates
+
+    def document(self):
+        """The metrics of the run as a JSON-serializable dict"""
+        memory = {"max_rss_kb": max_rss_kb("self"), "children_max_rss_kb": max_rss_kb("children")}
+        if self.trace_memory:
+            memory["peak_traced_kb"] = max([s.get("peak_traced_kb", 0) for s in self.stages.values()]
+                                           + list(self.peaks.values()), default=0)
+            memory["block_peaks_traced_kb"] = dict(self.peaks)
+        return {
+            "version": METRICS_VERSION,
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "started": self.started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "total_seconds": round(self.elapsed(), 6),
+            "stages": [{"name": name, **entry, "seconds": round(entry["seconds"], 6)}
+                       for name, entry in self.stages.items()],
+            "counters": dict(self.counters),
+            "throughput": self.throughput(),
+            "memory": memory,
+            "warnings": {
+                kind: {"occurrences": sum(ids.values()), "distinct": len(ids), "ids": dict(ids.most_common())}
+                for kind, ids in sorted(self.warnings.items())
+            },
+        }
+
+    def warning_lines(self):
+        """One counted summary line per warning kind, most frequent IDs first"""
+        lines = []
+        for kind, ids in sorted(self.warnings.items()):
+            shown = ", ".join(f"{key} (x{n})" for key, n in ids.most_common(SHOWN_IDS))
+            more = f", ... {len(ids) - SHOWN_IDS} more" if len(ids) > SHOWN_IDS else ""
+            lines.append(f"Warning: {len(ids)} {kind}s not found in ontology, "
+                         f"{sum(ids.values())} occurrences: {shown}{more}")
+        return lines
+
+    def print_profile(self):
+        """Stage table, memory peaks and throughputs"""
+        total = self.elapsed()
+        print(f"Profile of {self.script}:")
+        print(f"  {'stage':<34}{'time':>10}{'share':>8}{'traced peak':>14}")
+        for name, entry in self.stages.items():
+            peak = f"{entry['peak_traced_kb'] / 1024:>11.1f} MB" if "peak_traced_kb" in entry else ""
+            print(f"  {name:<34}{entry['seconds']:>8.3f} s{entry['seconds'] / total if total else 0:>8.1%}{peak}")
+        print(f"  {'total':<34}{total:>8.3f} s")
+        for name, peak in self.peaks.items():
+            print(f"  traced peak of the {name}: {peak / 1024:.1f} MB")
+        rss, children = max_rss_kb("self"), max_rss_kb("children")
+        if rss is not None:
+            print(f"  max RSS: {rss / 1024:.1f} MB" + (f" (child processes: {children / 1024:.1f} MB)" if children else ""))
+        for name, rate in self.throughput().items():
+            if rate is not None:
+                print(f"  {name.replace('_per_s', '')}: {self.counters[name[:-6]]} ({rate:,.1f}/s)")
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.document(), f, indent=2)
+
+    def report(self, metrics_json=None, profile=False):
+        """End of run: --profile table and --metrics-json document"""
+        if profile:
+            self.print_profile()
+        if metrics_json:
+            self.write(metrics_json)
+            print(f"Metrics written to: {metrics_json}")
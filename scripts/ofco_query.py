@@ -0,0 +1,312 @@
+# Local query engine over the OFCO hierarchy and the disorder annotations
+# Marc Hanauer @Orphanet 2025
+# Answers the hierarchy queries of sparql/ without a triple store:
+#   - the rdfs:subClassOf closure of OFCO_thesaurus.owl is computed once as ancestor bitsets
+#     (one boolean row per class, reflexive: subClassOf*), walking the classes parents first
+#   - the disorder annotations written by disaxml_ofco_parser.py (Diseases_annotated_with_OFCO.owl)
+#     are streamed into NumPy arrays (one row per DisabilityDisorderAssociation)
+# A "rdfs:subClassOf* ofco:MotorSkills" filter is then a single fancy index on the bitsets.
+#
+# Usage : python ofco_query.py under MotorSkills [--severity Severe] [--frequency ..] [--temporality ..]
+#         python ofco_query.py top-categories
+#         python ofco_query.py frequency-temporality InterpersonalSkills
+#         [--owl OFCO_thesaurus.owl] [--annotations Diseases_annotated_with_OFCO.owl]
+#         [--ordo ORDO_en_4.7.owl [--ordo-cache ordo_subset.sqlite]]  -> disorder labels from ordo_subset.py
+
+import sys
+import argparse
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from ofco_loader import load_ofco, OFCO_NS, RDF_NS, OWL_NS
+
+OWL_FILE = "OFCO_thesaurus.owl"
+ANNOTATIONS_FILE = "Diseases_annotated_with_OFCO.owl"
+ROOT_CATEGORY = OFCO_NS + "ActivitiesAndParticipation"
+
+_OWL_CLASS_TAG = "{%s}Class" % OWL_NS
+_ABOUT = "{%s}about" % RDF_NS
+_RESOURCE = "{%s}resource" % RDF_NS
+_ANNOTATION = "{%s}hasDisabilityAnnotation" % OFCO_NS
+_DISABILITY = "{%s}concernsDisability" % OFCO_NS
+_LOSS_OF_ABILITY = "{%s}lossOfAbility" % OFCO_NS
+
+# Qualifiers of an association, stored as codes into a vocabulary per qualifier (-1 = absent)
+QUALIFIERS = ("hasFrequency", "hasTemporality", "hasSeverity")
+_QUALIFIER_TAGS = {"{%s}%s" % (OFCO_NS, name): name for name in QUALIFIERS}
+
+
+def expand(name):
+    """'MotorSkills' or 'ofco:MotorSkills' -> 'https://w3id.org/ofco/MotorSkills' (IRIs kept)"""
+    if name is None or "://" in name:
+        return name
+    return OFCO_NS + name.split(":", 1)[-1]
+
+
+class Hierarchy:
+    """
+    rdfs:subClassOf closure of the OFCO classes
+    - ids: class IRI -> row number
+    - ancestors: bool matrix, ancestors[i, j] is True when class j is class i or one of its ancestors
+    Works for multiple inheritance (the rows of all the parents are OR-ed)
+    """
+
+    def __init__(self, model):
+        iris = list(model.classes)
+        for entity in model.entities.values():
+            iris.extend(p for p in entity.parents if p != OWL_NS + "Thing")
+        self.iris = list(dict.fromkeys(iris))
+        self.ids = {iri: i for i, iri in enumerate(self.iris)}
+        self.model = model
+
+        size = len(self.iris)
+        ancestors = np.zeros((size, size), dtype=bool)
+        done = np.zeros(size, dtype=bool)
+        for start in range(size):
+            # iterative DFS: a row is filled once the rows of all its parents are
+            stack = [start]
+            while stack:
+                i = stack[-1]
+                if done[i]:
+                    stack.pop()
+                    continue
+                parents = self._parents(i)
+                pending = [p for p in parents if not done[p] and p not in stack]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                ancestors[i, i] = True
+                for p in parents:
+                    ancestors[i] |= ancestors[p]
+                done[i] = True
+                stack.pop()
+        self.ancestors = ancestors
+
+    def _parents(self, i):
+        entity = self.model.get(self.iris[i])
+        if entity is None:
+            return []
+        return [self.ids[p] for p in entity.parents if p in self.ids]
+
+    def __len__(self):
+        return len(self.iris)
+
+    def id(self, iri):
+        """Row number of a class (KeyError if the class is not in the hierarchy)"""
+        return self.ids[expand(iri)]
+
+    def is_subclass(self, iri, ancestor, strict=False):
+        """rdfs:subClassOf* (or subClassOf+ with strict=True)"""
+        i, j = self.ids.get(expand(iri)), self.ids.get(expand(ancestor))
+        if i is None or j is None:
+            return False
+        return bool(self.ancestors[i, j]) and not (strict and i == j)
+
+    def descendants(self, iri):
+        """IRIs of the class and all its subclasses"""
+        return [self.iris[i] for i in np.flatnonzero(self.ancestors[:, self.id(iri)])]
+
+    def label(self, iri):
+        return self.model.label(iri, "en")
+
+
+class AnnotationStore:
+    """
+    DisabilityDisorderAssociation rows as parallel NumPy arrays
+    - disorder: index into self.disorders
+    - disability: row number in the hierarchy (-1 when the class is not in OFCO)
+    - hasFrequency / hasTemporality / hasSeverity: index into self.vocabularies[name] (-1 = absent)
+    - lossOfAbility: -1 absent, 0 false, 1 true
+    """
+
+    def __init__(self, hierarchy, disorders, columns, vocabularies):
+        self.hierarchy = hierarchy
+        self.disorders = disorders
+        self.disorder = np.asarray(columns["disorder"], dtype=np.int32)
+        self.disability = np.asarray(columns["disability"], dtype=np.int32)
+        self.qualifiers = {name: np.asarray(columns[name], dtype=np.int16) for name in QUALIFIERS}
+        self.loss_of_ability = np.asarray(columns["lossOfAbility"], dtype=np.int8)
+        self.vocabularies = vocabularies
+        self._codes = {name: {iri: code for code, iri in enumerate(vocab)}
+                       for name, vocab in vocabularies.items()}
+
+    def __len__(self):
+        return len(self.disorder)
+
+    def under(self, category, strict=False):
+        """Boolean mask of the associations whose disability is a subclass of category"""
+        j = self.hierarchy.ids.get(expand(category))
+        if j is None:
+            return np.zeros(len(self), dtype=bool)
+        known = self.disability >= 0
+        mask = np.zeros(len(self), dtype=bool)
+        mask[known] = self.hierarchy.ancestors[self.disability[known], j]
+        if strict:
+            mask &= self.disability != j
+        return mask
+
+    def qualifier_mask(self, name, value):
+        """Boolean mask of the associations with qualifier name == value"""
+        code = self._codes[name].get(expand(value), -2)
+        return self.qualifiers[name] == code
+
+    def select(self, category=None, severity=None, frequency=None, temporality=None):
+        """Boolean mask combining a category (subClassOf*) and qualifier filters"""
+        mask = self.under(category) if category else np.ones(len(self), dtype=bool)
+        for name, value in (("hasSeverity", severity), ("hasFrequency", frequency),
+                            ("hasTemporality", temporality)):
+            if value:
+                mask &= self.qualifier_mask(name, value)
+        return mask
+
+    def rows(self, mask):
+        """(disorder IRI, disability IRI, {qualifier: IRI}) for the selected associations"""
+        iris = self.hierarchy.iris
+        for i in np.flatnonzero(mask):
+            qualifiers = {name: self.vocabularies[name][self.qualifiers[name][i]]
+                          for name in QUALIFIERS if self.qualifiers[name][i] >= 0}
+            disability = iris[self.disability[i]] if self.disability[i] >= 0 else None
+            yield self.disorders[self.disorder[i]], disability, qualifiers
+
+    def diseases_under(self, category, **filters):
+        """Sorted distinct disorders having an association under category (see select for filters)"""
+        codes = np.unique(self.disorder[self.select(category, **filters)])
+        return sorted(self.disorders[c] for c in codes)
+
+    def count_by_top_category(self, root=ROOT_CATEGORY):
+        """
+        get-count-by-main-categories.sparql: distinct disorders per direct subclass of root,
+        counting only disabilities strictly below the category. [(category IRI, label, count)]
+        """
+        hierarchy = self.hierarchy
+        counts = []
+        for top in hierarchy.model.children(expand(root)):
+            if top not in hierarchy.ids:
+                continue
+            count = len(np.unique(self.disorder[self.under(top, strict=True)]))
+            if count:
+                counts.append((top, hierarchy.label(top), count))
+        counts.sort(key=lambda row: (-row[2], row[0]))
+        return counts
+
+    def count_by_qualifiers(self, category, names=("hasFrequency", "hasTemporality")):
+        """
+        get-Agregate-by-frequency-and-temporality.sparql: associations under category grouped
+        by the given qualifiers (associations missing one of them are skipped, as in SPARQL)
+        """
+        mask = self.under(category)
+        for name in names:
+            mask &= self.qualifiers[name] >= 0
+        keys = np.stack([self.qualifiers[name][mask] for name in names], axis=1)
+        if not len(keys):
+            return []
+        combos, counts = np.unique(keys, axis=0, return_counts=True)
+        result = [(tuple(self.vocabularies[name][c] for name, c in zip(names, combo)), int(n))
+                  for combo, n in zip(combos, counts)]
+        result.sort(key=lambda row: (-row[1], row[0]))
+        return result
+
+
+def load_annotations(annotations_file, hierarchy):
+    """Stream the parser output (RDF/XML) into an AnnotationStore"""
+    disorders = []
+    vocabularies = {name: [] for name in QUALIFIERS}
+    codes = {name: {} for name in QUALIFIERS}
+    columns = {key: [] for key in ("disorder", "disability", "lossOfAbility", *QUALIFIERS)}
+    ids = hierarchy.ids
+
+    for event, element in ET.iterparse(annotations_file, events=("end",)):
+        if element.tag != _OWL_CLASS_TAG:
+            continue
+        disorder = len(disorders)
+        disorders.append(element.get(_ABOUT))
+        for annotation in element.iter(_ANNOTATION):
+            values = {name: -1 for name in QUALIFIERS}
+            disability, loss = -1, -1
+            for prop in annotation:
+                if prop.tag == _DISABILITY:
+                    disability = ids.get(prop.get(_RESOURCE), -1)
+                elif prop.tag in _QUALIFIER_TAGS:
+                    name = _QUALIFIER_TAGS[prop.tag]
+                    value = prop.get(_RESOURCE)
+                    if value not in codes[name]:
+                        codes[name][value] = len(vocabularies[name])
+                        vocabularies[name].append(value)
+                    values[name] = codes[name][value]
+                elif prop.tag == _LOSS_OF_ABILITY:
+                    loss = 1 if (prop.text or "").strip() == "true" else 0
+            columns["disorder"].append(disorder)
+            columns["disability"].append(disability)
+            columns["lossOfAbility"].append(loss)
+            for name in QUALIFIERS:
+                columns[name].append(values[name])
+        element.clear()
+
+    return AnnotationStore(hierarchy, disorders, columns, vocabularies)
+
+
+def open_store(owl_file=OWL_FILE, annotations_file=ANNOTATIONS_FILE):
+    """Hierarchy closure of owl_file + annotations of annotations_file"""
+    return load_annotations(annotations_file, Hierarchy(load_ofco(owl_file)))
+
+
+def short(iri):
+    return iri.rsplit("/", 1)[-1] if iri else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the OFCO disorder annotations without a triple store")
+    parser.add_argument("query", choices=["under", "top-categories", "frequency-temporality"])
+    parser.add_argument("category", nargs="?", help="OFCO class (local name or IRI)")
+    parser.add_argument("--owl", default=OWL_FILE)
+    parser.add_argument("--annotations", default=ANNOTATIONS_FILE)
+    parser.add_argument("--severity")
+    parser.add_argument("--frequency")
+    parser.add_argument("--temporality")
+    parser.add_argument("--ordo", help="ORDO release: label the disorders (cached subset, ordo_subset.py)")
+    parser.add_argument("--ordo-cache", default="ordo_subset.sqlite")
+    args = parser.parse_args()
+
+    if args.query != "top-categories" and not args.category:
+        parser.error(f"{args.query} needs a category")
+
+    try:
+        store = open_store(args.owl, args.annotations)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    if args.category and expand(args.category) not in store.hierarchy.ids:
+        print(f"Error: {args.category} is not an OFCO class.")
+        return 2
+
+    if args.query == "under":
+        mask = store.select(args.category, severity=args.severity,
+                            frequency=args.frequency, temporality=args.temporality)
+        names = {}
+        if args.ordo:
+            from ordo_subset import open_subset
+            try:
+                subset, rebuilt = open_subset(args.ordo, args.annotations, args.ordo_cache)
+            except FileNotFoundError as e:
+                print(f"Error: File '{e.filename}' not found.")
+                return 2
+            with subset:
+                names = subset.labels()
+        for disorder, disability, qualifiers in store.rows(mask):
+            name = f"{names.get(disorder) or ''}\t" if args.ordo else ""
+            print(f"{short(disorder)}\t{name}{store.hierarchy.label(disability) or ''}\t"
+                  + "\t".join(short(qualifiers.get(name)) for name in QUALIFIERS))
+        print(f"{int(mask.sum())} associations, "
+              f"{len(np.unique(store.disorder[mask]))} disorders", file=sys.stderr)
+    elif args.query == "top-categories":
+        for top, label, count in store.count_by_top_category():
+            print(f"{short(top)}\t{label or ''}\t{count}")
+    else:
+        for (frequency, temporality), count in store.count_by_qualifiers(args.category):
+            print(f"{short(frequency)}\t{short(temporality)}\t{count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# Consistency check between the SSSOM mapping set and the ICF mappings of OFCO_thesaurus.owl
+# Marc Hanauer @Orphanet 2025
+# The same ICF mappings live in data/input/mappings_sssom.tsv (generate_sssom.py) and in the
+# owl:Axiom blocks annotating ofco:hasICFuri (get_axiom_mappings() in ofco_to_csv.py).
+# Both sides are loaded into hash indexes keyed by (normalized label, ICF URI) and joined in one
+# linear pass. Pairs left over are joined again on the ICF URI alone (label differences),
+# the rest is reported as missing on one side.
+# Reported : missing in OWL, missing in SSSOM, label mismatches, predicate mismatches
+# (skos:exactMatch <> "E (Exact mapping...)", skos:broadMatch <> "BTNT..."), ICF code mismatches
+# Output : JSON report, exit code 1 when the two sides disagree
+#
+# Usage : python ofco_reconcile_sssom.py [--owl OFCO_thesaurus.owl] [--sssom mappings_sssom.tsv]
+#                                       [--output OFCO_SSSOM_reconciliation.json]
+
+import sys
+import json
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+from ofco_loader import load_ofco, axiom_value, HAS_ICF_URI, HAS_ICF_CODE, ECO_0000218
+from ofco_label_index import normalize
+from generate_sssom import read_sssom, predicate_map, NO_CODE_SUBJECT
+
+OWL_FILE = "OFCO_thesaurus.owl"
+SSSOM_FILE = "data/input/mappings_sssom.tsv"
+OUTPUT_FILE = "OFCO_SSSOM_reconciliation.json"
+
+
+def owl_predicate(manual_assertion):
+    """'BTNT (broader term maps to...)' -> 'skos:broadMatch' (None if not recognized)"""
+    tag = manual_assertion.strip().split(" ", 1)[0] if manual_assertion else ""
+    return predicate_map.get(tag)
+
+
+def index_owl(model):
+    """(normalized label, ICF URI) -> list of owl:Axiom mappings (icf_code "" when there is no hasICFcode)"""
+    index = defaultdict(list)
+    for axiom in model.axioms:
+        if axiom.property != HAS_ICF_URI:
+            continue
+        label = model.label(axiom.source, "en") or model.label(axiom.source, None) or ""
+        manual = axiom_value(axiom, ECO_0000218)
+        index[(normalize(label), axiom.target.strip())].append({
+            "iri": axiom.source,
+            "label": label,
+            "icf_uri": axiom.target,
+            "icf_code": axiom_value(axiom, HAS_ICF_CODE) or "",
+            "manual": manual,
+            "predicate": owl_predicate(manual),
+        })
+    return index
+
+
+def index_sssom(rows):
+    """
+    (normalized label, ICF URI) -> list of SSSOM rows, rows given as (line number in the file, row),
+    icf_code "" for the mappings without an ICF code (subject_id sssom:NoTermFound)
+    """
+    index = defaultdict(list)
+    for line, row in rows:
+        index[(normalize(row["subject_label"]), row["object_id"].strip())].append({
+            "line": line,
+            "label": row["subject_label"],
+            "icf_uri": row["object_id"],
+            "icf_code": "" if row["subject_id"] == NO_CODE_SUBJECT else row["subject_id"],
+            "predicate": row["predicate_id"],
+        })
+    return index
+
+
+def compare(owl_entry, sssom_entry, findings):
+    """Predicate and ICF code comparison of two joined mappings"""
+    pair = {"owl": owl_entry, "sssom": sssom_entry}
+    if owl_entry["predicate"] != sssom_entry["predicate"]:
+        findings["predicate_mismatch"].append(pair)
+    if owl_entry["icf_code"] != sssom_entry["icf_code"]:
+        findings["icf_code_mismatch"].append(pair)
+
+
+def reconcile(owl_index, sssom_index):
+    """Hash join of both indexes on (label, ICF URI), then on the ICF URI of the leftovers"""
+    findings = {name: [] for name in ("missing_in_owl", "missing_in_sssom", "label_mismatch",
+                                      "predicate_mismatch", "icf_code_mismatch")}
+    sssom_left = defaultdict(list)  # ICF URI -> unmatched SSSOM rows
+    owl_left = defaultdict(list)    # ICF URI -> unmatched OWL mappings
+    matched = 0
+    for key, sssom_entries in sssom_index.items():
+        owl_entries = owl_index.get(key, [])
+        for owl_entry, sssom_entry in zip(owl_entries, sssom_entries):
+            compare(owl_entry, sssom_entry, findings)
+            matched += 1
+        sssom_left[key[1]].extend(sssom_entries[len(owl_entries):])
+    for key, owl_entries in owl_index.items():
+        owl_left[key[1]].extend(owl_entries[len(sssom_index.get(key, [])):])
+
+    # Second pass on the ICF URI alone: same mapping, different subject label
+    for uri, sssom_entries in sssom_left.items():
+        owl_entries = owl_left.pop(uri, [])
+        for owl_entry, sssom_entry in zip(owl_entries, sssom_entries):
+            findings["label_mismatch"].append({"owl": owl_entry, "sssom": sssom_entry})
+            compare(owl_entry, sssom_entry, findings)
+        findings["missing_in_owl"].extend(sssom_entries[len(owl_entries):])
+        findings["missing_in_sssom"].extend(owl_entries[len(sssom_entries):])
+    for owl_entries in owl_left.values():
+        findings["missing_in_sssom"].extend(owl_entries)
+
+    findings["missing_in_owl"].sort(key=lambda entry: entry["line"])
+    findings["missing_in_sssom"].sort(key=lambda entry: (entry["iri"], entry["icf_uri"]))
+    return matched, findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the SSSOM mapping set with the OFCO owl:Axiom ICF mappings")
+    parser.add_argument("--owl", default=OWL_FILE, help=f"ontology file (default: {OWL_FILE})")
+    parser.add_argument("--sssom", default=SSSOM_FILE, help=f"SSSOM TSV (default: {SSSOM_FILE})")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"JSON report (default: {OUTPUT_FILE})")
+    args = parser.parse_args()
+
+    try:
+        owl_index = index_owl(load_ofco(args.owl))
+        metadata, rows = read_sssom(args.sssom, with_lines=True)
+        sssom_index = index_sssom(rows)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+
+    matched, findings = reconcile(owl_index, sssom_index)
+    report = {
+        "ontology": args.owl,
+        "sssom": args.sssom,
+        "mapping_set_id": metadata.get("mapping_set_id"),
+        "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "owl_mappings": sum(len(v) for v in owl_index.values()),
+        "sssom_mappings": sum(len(v) for v in sssom_index.values()),
+        "matched": matched,
+        "counts": {name: len(items) for name, items in findings.items()},
+        "findings": findings,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print("=" * 80)
+    print(f"SSSOM <> OWL RECONCILIATION: {args.sssom} / {args.owl}")
+    print("=" * 80)
+    print(f"OWL mappings: {report['owl_mappings']}  SSSOM mappings: {report['sssom_mappings']}  "
+          f"matched on label + ICF URI: {matched}")
+    for name, count in report["counts"].items():
+        print(f"{'✓' if count == 0 else '✗'} {name:<20} {count:>5}")
+    print("=" * 80)
+    print(f"✓ Results written to: {args.output}")
+    return 1 if any(report["counts"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+# Local HTTP lookup service over OFCO concepts, ICF mappings and disease profiles
+# Marc Hanauer @Orphanet 2025
+# Standard library asyncio server (no web framework): OFCO_thesaurus.owl (through the ofco_loader
+# snapshot), its owl:Axiom ICF mappings and the profile store written by
+# disaxml_ofco_parser.py --profile-store are loaded once into in-memory indexes, then every request
+# is a dictionary lookup. GET responses are kept in an LRU cache (--cache-size entries).
+# Endpoints (JSON):
+#   GET  /concept/{name or IRI}       concept: labels, definition, parents, children, ICF mappings
+#   GET  /icf/{code}                  OFCO concepts mapped to an ICF code (d110, ICF:d110) or ICF URI
+#   GET  /search?q=...&limit=20       label search (prefix, token, fuzzy: ofco_label_index.py)
+#   GET  /disease/{OrphaCode}         disability profile of a disorder
+#   POST /batch/concepts  {"iris": [...]}        POST /batch/icf  {"codes": [...]}
+#   POST /batch/diseases  {"orpha_codes": [...]}
+#   GET  /health                      sizes of the indexes and cache statistics
+# HTTP/1.1 keep-alive is supported, see loadtest_ofco_service.py for a load test
+#
+# Usage : python ofco_service.py [--host 127.0.0.1] [--port 8080] [--owl OFCO_thesaurus.owl]
+#                                [--profiles Diseases_annotated_with_OFCO.profiles] [--cache-size 4096]
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from ofco_loader import load_ofco
+from ofco_to_csv import get_axiom_mappings
+from ofco_label_index import build_label_index
+from ofco_profile_store import ProfileStore, PROFILE_STORE_FILE
+from ofco_query import expand
+
+OWL_FILE = "OFCO_thesaurus.owl"
+HOST = "127.0.0.1"
+PORT = 8080
+CACHE_SIZE = 4096
+MAX_BATCH = 10000
+MAX_BODY = 16 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def icf_key(code):
+    """'ICF:d110', 'icf:D110 ', 'd110' -> 'd110'"""
+    code = code.strip()
+    return code.split(":", 1)[1].lower() if ":" in code and "://" not in code else code.lower()
+
+
+class LookupIndexes:
+    """In-memory indexes answering the service requests (plain dicts, JSON-ready values)"""
+
+    def __init__(self, model, profiles=None):
+        self.model = model
+        self.profiles = profiles
+        self.labels = build_label_index(model)
+        self.concepts = {}
+        self.by_icf = {}
+        for iri in model.classes:
+            entity = model.get(iri)
+            mappings = get_axiom_mappings(model, iri) or [
+                {"uri": uri, "code": "", "manual": ""} for uri in entity.icf_uris]
+            self.concepts[iri] = {
+                "iri": iri,
+                "label": model.label(iri),
+                "labels": [{"text": text, "lang": lang} for text, lang in entity.labels],
+                "definition": entity.definitions[0][0] if entity.definitions else None,
+                "parents": list(entity.parents),
+                "children": list(model.children(iri)),
+                "icf": mappings,
+            }
+            for mapping in mappings:
+                for key in (mapping["uri"], mapping["code"]):
+                    if key:
+                        concepts = self.by_icf.setdefault(icf_key(key), [])
+                        if iri not in concepts:
+                            concepts.append(iri)
+
+    def concept(self, name):
+        return self.concepts.get(expand(name))
+
+    def icf(self, code):
+        iris = self.by_icf.get(icf_key(code))
+        if iris is None:
+            return None
+        return {"code": code, "concepts": [{"iri": iri, "label": self.concepts[iri]["label"]} for iri in iris]}
+
+    def search(self, query, limit=20):
+        return self.labels.search(query, limit=limit)
+
+    def _disease(self, orpha_code, profile):
+        return {"orpha_code": str(orpha_code), "associations": [
+            dict(entry, label=self.model.label(entry["disability"]) if entry["disability"] else None)
+            for entry in profile]}
+
+    def disease(self, orpha_code):
+        if self.profiles is None:
+            raise HTTPError(503, "no profile store loaded (run disaxml_ofco_parser.py --profile-store)")
+        profile = self.profiles.get(orpha_code)
+        return None if profile is None else self._disease(orpha_code, profile)
+
+    def diseases(self, orpha_codes):
+        if self.profiles is None:
+            raise HTTPError(503, "no profile store loaded (run disaxml_ofco_parser.py --profile-store)")
+        found = self.profiles.get_many(orpha_codes)
+        return {str(code): self._disease(code, profile) for code, profile in found.items()}
+
+
+class OFCOService:
+    """Routes HTTP requests to LookupIndexes, GET responses cached in an LRU"""
+
+    def __init__(self, indexes, cache_size=CACHE_SIZE):
+        self.indexes = indexes
+        self.requests = 0
+        self.get = lru_cache(maxsize=cache_size)(self._get)
+
+    def _get(self, target):
+        """Response (status, JSON bytes) of a GET target (path + query string)"""
+        try:
+            return 200, json.dumps(self._route_get(target)).encode("utf-8")
+        except HTTPError as e:
+            return e.status, json.dumps({"error": str(e)}).encode("utf-8")
+
+    def _route_get(self, target):
+        url = urlsplit(target)
+        parts = url.path.strip("/").split("/", 1)
+        arg = unquote(parts[1]) if len(parts) > 1 else ""
+        query = parse_qs(url.query)
+        if parts[0] == "concept" and arg:
+            result = self.indexes.concept(arg)
+        elif parts[0] == "icf" and arg:
+            result = self.indexes.icf(arg)
+        elif parts[0] == "disease" and arg.isdigit():
+            result = self.indexes.disease(arg)
+        elif parts[0] == "search" and query.get("q"):
+            limit = query.get("limit", ["20"])[0]
+            if not limit.isdigit():
+                raise HTTPError(400, "limit must be an integer")
+            result = self.indexes.search(query["q"][0], int(limit))
+        elif parts[0] == "health":
+            info = self.get.cache_info()
+            result = {"concepts": len(self.indexes.concepts), "icf_keys": len(self.indexes.by_icf),
+                      "diseases": len(self.indexes.profiles) if self.indexes.profiles is not None else 0,
+                      "requests": self.requests,
+                      "cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize}}
+        else:
+            raise HTTPError(404, f"unknown endpoint {url.path}")
+        if result is None:
+            raise HTTPError(404, f"{arg} not found")
+        return result
+
+    def post(self, path, body):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "invalid JSON body")
+        routes = {
+            "/batch/concepts": ("iris", lambda items: {i: self.indexes.concept(i) for i in items}),
+            "/batch/icf": ("codes", lambda items: {c: self.indexes.icf(c) for c in items}),
+            "/batch/diseases": ("orpha_codes", self.indexes.diseases),
+        }
+        if path not in routes:
+            raise HTTPError(404, f"unknown endpoint {path}")
+        key, lookup = routes[path]
+        items = payload.get(key) if isinstance(payload, dict) else None
+        if not isinstance(items, list):
+            raise HTTPError(400, f'expected {{"{key}": [...]}}')
+        if len(items) > MAX_BATCH:
+            raise HTTPError(413, f"at most {MAX_BATCH} items per batch")
+        if path == "/batch/diseases" and not all(str(item).isdigit() for item in items):
+            raise HTTPError(400, "OrphaCodes must be integers")
+        return 200, json.dumps(lookup([str(item) for item in items])).encode("utf-8")
+
+    async def handle(self, reader, writer):
+        """One connection: requests are answered in order until the client closes (keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, b'{"error": "bad request line"}', False)
+                    break
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive")
+                self.requests += 1
+                try:
+                    if method == "GET":
+                        # /health reports live counters, never cached
+                        status, body = self._get(target) if target.startswith("/health") else self.get(target)
+                    elif method == "POST":
+                        length = headers.get("content-length", "0").strip()
+                        if not length.isdigit():
+                            # the end of the body is unknown, the connection cannot be reused
+                            keep_alive = False
+                            raise HTTPError(400, "invalid Content-Length")
+                        length = int(length)
+                        if length > MAX_BODY:
+                            keep_alive = False
+                            raise HTTPError(413, "request body too large")
+                        status, body = self.post(urlsplit(target).path, await reader.readexactly(length))
+                    else:
+                        raise HTTPError(405, f"{method} not supported")
+                except HTTPError as e:
+                    status, body = e.status, json.dumps({"error": str(e)}).encode("utf-8")
+                except Exception as e:
+                    status, body = 500, json.dumps({"error": repr(e)}).encode("utf-8")
+                await self._respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, body, keep_alive):
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(service, host=HOST, port=PORT):
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"OFCO lookup service on http://{host}:{port}/ (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP lookup service over OFCO concepts, ICF mappings and disease profiles")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--owl", default=OWL_FILE)
+    parser.add_argument("--profiles", default=PROFILE_STORE_FILE, help="profile store of disaxml_ofco_parser.py")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="GET responses kept in the LRU cache")
+    args = parser.parse_args()
+
+    try:
+        model = load_ofco(args.owl)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    profiles = ProfileStore(args.profiles) if os.path.exists(args.profiles) else None
+    if profiles is None:
+        print(f"Warning: {args.profiles} not found, /disease endpoints disabled")
+    indexes = LookupIndexes(model, profiles)
+    print(f"{len(indexes.concepts)} concepts, {len(indexes.by_icf)} ICF codes / URIs, "
+          f"{len(profiles) if profiles is not None else 0} disease profiles")
+    try:
+        asyncio.run(serve(OFCOService(indexes, args.cache_size), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# Disease similarity search over the OFCO disability profiles
+# Marc Hanauer @Orphanet 2025
+# pip install scipy
+# The associations of Diseases_annotated_with_OFCO.owl (loaded with ofco_query.py) become a sparse
+# disorder x OFCO concept matrix (scipy.sparse CSR):
+#   - weight of a disability = severity weight x frequency weight (absent qualifier: DEFAULT_WEIGHT),
+#     the strongest association is kept when a disorder has the same disability twice
+#   - with --propagate F each association also weighs F on every rdfs:subClassOf ancestor of its
+#     disability (one sparse product with the closure of ofco_query.Hierarchy), so that disorders
+#     annotated with sibling disabilities are close too. The root category is shared by every
+#     disorder and is left out.
+# Neighbours are the top-k cosine (weighted) or Jaccard (annotated concepts) similarities, computed
+# with sparse matrix products on blocks of --chunk-size disorders: an all-pairs job only holds one
+# chunk x disorders block of scores in memory.
+#
+# Usage : python ofco_similarity.py neighbours 1000 [ORPHA:1001 ...] [--k 10] [--metric cosine|jaccard] [--propagate 0.5]
+#         python ofco_similarity.py all-pairs [--output similar_disorders.tsv] [--k 10] [--chunk-size 1024]
+#         [--owl OFCO_thesaurus.owl] [--annotations Diseases_annotated_with_OFCO.owl]
+
+import csv
+import sys
+import argparse
+
+import numpy as np
+from scipy import sparse
+
+from ofco_loader import OFCO_NS
+from ofco_query import open_store, short, ROOT_CATEGORY, OWL_FILE, ANNOTATIONS_FILE
+
+OUTPUT_FILE = "similar_disorders.tsv"
+ORDO_PREFIX = "http://www.orpha.net/ORDO/Orphanet_"
+CHUNK_SIZE = 1024
+TOP_K = 10
+
+SEVERITY_WEIGHTS = {
+    OFCO_NS + "Low": 0.25,
+    OFCO_NS + "Moderate": 0.5,
+    OFCO_NS + "Severe": 0.75,
+    OFCO_NS + "Complete": 1.0,
+    OFCO_NS + "Unspecified": 0.5,
+}
+FREQUENCY_WEIGHTS = {
+    OFCO_NS + "Occasional": 0.4,
+    OFCO_NS + "Frequent": 0.7,
+    OFCO_NS + "VeryFrequent": 1.0,
+}
+DEFAULT_WEIGHT = 0.5
+METRICS = ("cosine", "jaccard")
+
+
+def _qualifier_weights(store, qualifier, weights):
+    """Weight of each association for one qualifier (DEFAULT_WEIGHT when absent or unknown)"""
+    table = np.array([weights.get(iri, DEFAULT_WEIGHT) for iri in store.vocabularies[qualifier]]
+                     + [DEFAULT_WEIGHT])
+    # code -1 (absent) picks the last entry
+    return table[store.qualifiers[qualifier]]
+
+
+def profile_matrix(store, propagate=0.0):
+    """Sparse disorder x concept matrix (CSR, float64) of an AnnotationStore"""
+    hierarchy = store.hierarchy
+    known = store.disability >= 0
+    weights = (_qualifier_weights(store, "hasSeverity", SEVERITY_WEIGHTS)
+               * _qualifier_weights(store, "hasFrequency", FREQUENCY_WEIGHTS))[known]
+    rows, cols = store.disorder[known], store.disability[known]
+
+    # one entry per (disorder, concept): the strongest association
+    shape = (len(store.disorders), len(hierarchy))
+    keys, inverse = np.unique(rows.astype(np.int64) * shape[1] + cols, return_inverse=True)
+    strongest = np.zeros(len(keys))
+    np.maximum.at(strongest, inverse, weights)
+    matrix = sparse.csr_matrix((strongest, (keys // shape[1], keys % shape[1])), shape=shape)
+
+    if propagate:
+        closure = sparse.csr_matrix(hierarchy.ancestors, dtype=np.float64) * propagate
+        closure.setdiag(1.0)
+        matrix = matrix @ closure
+        # concepts every profile falls under carry no information
+        shared = hierarchy.ancestors[hierarchy.ids[ROOT_CATEGORY]] if ROOT_CATEGORY in hierarchy.ids else []
+        keep = np.ones(shape[1])
+        keep[np.flatnonzero(shared)] = 0
+        matrix = matrix @ sparse.diags(keep)
+    matrix.eliminate_zeros()
+    return matrix.tocsr()
+
+
+class SimilarityIndex:
+    """Top-k neighbour queries on a disorder x concept profile matrix"""
+
+    def __init__(self, matrix, disorders, metric="cosine"):
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r} ({', '.join(METRICS)})")
+        self.metric = metric
+        self.disorders = list(disorders)
+        self.positions = {iri: i for i, iri in enumerate(self.disorders)}
+        if metric == "cosine":
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            self.matrix = (sparse.diags(1 / norms) @ matrix).tocsr()
+        else:
+            self.matrix = (matrix > 0).astype(np.float64).tocsr()
+            self.sizes = np.asarray(self.matrix.sum(axis=1)).ravel()
+        self._transposed = self.matrix.T.tocsc()
+
+    def __len__(self):
+        return len(self.disorders)
+
+    def position(self, disorder):
+        """Row of a disorder given as IRI, ORPHA:123, Orphanet_123 or 123 (KeyError if unknown)"""
+        code = str(disorder).rsplit("_", 1)[-1].rsplit(":", 1)[-1]
+        iri = disorder if disorder in self.positions else ORDO_PREFIX + code
+        return self.positions[iri]
+
+    def scores(self, rows):
+        """Dense block of similarities rows x all disorders"""
+        block = (self.matrix[rows] @ self._transposed).toarray()
+        if self.metric == "jaccard":
+            union = self.sizes[rows][:, None] + self.sizes[None, :] - block
+            np.divide(block, union, out=block, where=union > 0)
+        return block
+
+    def top_k(self, rows, k=TOP_K):
+        """For each row: (neighbour rows, scores), best first, without the row itself and zero scores"""
+        rows = np.asarray(rows)
+        block = self.scores(rows)
+        block[np.arange(len(rows)), rows] = -1.0
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return [(np.empty(0, dtype=np.intp), np.empty(0))] * len(rows)
+        best = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(block, best, axis=1)
+        order = np.lexsort((best, -best_scores), axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        return [(b[s > 0], s[s > 0]) for b, s in zip(best, best_scores)]
+
+    def neighbours(self, disorder, k=TOP_K):
+        """[(disorder IRI, score)] most similar to one disorder"""
+        (found, found_scores), = self.top_k([self.position(disorder)], k)
+        return [(self.disorders[i], float(s)) for i, s in zip(found, found_scores)]
+
+    def all_pairs(self, k=TOP_K, chunk_size=CHUNK_SIZE):
+        """Yield (disorder IRI, rank, neighbour IRI, score) for every disorder, chunk_size rows at a time"""
+        for start in range(0, len(self), chunk_size):
+            rows = np.arange(start, min(start + chunk_size, len(self)))
+            for row, (found, found_scores) in zip(rows, self.top_k(rows, k)):
+                for rank, (i, s) in enumerate(zip(found, found_scores), 1):
+                    yield self.disorders[row], rank, self.disorders[i], float(s)
+
+
+def open_index(owl_file=OWL_FILE, annotations_file=ANNOTATIONS_FILE, metric="cosine", propagate=0.0):
+    store = open_store(owl_file, annotations_file)
+    return SimilarityIndex(profile_matrix(store, propagate), store.disorders, metric)
+
+
+def write_pairs(pairs, output):
+    """Write all_pairs() rows as TSV, returns the number of rows"""
+    count = 0
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t")
+        writer.writerow(["disorder", "rank", "neighbour", "score"])
+        for disorder, rank, neighbour, score in pairs:
+            writer.writerow([disorder, rank, neighbour, f"{score:.6f}"])
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disorders with a similar OFCO disability profile")
+    sub = parser.add_subparsers(dest="command", required=True)
+    neighbours = sub.add_parser("neighbours", help="most similar disorders of some disorders")
+    neighbours.add_argument("disorders", nargs="+", help="OrphaCode, ORPHA:code or disorder IRI")
+    pairs = sub.add_parser("all-pairs", help="top-k neighbours of every disorder")
+    pairs.add_argument("--output", default=OUTPUT_FILE)
+    pairs.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="disorders scored per block")
+    for command in (neighbours, pairs):
+        command.add_argument("--owl", default=OWL_FILE)
+        command.add_argument("--annotations", default=ANNOTATIONS_FILE)
+        command.add_argument("--k", type=int, default=TOP_K)
+        command.add_argument("--metric", choices=METRICS, default="cosine")
+        command.add_argument("--propagate", type=float, default=0.0,
+                             help="weight given to the ancestors of each disability (0 = none)")
+    args = parser.parse_args()
+
+    try:
+        index = open_index(args.owl, args.annotations, args.metric, args.propagate)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+
+    if args.command == "all-pairs":
+        count = write_pairs(index.all_pairs(args.k, args.chunk_size), args.output)
+        print(f"{count} neighbour pairs of {len(index)} disorders ({args.metric}) -> {args.output}")
+        return 0
+
+    status = 0
+    for disorder in args.disorders:
+        try:
+            found = index.neighbours(disorder, args.k)
+        except KeyError:
+            print(f"Error: disorder {disorder} not found in {args.annotations}")
+            status = 1
+            continue
+        print(f"{short(index.disorders[index.position(disorder)])}")
+        for iri, score in found:
+            print(f"\t{short(iri)}\t{score:.4f}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# Persistent, pre-indexed snapshot of OFCO_thesaurus.owl (SQLite)
+# Marc Hanauer @Orphanet 2025
+# The snapshot is keyed by the SHA-256 of the OWL file and rebuilt automatically when the
+# file changes, so scripts open an indexed database instead of re-parsing RDF/XML.
+#
+# Usage:
+#   python ofco_snapshot.py [OFCO_thesaurus.owl]      -> build (or refresh) the snapshot
+#   from ofco_snapshot import open_snapshot, load_model
+#   conn = open_snapshot("OFCO_thesaurus.owl")          -> sqlite3 connection (read-only)
+#   model = load_model("OFCO_thesaurus.owl")            -> ofco_loader.OFCOModel
+
+import os
+import sys
+import sqlite3
+import hashlib
+from collections import defaultdict
+
+from ofco_loader import parse_ofco, OFCOModel, Entity, Axiom
+
+OWL_FILE = "OFCO_thesaurus.owl"
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE concepts (id INTEGER PRIMARY KEY, iri TEXT NOT NULL UNIQUE);
+CREATE TABLE types (concept_id INTEGER NOT NULL, type TEXT NOT NULL);
+CREATE TABLE labels (concept_id INTEGER NOT NULL, label TEXT NOT NULL, lang TEXT);
+CREATE TABLE definitions (concept_id INTEGER NOT NULL, definition TEXT NOT NULL, lang TEXT);
+CREATE TABLE parents (concept_id INTEGER NOT NULL, parent TEXT NOT NULL);
+CREATE TABLE icf_uris (concept_id INTEGER NOT NULL, uri TEXT NOT NULL);
+CREATE TABLE icf_codes (concept_id INTEGER NOT NULL, code TEXT NOT NULL);
+CREATE TABLE restrictions (concept_id INTEGER NOT NULL, property TEXT NOT NULL, value TEXT);
+CREATE TABLE axioms (id INTEGER PRIMARY KEY, source TEXT, property TEXT, target TEXT);
+CREATE TABLE axiom_annotations (axiom_id INTEGER NOT NULL, property TEXT NOT NULL, value TEXT);
+CREATE INDEX types_type ON types (type, concept_id);
+CREATE INDEX labels_concept ON labels (concept_id);
+CREATE INDEX labels_label ON labels (label COLLATE NOCASE);
+CREATE INDEX definitions_concept ON definitions (concept_id);
+CREATE INDEX parents_concept ON parents (concept_id);
+CREATE INDEX parents_parent ON parents (parent);
+CREATE INDEX icf_uris_concept ON icf_uris (concept_id);
+CREATE INDEX icf_uris_uri ON icf_uris (uri);
+CREATE INDEX icf_codes_concept ON icf_codes (concept_id);
+CREATE INDEX restrictions_value ON restrictions (property, value);
+CREATE INDEX axioms_source ON axioms (source, property);
+CREATE INDEX axioms_target ON axioms (target);
+CREATE INDEX axiom_annotations_axiom ON axiom_annotations (axiom_id);
+"""
+
+# Per-concept tables, in Entity field order
+CONCEPT_TABLES = [
+    ("types", "type", "types"),
+    ("labels", "label, lang", "labels"),
+    ("definitions", "definition, lang", "definitions"),
+    ("parents", "parent", "parents"),
+    ("icf_uris", "uri", "icf_uris"),
+    ("icf_codes", "code", "icf_codes"),
+    ("restrictions", "property, value", "restrictions"),
+]
+
+
+def snapshot_path(owl_file):
+    """OFCO_thesaurus.owl -> OFCO_thesaurus.snapshot.sqlite (next to the OWL file)"""
+    return os.path.splitext(owl_file)[0] + ".snapshot.sqlite"
+
+
+def owl_sha256(owl_file):
+    with open(owl_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_snapshot(owl_file=OWL_FILE, snapshot_file=None, digest=None):
+    """Parse the OWL file and compile it into a SQLite snapshot (written atomically)"""
+    snapshot_file = snapshot_file or snapshot_path(owl_file)
+    digest = digest or owl_sha256(owl_file)
+    model = parse_ofco(owl_file)
+
+    tmp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    conn = sqlite3.connect(tmp_file)
+    try:
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("schema_version", SCHEMA_VERSION),
+                ("owl_sha256", digest),
+                ("owl_file", os.path.basename(owl_file)),
+            ])
+            conn.executemany("INSERT INTO concepts VALUES (?, ?)",
+                             ((i, iri) for i, iri in enumerate(model.entities)))
+            for table, columns, field in CONCEPT_TABLES:
+                placeholders = ", ".join("?" * (columns.count(",") + 2))
+                rows = []
+                for i, entity in enumerate(model.entities.values()):
+                    for value in getattr(entity, field):
+                        rows.append((i, *value) if isinstance(value, tuple) else (i, value))
+                conn.executemany(f"INSERT INTO {table} (concept_id, {columns}) VALUES ({placeholders})", rows)
+            conn.executemany("INSERT INTO axioms VALUES (?, ?, ?, ?)",
+                             ((i, a.source, a.property, a.target) for i, a in enumerate(model.axioms)))
+            conn.executemany("INSERT INTO axiom_annotations VALUES (?, ?, ?)",
+                             ((i, prop, value) for i, a in enumerate(model.axioms)
+                              for prop, value in a.annotations))
+        conn.close()
+        os.replace(tmp_file, snapshot_file)
+    finally:
+        conn.close()
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return snapshot_file
+
+
+def _snapshot_digest(snapshot_file):
+    """owl_sha256 stored in a snapshot, None if missing or unreadable"""
+    if not os.path.exists(snapshot_file):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{snapshot_file}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        return None
+    if meta.get("schema_version") != SCHEMA_VERSION:
+        return None
+    return meta.get("owl_sha256")
+
+
+def open_snapshot(owl_file=OWL_FILE, snapshot_file=None):
+    """
+    Read-only connection to the snapshot of an OWL file.
+    The snapshot is (re)built first if missing or if the OWL file hash changed.
+    """
+    snapshot_file = snapshot_file or snapshot_path(owl_file)
+    digest = owl_sha256(owl_file)
+    if _snapshot_digest(snapshot_file) != digest:
+        build_snapshot(owl_file, snapshot_file, digest)
+    return sqlite3.connect(f"file:{snapshot_file}?mode=ro", uri=True)
+
+
+def restriction_index(conn, prop):
+    """owl:hasValue restriction value -> class IRI (indexed lookup, no model needed)"""
+    return dict(conn.execute(
+        "SELECT r.value, c.iri FROM restrictions r JOIN concepts c ON c.id = r.concept_id "
+        "JOIN types t ON t.concept_id = c.id AND t.type = 'http://www.w3.org/2002/07/owl#Class' "
+        "WHERE r.property = ? ORDER BY c.id, r.rowid", (prop,)))
+
+
+def load_model(owl_file=OWL_FILE, snapshot_file=None):
+    """Build an ofco_loader.OFCOModel from the snapshot (no RDF/XML parsing)"""
+    conn = open_snapshot(owl_file, snapshot_file)
+    try:
+        iris = [iri for _, iri in conn.execute("SELECT id, iri FROM concepts ORDER BY id")]
+        fields = {}
+        for table, columns, field in CONCEPT_TABLES:
+            values = defaultdict(list)
+            single = "," not in columns
+            for row in conn.execute(f"SELECT concept_id, {columns} FROM {table} ORDER BY rowid"):
+                values[row[0]].append(row[1] if single else tuple(row[1:]))
+            fields[field] = values
+        entities = {
+            iri: Entity(iri, *(tuple(fields[field].get(i, ())) for _, _, field in CONCEPT_TABLES))
+            for i, iri in enumerate(iris)
+        }
+        annotations = defaultdict(list)
+        for axiom_id, prop, value in conn.execute(
+                "SELECT axiom_id, property, value FROM axiom_annotations ORDER BY rowid"):
+            annotations[axiom_id].append((prop, value))
+        axioms = [Axiom(source, prop, target, tuple(annotations.get(i, ())))
+                  for i, source, prop, target in conn.execute(
+                      "SELECT id, source, property, target FROM axioms ORDER BY id")]
+    finally:
+        conn.close()
+    return OFCOModel(entities, axioms)
+
+
+if __name__ == "__main__":
+    owl_file = sys.argv[1] if len(sys.argv) > 1 else OWL_FILE
+    snapshot_file = snapshot_path(owl_file)
+    if _snapshot_digest(snapshot_file) == owl_sha256(owl_file):
+        print(f"Snapshot up to date: {snapshot_file}")
+    else:
+        build_snapshot(owl_file, snapshot_file)
+        print(f"Snapshot built: {snapshot_file}")
@@ -1,159 +1,257 @@
 # Convert OFCO_thesaurus.owl to CSV file, with ICF mappings
 # Marc Hanauer @Orphanet 2025
-# pip install rdflib if needed
 # Modified for Excel compatibility (semicolon separator, utf-8-sig)
 # Adding Definition and annotation properties section at the end
+# Uses the shared ofco_loader model (no rdflib parsing). Unlike the former rdflib version, the
+# lines of a concept are written once even if it has several English rdfs:label (Learning had
+# its Understanding parent line twice)
 # NB: the output file is used to run ofco_check_IRI_URI.py
+# --profile / --metrics-json [PATH]: time and memory per stage (ofco_metrics.py)
+# Normalized export: --xlsx [PATH] (one sheet per table, openpyxl write-only mode) and/or
+# --parquet [BASE] (BASE.<table>.parquet through pandas, pip install pyarrow) write separate
+# concepts / parents / icf_mappings / annotation_properties tables instead of the CSV, where
+# every concept line is repeated for each parent x ICF mapping. --csv keeps the CSV too.
 # TODO : use filename as argument
 
 
-from rdflib import Graph, RDFS, Namespace, URIRef, RDF, OWL
 import csv
+import sys
+import argparse
+from openpyxl import Workbook
+import ofco_metrics
+from ofco_metrics import RunMetrics
+from ofco_loader import load_ofco, axiom_value, HAS_ICF_CODE, ECO_0000218, OWL_ANNOTATION_PROPERTY
 
 # Local files
 OWL_FILE = "OFCO_thesaurus.owl"
 CSV_FILE = "OFCO_thesaurus_ICF.csv"
+XLSX_FILE = "OFCO_thesaurus.xlsx"
+PARQUET_BASE = "OFCO_thesaurus"
 
-# Namespaces
-OFCO = Namespace("https://w3id.org/ofco/")
-OBO = Namespace("http://purl.obolibrary.org/obo/")
-# Note: EFO definition URI is http://www.ebi.ac.uk/efo/definition
-# We use the base namespace to construct it
-EFO = Namespace("http://www.ebi.ac.uk/efo/") 
+# Normalized export: table (sheet / Parquet file) -> columns
+TABLES = {
+    "concepts": ["IRI", "Label", "Definition"],
+    "parents": ["IRI", "Parent"],
+    "icf_mappings": ["IRI", "ICF URI", "ICF Code", "Manual Mapping", "Source"],
+    "annotation_properties": ["IRI", "Label", "Definition"],
+}
 
-HAS_ICF_URI = OFCO.hasICFuri
-HAS_ICF_CODE = OFCO.hasICFcode
-ECO_0000218 = OBO.ECO_0000218
 
-print("Loading OWL graph...")
-g = Graph()
-g.parse(OWL_FILE, format="xml")
-print(f"Graph loaded with {len(g)} triples.")
-
-def get_axiom_mappings(source):
+def get_axiom_mappings(model, source):
     """
     Retrieve mappings annotated via owl:Axiom (hasICFuri)
     Returns a list of dicts: {'uri':, 'code':, 'manual':}
     """
     mappings = []
-    # Search for axioms having 'source' as the subject
-    for axiom in g.subjects(OWL.annotatedSource, source):
-        # Check if it is indeed an annotation on hasICFuri
-        if (axiom, OWL.annotatedProperty, HAS_ICF_URI) in g:
-             target_uri = g.value(axiom, OWL.annotatedTarget)
-             
-             # Retrieve the code (if present)
-             code_val = g.value(axiom, HAS_ICF_CODE)
-             code = str(code_val) if code_val else ""
-             
-             # Retrieve manual assertion (ECO_0000218)
-             manual_val = g.value(axiom, ECO_0000218)
-             manual = str(manual_val) if manual_val else ""
-
-             mappings.append({
-                 'uri': str(target_uri),
-                 'code': code,
-                 'manual': manual
-             })
+    for axiom in model.icf_axioms(source):
+        mappings.append({
+            'uri': axiom.target,
+            'code': axiom_value(axiom, HAS_ICF_CODE),
+            'manual': axiom_value(axiom, ECO_0000218)
+        })
     return mappings
 
-data = []
 
-# --- 1. Concept Extraction (Classes) ---
-print("Extracting concepts...")
-for s in g.subjects(RDFS.label, None):
-    # Exclude Annotation Properties from the main list (processed separately)
-    if (s, RDF.type, OWL.AnnotationProperty) in g:
-        continue
+def extract_concepts(model):
+    """One CSV line per concept x parent x ICF mapping"""
+    data = []
+    for entity in model.entities.values():
+        # Exclude Annotation Properties from the main list (processed separately)
+        if not entity.labels or OWL_ANNOTATION_PROPERTY in entity.types:
+            continue
+
+        iri = entity.iri
+        label = entity.labels[0][0]
+
+        # Definition retrieval (efo:definition)
+        # Replace newlines with spaces to ensure CSV integrity
+        definition = entity.definitions[0][0].replace('\n', ' ') if entity.definitions else ""
+
+        # Parents
+        parents = list(entity.parents) or [""]
+
+        # 1. Annotated mappings (priority)
+        axiom_mappings = get_axiom_mappings(model, iri)
+
+        # 2. Otherwise, direct mappings
+        if axiom_mappings:
+            mappings_to_use = axiom_mappings
+        else:
+            uris = list(entity.icf_uris) or [""]
+            codes = list(entity.icf_codes) or [""]
+
+            mappings_to_use = [
+                {'uri': u, 'code': c, 'manual': ''}
+                for u in uris for c in codes
+                if u != "" or c != ""
+            ]
+            if not mappings_to_use:
+                mappings_to_use = [{'uri': '', 'code': '', 'manual': ''}]
+
+        # Generate CSV lines
+        for parent in parents:
+            for m in mappings_to_use:
+                data.append([
+                    iri,
+                    label,
+                    definition, # Definition column
+                    parent,
+                    m['uri'],
+                    m['code'],
+                    m['manual']
+                ])
+    return data
+
 
-    iri = str(s)
-    label = str(g.value(s, RDFS.label))
+def extract_annotation_properties(model):
+    """One CSV line per owl:AnnotationProperty"""
+    annotation_properties_data = []
+    for iri in model.annotation_properties:
+        entity = model.get(iri)
+        label = entity.labels[0][0] if entity.labels else ""
+        definition = entity.definitions[0][0].replace('\n', ' ') if entity.definitions else ""
+        annotation_properties_data.append([iri, label, definition, "owl:AnnotationProperty"])
+    return annotation_properties_data
 
-    # Definition retrieval (efo:definition)
-    # Look for the value associated with property http://www.ebi.ac.uk/efo/definition
-    definition_val = g.value(s, EFO.definition)
-    # Replace newlines with spaces to ensure CSV integrity
-    definition = str(definition_val).replace('\n', ' ') if definition_val else ""
 
-    # Parents
-    parents = [str(p) for p in g.objects(s, RDFS.subClassOf) if isinstance(p, URIRef)] 
-    if not parents:
-        parents = [""]
+def _concept_entities(model):
+    """Entities exported as concepts (same selection as extract_concepts)"""
+    for entity in model.entities.values():
+        if entity.labels and OWL_ANNOTATION_PROPERTY not in entity.types:
+            yield entity
 
-    # 1. Annotated mappings (priority)
-    axiom_mappings = get_axiom_mappings(s)
 
-    # 2. Otherwise, direct mappings
+def _definition(entity):
+    return entity.definitions[0][0].replace('\n', ' ') if entity.definitions else ""
+
+
+def iter_icf_mappings(model, entity):
+    """
+    (ICF URI, ICF code, manual mapping, source) of a concept: its owl:Axiom mappings, otherwise its
+    direct hasICFuri / hasICFcode values, paired only when there are as many URIs as codes
+    """
+    axiom_mappings = get_axiom_mappings(model, entity.iri)
     if axiom_mappings:
-        mappings_to_use = axiom_mappings
+        for m in axiom_mappings:
+            yield m['uri'], m['code'], m['manual'], "axiom"
+    elif len(entity.icf_uris) == len(entity.icf_codes):
+        for uri, code in zip(entity.icf_uris, entity.icf_codes):
+            yield uri, code, "", "direct"
     else:
-        uris = [str(o) for o in g.objects(s, HAS_ICF_URI)]
-        codes = [str(o) for o in g.objects(s, HAS_ICF_CODE)]
-        
-        # Ensure lists are not empty for the loop
-        if not codes: codes = [""]
-        if not uris: uris = [""]
-
-        mappings_to_use = [
-            {'uri': u, 'code': c, 'manual': ''} 
-            for u in uris for c in codes
-            if u != "" or c != ""
-        ]
-        if not mappings_to_use:
-             mappings_to_use = [{'uri': '', 'code': '', 'manual': ''}]
-
-    # Generate CSV lines
-    for parent in parents:
-        for m in mappings_to_use:
-            data.append([
-                iri,
-                label,
-                definition, # Definition column
-                parent,
-                m['uri'],
-                m['code'],
-                m['manual']
-            ])
-
-# --- 2. Annotation Properties Extraction ---
-print("Extracting Annotation Properties...")
-annotation_properties_data = []
-
-# Search for everything typed as owl:AnnotationProperty
-for s in g.subjects(RDF.type, OWL.AnnotationProperty):
-    iri = str(s)
-    
-    # Label
-    label_val = g.value(s, RDFS.label)
-    label = str(label_val) if label_val else ""
-    
-    # Definition
-    definition_val = g.value(s, EFO.definition)
-    definition = str(definition_val).replace('\n', ' ') if definition_val else ""
-    
-    rdf_type = "owl:AnnotationProperty"
-    
-    annotation_properties_data.append([iri, label, definition, rdf_type])
-
-
-# --- 3. Writing CSV File ---
-# 'utf-8-sig' allows Excel to recognize special characters (BOM)
-with open(CSV_FILE, 'w', newline='', encoding='utf-8-sig') as f:
-    # Use semicolon as separator for Excel compatibility
-    writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-    
-    # Headers for concepts
-    writer.writerow(["IRI", "Label", "Definition", "Parent", "ICF URI", "ICF Code", "Manual Mapping"])
-    writer.writerows(data)
-    
-    # Visual separation
-    writer.writerow([])
-    writer.writerow([])
-    
-    # Annotation Properties Section
-    writer.writerow(["--- SECTION ANNOTATION PROPERTIES ---", "", "", ""])
-    writer.writerow(["IRI", "Label", "Definition", "Type"])
-    writer.writerows(annotation_properties_data)
-
-print(f"Extraction complete: {len(data)} concept lines and {len(annotation_properties_data)} annotation properties.")
-print(f"File generated: {CSV_FILE}")
\ No newline at end of file
+        for uri in entity.icf_uris:
+            yield uri, "", "", "direct"
+        for code in entity.icf_codes:
+            yield "", code, "", "direct"
+
+
+def normalized_tables(model):
+    """{table: row generator} of the normalized export, one row per fact (see TABLES)"""
+    return {
+        "concepts": ([e.iri, e.labels[0][0], _definition(e)] for e in _concept_entities(model)),
+        "parents": ([e.iri, parent] for e in _concept_entities(model) for parent in e.parents),
+        "icf_mappings": ([e.iri, *mapping] for e in _concept_entities(model) for mapping in iter_icf_mappings(model, e)),
+        "annotation_properties": (row[:3] for row in extract_annotation_properties(model)),
+    }
+
+
+def write_xlsx(filename, tables):
+    """One sheet per table, rows streamed to the file (openpyxl write-only mode). Returns {table: rows}"""
+    workbook = Workbook(write_only=True)
+    counts = {}
+    for name, rows in tables.items():
+        sheet = workbook.create_sheet(name)
+        sheet.append(TABLES[name])
+        counts[name] = 0
+        for row in rows:
+            sheet.append(row)
+            counts[name] += 1
+    workbook.save(filename)
+    return counts
+
+
+def write_parquet(base, tables):
+    """<base>.<table>.parquet files (pandas, needs pyarrow or fastparquet). Returns {table: rows}"""
+    import pandas as pd
+    counts = {}
+    for name, rows in tables.items():
+        frame = pd.DataFrame(list(rows), columns=TABLES[name], dtype="string")
+        frame.to_parquet(f"{base}.{name}.parquet", index=False)
+        counts[name] = len(frame)
+    return counts
+
+
+def write_csv(filename, data, annotation_properties_data):
+    # 'utf-8-sig' allows Excel to recognize special characters (BOM)
+    with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+        # Use semicolon as separator for Excel compatibility
+        writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+        # Headers for concepts
+        writer.writerow(["IRI", "Label", "Definition", "Parent", "ICF URI", "ICF Code", "Manual Mapping"])
+        writer.writerows(data)
+
+        # Visual separation
+        writer.writerow([])
+        writer.writerow([])
+
+        # Annotation Properties Section
+        writer.writerow(["--- SECTION ANNOTATION PROPERTIES ---", "", "", ""])
+        writer.writerow(["IRI", "Label", "Definition", "Type"])
+        writer.writerows(annotation_properties_data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert OFCO_thesaurus.owl to CSV with ICF mappings")
+    parser.add_argument("--xlsx", nargs="?", const=XLSX_FILE, metavar="PATH",
+                        help=f"normalized export, one sheet per table (default path: {XLSX_FILE})")
+    parser.add_argument("--parquet", nargs="?", const=PARQUET_BASE, metavar="BASE",
+                        help=f"normalized export as BASE.<table>.parquet (default base: {PARQUET_BASE}, pip install pyarrow)")
+    parser.add_argument("--csv", action="store_true", help=f"with --xlsx / --parquet, also write {CSV_FILE}")
+    ofco_metrics.add_arguments(parser, __file__)
+    args = parser.parse_args()
+    metrics = RunMetrics(__file__, trace_memory=args.profile)
+
+    print("Loading OWL file...")
+    with metrics.stage("ontology load"):
+        model = load_ofco(OWL_FILE)
+    print(f"Ontology loaded with {len(model)} entities and {len(model.axioms)} axioms.")
+
+    if args.xlsx:
+        with metrics.stage("xlsx export"):
+            counts = write_xlsx(args.xlsx, normalized_tables(model))
+        print(f"File generated: {args.xlsx} (" + ", ".join(f"{n} {name}" for name, n in counts.items()) + ")")
+    if args.parquet:
+        try:
+            with metrics.stage("parquet export"):
+                counts = write_parquet(args.parquet, normalized_tables(model))
+        except ImportError as e:
+            print(f"Error: Parquet export needs pyarrow (pip install pyarrow): {e}")
+            return 2
+        print(f"Files generated: {args.parquet}.{{{','.join(counts)}}}.parquet (" + ", ".join(f"{n} {name}" for name, n in counts.items()) + ")")
+    if (args.xlsx or args.parquet) and not args.csv:
+        metrics.report(args.metrics_json, profile=args.profile)
+        return 0
+
+    # --- 1. Concept Extraction (Classes) ---
+    print("Extracting concepts...")
+    with metrics.stage("concept extraction"):
+        data = extract_concepts(model)
+    metrics.count("concept_lines", len(data), stage="concept extraction")
+
+    # --- 2. Annotation Properties Extraction ---
+    print("Extracting Annotation Properties...")
+    with metrics.stage("annotation properties extraction"):
+        annotation_properties_data = extract_annotation_properties(model)
+
+    # --- 3. Writing CSV File ---
+    with metrics.stage("write"):
+        write_csv(CSV_FILE, data, annotation_properties_data)
+
+    print(f"Extraction complete: {len(data)} concept lines and {len(annotation_properties_data)} annotation properties.")
+    print(f"File generated: {CSV_FILE}")
+    metrics.report(args.metrics_json, profile=args.profile)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+# Single-pass validation engine for OFCO_thesaurus.owl
+# Marc Hanauer @Orphanet 2025
+# Unifies ofco_checkmissinglabels.py and ofco_check_IRI_URI.py : the ontology is loaded once
+# (SQLite snapshot, see ofco_snapshot.py), every entity is visited once and each visit feeds
+# all the registered checks. With --jobs N the entities are split across N processes, each
+# one running all the checks on its slice, and the partial results are merged.
+# Output : one JSON report (exit code 1 if a check of severity "error" has findings)
+#
+# Usage : python ofco_validate.py [--owl OFCO_thesaurus.owl] [--output OFCO_validation_report.json]
+#                                 [--checks name,name] [--jobs N] [--list]
+
+import sys
+import json
+import argparse
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ofco_loader import (load_ofco, axiom_value, OWL_CLASS, OWL_ANNOTATION_PROPERTY, OWL_NS,
+                         ECO_0000218, HAS_ORPHA_NUMBER, HAS_INTERNAL_REFERENCE)
+from ofco_snapshot import owl_sha256
+
+OWL_FILE = "OFCO_thesaurus.owl"
+OUTPUT_FILE = "OFCO_validation_report.json"
+
+# Registry of checks: name -> class
+CHECKS = {}
+
+
+def register_check(cls):
+    """Class decorator adding a check to the registry"""
+    CHECKS[cls.name] = cls
+    return cls
+
+
+class Check(ABC):
+    """
+    Base class of a check. visit() is called once per entity of the ontology,
+    merge() combines the partial state of another instance (parallel run),
+    findings() returns the sorted list of problems (dicts).
+    State must stay picklable (sets, dicts, lists).
+    A check missing one of these methods cannot be instantiated.
+    """
+    name = None
+    description = None
+    severity = "error"
+
+    @abstractmethod
+    def visit(self, model, entity):
+        """Feed one entity of the ontology to the check"""
+
+    @abstractmethod
+    def merge(self, other):
+        """Add the partial state of another instance of the same check"""
+
+    @abstractmethod
+    def findings(self):
+        """Sorted list of problems (dicts)"""
+
+
+class _ListCheck(Check):
+    """Check whose findings are independent per entity"""
+
+    def __init__(self):
+        self.items = []
+
+    def merge(self, other):
+        self.items.extend(other.items)
+
+    def findings(self):
+        return sorted(self.items, key=lambda item: item["iri"])
+
+
+@register_check
+class MissingEnglishLabel(_ListCheck):
+    name = "missing_en_label"
+    description = "Classes and annotation properties without an English rdfs:label"
+
+    def visit(self, model, entity):
+        if OWL_CLASS not in entity.types and OWL_ANNOTATION_PROPERTY not in entity.types:
+            return
+        if model.label(entity.iri, "en") is None:
+            entity_type = "AnnotationProperty" if OWL_ANNOTATION_PROPERTY in entity.types else "Class"
+            self.items.append({"iri": entity.iri, "type": entity_type})
+
+
+@register_check
+class MissingICFuri(_ListCheck):
+    name = "missing_icf_uri"
+    description = "Classes without hasICFuri (could be legit, not systematic errors)"
+    severity = "warning"
+
+    def visit(self, model, entity):
+        if OWL_CLASS not in entity.types:
+            return
+        if not entity.icf_uris and not model.icf_axioms(entity.iri):
+            self.items.append({"iri": entity.iri, "label": model.label(entity.iri, None)})
+
+
+@register_check
+class DanglingParent(_ListCheck):
+    name = "dangling_parent"
+    description = "rdfs:subClassOf parents that are not classes of the ontology"
+
+    def visit(self, model, entity):
+        for parent in entity.parents:
+            if parent == OWL_NS + "Thing":
+                continue
+            parent_entity = model.get(parent)
+            if parent_entity is None or OWL_CLASS not in parent_entity.types:
+                self.items.append({"iri": entity.iri, "parent": parent})
+
+
+class _SharedValueCheck(Check):
+    """Check collecting value -> IRIs, a finding for each value shared by several IRIs"""
+
+    def __init__(self):
+        self.values = defaultdict(set)
+
+    def merge(self, other):
+        for value, iris in other.values.items():
+            self.values[value].update(iris)
+
+    def findings(self):
+        return [
+            {**self.describe(value), "iris": sorted(iris)}
+            for value, iris in sorted(self.values.items())
+            if len(iris) > 1
+        ]
+
+    def describe(self, value):
+        return {"value": value}
+
+
+@register_check
+class SharedExactICFuri(_SharedValueCheck):
+    name = "shared_exact_icf_uri"
+    description = "hasICFuri with an exact mapping (E) shared by several classes"
+
+    def visit(self, model, entity):
+        for axiom in model.icf_axioms(entity.iri):
+            if axiom_value(axiom, ECO_0000218).startswith("E (Exact mapping"):
+                self.values[axiom.target].add(entity.iri)
+
+    def describe(self, value):
+        return {"icf_uri": value}
+
+
+@register_check
+class DuplicateOrphaNumber(_SharedValueCheck):
+    name = "duplicate_orpha_number"
+    description = "ORPHAnumber / Orphanet internal reference used in several equivalentClass restrictions"
+
+    def visit(self, model, entity):
+        if OWL_CLASS not in entity.types:
+            return
+        for prop, value in entity.restrictions:
+            if prop in (HAS_ORPHA_NUMBER, HAS_INTERNAL_REFERENCE):
+                self.values[(prop, value)].add(entity.iri)
+
+    def describe(self, value):
+        return {"property": value[0], "value": value[1]}
+
+
+def run_slice(owl_file, names, start, stop):
+    """Worker: visit entities[start:stop] once, feeding every check; returns the check states"""
+    model = load_ofco(owl_file)
+    checks = [CHECKS[name]() for name in names]
+    for entity in list(model.entities.values())[start:stop]:
+        for check in checks:
+            check.visit(model, entity)
+    return checks
+
+
+def run_checks(owl_file, names, jobs=1):
+    """Run the checks in one pass over the ontology (split across jobs processes if jobs > 1)"""
+    if jobs <= 1:
+        return run_slice(owl_file, names, 0, None)
+
+    total = len(load_ofco(owl_file))
+    size = -(-total // jobs)
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = [pool.submit(run_slice, owl_file, names, start, start + size)
+                   for start in range(0, total, size)]
+        partials = [future.result() for future in futures]
+    checks = partials[0]
+    for partial in partials[1:]:
+        for check, other in zip(checks, partial):
+            check.merge(other)
+    return checks
+
+
+def build_report(owl_file, checks):
+    report = {
+        "ontology": owl_file,
+        "owl_sha256": owl_sha256(owl_file),
+        "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "checks": {},
+    }
+    for check in checks:
+        findings = check.findings()
+        report["checks"][check.name] = {
+            "description": check.description,
+            "severity": check.severity,
+            "count": len(findings),
+            "findings": findings,
+        }
+    report["errors"] = sum(c["count"] for c in report["checks"].values() if c["severity"] == "error")
+    report["warnings"] = sum(c["count"] for c in report["checks"].values() if c["severity"] == "warning")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate OFCO_thesaurus.owl in a single pass")
+    parser.add_argument("--owl", default=OWL_FILE, help=f"ontology file (default: {OWL_FILE})")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"JSON report (default: {OUTPUT_FILE})")
+    parser.add_argument("--checks", help="comma separated list of checks (default: all)")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument("--list", action="store_true", help="list the available checks")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, cls in CHECKS.items():
+            print(f"{name:<24} [{cls.severity}] {cls.description}")
+        return 0
+
+    names = args.checks.split(",") if args.checks else list(CHECKS)
+    unknown = [name for name in names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+
+    try:
+        checks = run_checks(args.owl, names, args.jobs)
+    except FileNotFoundError:
+        print(f"Error: File '{args.owl}' not found.")
+        return 2
+
+    report = build_report(args.owl, checks)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print("=" * 80)
+    print(f"OFCO VALIDATION: {args.owl}")
+    print("=" * 80)
+    for name, result in report["checks"].items():
+        mark = "✓" if result["count"] == 0 else ("✗" if result["severity"] == "error" else "!")
+        print(f"{mark} {name:<24} {result['count']:>5}  {result['description']}")
+    print("=" * 80)
+    print(f"Errors: {report['errors']}  Warnings: {report['warnings']}")
+    print(f"✓ Results written to: {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+# Referential-integrity verifier of the parser output (Diseases_annotated_with_OFCO.owl)
+# Marc Hanauer @Orphanet 2025
+# Run after disaxml_ofco_parser.py (or with its --verify option) to catch output template slips
+# before a GraphDB import rejects them. The RDF/XML file is streamed with iterparse, each disorder
+# owl:Class is checked then released, so memory is bounded by one disorder (plus one int per
+# OrphaCode for the duplicate check). Checks :
+#   - the document is well-formed XML
+#   - every owl:Class is an Orphanet disorder IRI, listed once, with the two orpha.net links of its OrphaCode
+#   - every property is an OFCO annotation property, single-valued ones appear once
+#   - every concernsDisability / hasDisabilityCategory / hasReasonForNotApplicable / hasFrequency /
+#     hasTemporality / hasSeverity rdf:resource is a class of OFCO_thesaurus.owl (hashed set of IRIs)
+#   - every hasDisabilityAnnotation is a complete DisabilityDisorderAssociation (parseType Resource,
+#     rdf:type, concernsDisability), boolean literals are true / false with the full xsd:boolean
+#     datatype IRI (a prefixed rdf:datatype="xsd:boolean" is not expanded by RDF parsers)
+#   - no two associations of a disorder concern the same disability
+# Output : JSON report (OFCO_output_verification.json, at most --max-findings examples per check),
+# exit code 1 when a check of severity "error" has findings
+#
+# Usage : python ofco_verify_output.py [Diseases_annotated_with_OFCO.owl] [--owl OFCO_thesaurus.owl]
+#                                      [--output OFCO_output_verification.json] [--max-findings 100]
+
+import re
+import sys
+import json
+import time
+import argparse
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from ofco_loader import load_ofco, OFCO_NS, RDF_NS, OWL_NS
+
+OWL_FILE = "OFCO_thesaurus.owl"
+ANNOTATIONS_FILE = "Diseases_annotated_with_OFCO.owl"
+OUTPUT_FILE = "OFCO_output_verification.json"
+MAX_FINDINGS = 100
+
+ORPHANET_PATTERN = re.compile(r"^http://www\.orpha\.net/ORDO/Orphanet_(\d+)$")
+DISEASE_LINK = "https://www.orpha.net/en/disease/detail/{}"
+DISABILITY_LINK = "https://www.orpha.net/en/disease/disability/detail/{}"
+ASSOCIATION_CLASS = OFCO_NS + "DisabilityDisorderAssociation"
+# RDF/XML does not expand prefixes in attribute values: rdf:datatype="xsd:boolean" is the IRI "xsd:boolean"
+XSD_BOOLEAN = "http://www.w3.org/2001/XMLSchema#boolean"
+
+_RDF_ROOT = "{%s}RDF" % RDF_NS
+_OWL_CLASS_TAG = "{%s}Class" % OWL_NS
+_ABOUT = "{%s}about" % RDF_NS
+_RESOURCE = "{%s}resource" % RDF_NS
+_DATATYPE = "{%s}datatype" % RDF_NS
+_PARSE_TYPE = "{%s}parseType" % RDF_NS
+_TYPE = "{%s}type" % RDF_NS
+_ANNOTATION = "{%s}hasDisabilityAnnotation" % OFCO_NS
+_DISABILITY = "{%s}concernsDisability" % OFCO_NS
+
+
+def _ofco(name):
+    return "{%s}%s" % (OFCO_NS, name)
+
+
+# properties whose rdf:resource must be an OFCO class
+DISORDER_REFERENCES = {_ofco("hasDisabilityCategory"), _ofco("hasReasonForNotApplicable")}
+ASSOCIATION_REFERENCES = {_DISABILITY, _ofco("hasFrequency"), _ofco("hasTemporality"), _ofco("hasSeverity")}
+# xsd:boolean literal properties
+BOOLEAN_PROPERTIES = {_ofco("hasSpecificManagement"), _ofco("lossOfAbility")}
+# properties written at most once per disorder / association
+DISORDER_SINGLE = {_ofco("hasOrphanetDiseaseLink"), _ofco("hasOrphanetDisabilityLink"),
+                   _ofco("hasSpecificManagement")} | DISORDER_REFERENCES
+ASSOCIATION_SINGLE = {_TYPE, _ofco("lossOfAbility")} | ASSOCIATION_REFERENCES
+
+# name -> (severity, description)
+CHECKS = {
+    "well_formed": ("error", "The document is well-formed XML"),
+    "unexpected_element": ("error", "Top-level elements other than owl:Class"),
+    "disorder_iri": ("error", "owl:Class without an Orphanet disorder IRI (http://www.orpha.net/ORDO/Orphanet_N)"),
+    "duplicate_disorder": ("error", "Disorders written more than once"),
+    "orphanet_link": ("error", "hasOrphanetDiseaseLink / hasOrphanetDisabilityLink missing or not the links of the OrphaCode"),
+    "unknown_property": ("error", "Properties that are not OFCO annotation properties"),
+    "repeated_property": ("error", "Single-valued properties given more than once"),
+    "unresolved_reference": ("error", "rdf:resource that is not a class of OFCO_thesaurus.owl"),
+    "incomplete_association": ("error", "hasDisabilityAnnotation without parseType Resource, rdf:type DisabilityDisorderAssociation or concernsDisability"),
+    "invalid_literal": ("error", "xsd:boolean properties with a datatype other than http://www.w3.org/2001/XMLSchema#boolean or a value other than true / false"),
+    "duplicate_association": ("error", "Associations of a disorder concerning the same disability"),
+}
+
+
+def _short(tag):
+    """'{https://w3id.org/ofco/}hasSeverity' -> 'ofco:hasSeverity'"""
+    for prefix, namespace in (("ofco", OFCO_NS), ("rdf", RDF_NS), ("owl", OWL_NS)):
+        if tag.startswith("{" + namespace + "}"):
+            return f"{prefix}:{tag[len(namespace) + 2:]}"
+    return tag
+
+
+class OutputVerifier:
+    """
+    Streaming checks of the parser output against the OFCO class and annotation property IRIs.
+    Each check keeps an exact count and at most max_findings examples.
+    """
+
+    def __init__(self, classes, properties, max_findings=MAX_FINDINGS):
+        self.classes = frozenset(classes)
+        self.properties = frozenset(_ofco(iri[len(OFCO_NS):]) for iri in properties if iri.startswith(OFCO_NS))
+        self.max_findings = max_findings
+        self.counts = dict.fromkeys(CHECKS, 0)
+        self.findings = {name: [] for name in CHECKS}
+        self.disorder_codes = set()
+        self.disorders = 0
+        self.associations = 0
+
+    def finding(self, check, subject, detail):
+        self.counts[check] += 1
+        if len(self.findings[check]) < self.max_findings:
+            self.findings[check].append({"subject": subject, "detail": detail})
+
+    def verify(self, path):
+        """Stream the file; top-level elements are checked and released as soon as they end"""
+        depth = 0
+        root = None
+        try:
+            for event, element in ET.iterparse(path, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = element
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth != 1:
+                    continue
+                if element.tag == _OWL_CLASS_TAG:
+                    self.verify_disorder(element)
+                else:
+                    self.finding("unexpected_element", _short(element.tag), "not an owl:Class")
+                root.clear()
+        except ET.ParseError as e:
+            self.finding("well_formed", path, str(e))
+        else:
+            if root is not None and root.tag != _RDF_ROOT:
+                self.finding("unexpected_element", _short(root.tag), "the document element is not rdf:RDF")
+        return self
+
+    def verify_disorder(self, element):
+        self.disorders += 1
+        subject = element.get(_ABOUT) or f"owl:Class #{self.disorders}"
+        match = ORPHANET_PATTERN.match(element.get(_ABOUT) or "")
+        code = match.group(1) if match else None
+        if code is None:
+            self.finding("disorder_iri", subject, "rdf:about is not an Orphanet disorder IRI")
+        elif int(code) in self.disorder_codes:
+            self.finding("duplicate_disorder", subject, "owl:Class written more than once")
+        else:
+            self.disorder_codes.add(int(code))
+
+        seen = set()
+        disabilities = set()
+        links = {}
+        for prop in element:
+            tag = prop.tag
+            if tag == _ANNOTATION:
+                self.verify_association(subject, prop, disabilities)
+                continue
+            if tag not in self.properties:
+                self.finding("unknown_property", subject, _short(tag))
+                continue
+            if tag in DISORDER_SINGLE:
+                if tag in seen:
+                    self.finding("repeated_property", subject, _short(tag))
+                seen.add(tag)
+            if tag in DISORDER_REFERENCES:
+                self.verify_reference(subject, prop)
+            elif tag in BOOLEAN_PROPERTIES:
+                self.verify_boolean(subject, prop)
+            else:
+                links[tag] = prop.get(_RESOURCE)
+
+        if code is not None:
+            for name, template in (("hasOrphanetDiseaseLink", DISEASE_LINK), ("hasOrphanetDisabilityLink", DISABILITY_LINK)):
+                link = links.get(_ofco(name))
+                if link != template.format(code):
+                    self.finding("orphanet_link", subject, f"ofco:{name} {link or 'missing'}")
+
+    def verify_association(self, subject, annotation, disabilities):
+        self.associations += 1
+        if annotation.get(_PARSE_TYPE) != "Resource":
+            self.finding("incomplete_association", subject, 'hasDisabilityAnnotation without rdf:parseType="Resource"')
+        seen = set()
+        types = []
+        disability = None
+        for prop in annotation:
+            tag = prop.tag
+            if tag != _TYPE and tag not in self.properties:
+                self.finding("unknown_property", subject, _short(tag))
+                continue
+            if tag in ASSOCIATION_SINGLE:
+                if tag in seen:
+                    self.finding("repeated_property", subject, f"{_short(tag)} in an association")
+                seen.add(tag)
+            if tag == _TYPE:
+                types.append(prop.get(_RESOURCE))
+            elif tag in ASSOCIATION_REFERENCES:
+                iri = self.verify_reference(subject, prop)
+                if tag == _DISABILITY:
+                    disability = iri
+            elif tag in BOOLEAN_PROPERTIES:
+                self.verify_boolean(subject, prop)
+            else:
+                self.finding("unknown_property", subject, f"{_short(tag)} in an association")
+
+        if ASSOCIATION_CLASS not in types:
+            self.finding("incomplete_association", subject, "no rdf:type ofco:DisabilityDisorderAssociation")
+        if _DISABILITY not in seen:
+            self.finding("incomplete_association", subject, "no ofco:concernsDisability")
+        elif disability is not None:
+            if disability in disabilities:
+                self.finding("duplicate_association", subject, disability)
+            disabilities.add(disability)
+
+    def verify_reference(self, subject, prop):
+        """rdf:resource of prop if it is an OFCO class, None otherwise (finding reported)"""
+        iri = prop.get(_RESOURCE)
+        if iri in self.classes:
+            return iri
+        self.finding("unresolved_reference", subject, f"{_short(prop.tag)} {iri or '(no rdf:resource)'}")
+        return None
+
+    def verify_boolean(self, subject, prop):
+        value = (prop.text or "").strip()
+        if prop.get(_DATATYPE) != XSD_BOOLEAN or value not in ("true", "false"):
+            self.finding("invalid_literal", subject, f"{_short(prop.tag)} {value!r} ({prop.get(_DATATYPE)})")
+
+    def report(self, path, owl_file):
+        report = {
+            "annotations": path,
+            "ontology": owl_file,
+            "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "disorders": self.disorders,
+            "associations": self.associations,
+            "checks": {},
+        }
+        for name, (severity, description) in CHECKS.items():
+            report["checks"][name] = {
+                "description": description,
+                "severity": severity,
+                "count": self.counts[name],
+                "findings": self.findings[name],
+            }
+        report["errors"] = sum(c["count"] for c in report["checks"].values() if c["severity"] == "error")
+        report["warnings"] = sum(c["count"] for c in report["checks"].values() if c["severity"] == "warning")
+        return report
+
+
+def verify_output(path, model, owl_file=OWL_FILE, max_findings=MAX_FINDINGS):
+    """Verify a parser output against a loaded OFCOModel, returns the report dict"""
+    verifier = OutputVerifier(model.classes, model.annotation_properties, max_findings)
+    return verifier.verify(path).report(path, owl_file)
+
+
+def print_report(report):
+    for name, result in report["checks"].items():
+        mark = "✓" if result["count"] == 0 else ("✗" if result["severity"] == "error" else "!")
+        print(f"{mark} {name:<24} {result['count']:>7}  {result['description']}")
+        for finding in result["findings"][:3]:
+            print(f"      {finding['subject']}: {finding['detail']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the referential integrity of Diseases_annotated_with_OFCO.owl")
+    parser.add_argument("annotations", nargs="?", default=ANNOTATIONS_FILE, help=f"parser output (default: {ANNOTATIONS_FILE})")
+    parser.add_argument("--owl", default=OWL_FILE, help=f"ontology file (default: {OWL_FILE})")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"JSON report (default: {OUTPUT_FILE})")
+    parser.add_argument("--max-findings", type=int, default=MAX_FINDINGS, help="examples kept per check (counts are exact)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        report = verify_output(args.annotations, load_ofco(args.owl), args.owl, args.max_findings)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    seconds = time.perf_counter() - start
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print("=" * 80)
+    print(f"OUTPUT VERIFICATION: {args.annotations} ({report['disorders']} disorders, "
+          f"{report['associations']} associations, {seconds:.2f} s)")
+    print("=" * 80)
+    print_report(report)
+    print("=" * 80)
+    print(f"Errors: {report['errors']}  Warnings: {report['warnings']}")
+    print(f"✓ Results written to: {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+# ORDO subset cache: the ORDO classes referenced by the disorder annotations, without loading ORDO
+# Marc Hanauer @Orphanet 2025
+# disaxml_ofco_parser.py only emits http://www.orpha.net/ORDO/Orphanet_{OrphaCode} IRIs. This stage
+# streams the ORDO release (iterparse, elements released as they are read) and keeps, for the
+# disorders of Diseases_annotated_with_OFCO.owl only: labels, synonyms (efo:alternative_term),
+# direct parents (with their label) and obsolete status. The subset is cached in a small indexed
+# SQLite file keyed by the ORDO version (owl:versionInfo, read from the ontology header without a
+# full parse): ORDO is parsed again only for a new release or when new disorders appear.
+# The subset is joined into the local query layer (ofco_query.py --ordo) and can be exported as
+# N-Triples to load next to the parser output instead of the full ORDO.
+#
+# Usage : python ordo_subset.py ORDO_en_4.7.owl [--annotations Diseases_annotated_with_OFCO.owl]
+#                               [--cache ordo_subset.sqlite] [--export-nt Diseases_ORDO_labels.nt] [166 ...]
+
+import os
+import re
+import sys
+import mmap
+import sqlite3
+import argparse
+import xml.etree.ElementTree as ET
+
+ANNOTATIONS_FILE = "Diseases_annotated_with_OFCO.owl"
+CACHE_FILE = "ordo_subset.sqlite"
+EXPORT_FILE = "Diseases_ORDO_labels.nt"
+SCHEMA_VERSION = "1"
+
+ORDO_NS = "http://www.orpha.net/ORDO/"
+ORDO_PREFIX = ORDO_NS + "Orphanet_"
+# ORDO "obsolete entity" class
+OBSOLETE_CLASS = ORDO_NS + "Orphanet_C041"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+EFO_ALTERNATIVE_TERM = "http://www.ebi.ac.uk/efo/alternative_term"
+
+_RDF = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}"
+_OWL = "{http://www.w3.org/2002/07/owl#}"
+_RDFS = "{http://www.w3.org/2000/01/rdf-schema#}"
+_ABOUT = _RDF + "about"
+_RESOURCE = _RDF + "resource"
+_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+_CLASS = _OWL + "Class"
+_ONTOLOGY = _OWL + "Ontology"
+_LABEL = _RDFS + "label"
+_SUBCLASS_OF = _RDFS + "subClassOf"
+_DEPRECATED = _OWL + "deprecated"
+_ALTERNATIVE_TERM = "{http://www.ebi.ac.uk/efo/}alternative_term"
+
+ORPHA_IRI_PATTERN = re.compile(rb"http://www\.orpha\.net/ORDO/Orphanet_(\d+)")
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE requested (orpha_code INTEGER PRIMARY KEY);
+CREATE TABLE diseases (orpha_code INTEGER PRIMARY KEY, label TEXT, obsolete INTEGER NOT NULL);
+CREATE TABLE labels (orpha_code INTEGER NOT NULL, label TEXT NOT NULL, lang TEXT);
+CREATE TABLE synonyms (orpha_code INTEGER NOT NULL, synonym TEXT NOT NULL, lang TEXT);
+CREATE TABLE parents (orpha_code INTEGER NOT NULL, parent TEXT NOT NULL, parent_label TEXT);
+CREATE INDEX labels_code ON labels (orpha_code);
+CREATE INDEX synonyms_code ON synonyms (orpha_code);
+CREATE INDEX parents_code ON parents (orpha_code);
+CREATE INDEX parents_parent ON parents (parent);
+CREATE INDEX diseases_label ON diseases (label COLLATE NOCASE);
+"""
+
+
+def orpha_code(value):
+    """166, '166', 'ORPHA:166', 'Orphanet_166' or the ORDO IRI -> 166"""
+    return int(str(value).rsplit("_", 1)[-1].rsplit(":", 1)[-1])
+
+
+def referenced_codes(annotations_file=ANNOTATIONS_FILE):
+    """OrphaCodes of the ORDO IRIs of the parser output (RDF/XML or N-Triples), regex scan only"""
+    with open(annotations_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return set()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return {int(m.group(1)) for m in ORPHA_IRI_PATTERN.finditer(data)}
+
+
+def ordo_version(ordo_file):
+    """owl:versionInfo (or owl:versionIRI) of the ORDO ontology header, parsing stops right after it"""
+    for event, element in ET.iterparse(ordo_file, events=("end",)):
+        if element.tag == _ONTOLOGY:
+            version = element.findtext(_OWL + "versionInfo")
+            if not version:
+                version_iri = element.find(_OWL + "versionIRI")
+                version = version_iri.get(_RESOURCE) if version_iri is not None else None
+            return version.strip() if version else None
+        if element.tag == _CLASS:
+            break
+    return None
+
+
+def _top_level_elements(ordo_file):
+    """Stream the children of rdf:RDF, each one released once the caller is done with it"""
+    depth = 0
+    root = None
+    for event, element in ET.iterparse(ordo_file, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield element
+            root.remove(element)
+
+
+def extract_subset(ordo_file, codes):
+    """
+    Stream ORDO and keep the classes of codes: {OrphaCode: {'labels', 'synonyms', 'parents',
+    'obsolete'}} (labels / synonyms: (text, lang), parents: (IRI, English label or None))
+    """
+    wanted = {ORDO_PREFIX + str(code): code for code in codes}
+    subset = {}
+    class_labels = {}
+    for element in _top_level_elements(ordo_file):
+        if element.tag != _CLASS:
+            continue
+        iri = element.get(_ABOUT)
+        label = next((child.text for child in element.iterfind(_LABEL)
+                      if child.text and (child.get(_LANG) or "en").startswith("en")), None)
+        if label:
+            class_labels[iri] = label.strip()
+        if iri not in wanted:
+            continue
+        parents = [child.get(_RESOURCE) for child in element.iterfind(_SUBCLASS_OF) if child.get(_RESOURCE)]
+        deprecated = (element.findtext(_DEPRECATED) or "").strip().lower() == "true"
+        subset[wanted[iri]] = {
+            "labels": [(child.text.strip(), child.get(_LANG)) for child in element.iterfind(_LABEL) if child.text],
+            "synonyms": [(child.text.strip(), child.get(_LANG))
+                         for child in element.iterfind(_ALTERNATIVE_TERM) if child.text],
+            "parents": parents,
+            "obsolete": deprecated or OBSOLETE_CLASS in parents or (label or "").startswith("OBSOLETE:"),
+        }
+    for entry in subset.values():
+        entry["parents"] = [(parent, class_labels.get(parent)) for parent in entry["parents"]]
+    return subset
+
+
+def write_cache(cache_file, version, requested, subset):
+    """Write the subset as an indexed SQLite file (atomic replace)"""
+    tmp_file = cache_file + ".tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    conn = sqlite3.connect(tmp_file)
+    try:
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                             [("schema_version", SCHEMA_VERSION), ("ordo_version", version)])
+            conn.executemany("INSERT INTO requested VALUES (?)", ((code,) for code in sorted(requested)))
+            for code, entry in sorted(subset.items()):
+                english = next((text for text, lang in entry["labels"] if (lang or "en").startswith("en")), None)
+                conn.execute("INSERT INTO diseases VALUES (?, ?, ?)", (code, english, int(entry["obsolete"])))
+                conn.executemany("INSERT INTO labels VALUES (?, ?, ?)",
+                                 ((code, text, lang) for text, lang in entry["labels"]))
+                conn.executemany("INSERT INTO synonyms VALUES (?, ?, ?)",
+                                 ((code, text, lang) for text, lang in entry["synonyms"]))
+                conn.executemany("INSERT INTO parents VALUES (?, ?, ?)",
+                                 ((code, parent, label) for parent, label in entry["parents"]))
+        conn.close()
+        os.replace(tmp_file, cache_file)
+    finally:
+        conn.close()
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def _cache_state(cache_file):
+    """(ordo_version, requested OrphaCodes) of a cache file, (None, set()) if missing or unreadable"""
+    if not os.path.exists(cache_file):
+        return None, set()
+    try:
+        conn = sqlite3.connect(f"file:{cache_file}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            requested = {code for code, in conn.execute("SELECT orpha_code FROM requested")}
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        return None, set()
+    if meta.get("schema_version") != SCHEMA_VERSION:
+        return None, set()
+    return meta.get("ordo_version"), requested
+
+
+class OrdoSubset:
+    """Read-only view of a subset cache"""
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.conn = sqlite3.connect(f"file:{cache_file}?mode=ro", uri=True)
+        self.version = dict(self.conn.execute("SELECT key, value FROM meta")).get("ordo_version")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM diseases").fetchone()[0]
+
+    def label(self, disorder):
+        """English label of a disorder (OrphaCode or ORDO IRI), None if not in the subset"""
+        row = self.conn.execute("SELECT label FROM diseases WHERE orpha_code = ?", (orpha_code(disorder),)).fetchone()
+        return row[0] if row else None
+
+    def labels(self):
+        """{ORDO IRI: English label} of the whole subset, for joins"""
+        return {ORDO_PREFIX + str(code): label
+                for code, label in self.conn.execute("SELECT orpha_code, label FROM diseases")}
+
+    def get(self, disorder):
+        """{'iri', 'label', 'obsolete', 'labels', 'synonyms', 'parents'} of a disorder, None if absent"""
+        code = orpha_code(disorder)
+        row = self.conn.execute("SELECT label, obsolete FROM diseases WHERE orpha_code = ?", (code,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "iri": ORDO_PREFIX + str(code),
+            "label": row[0],
+            "obsolete": bool(row[1]),
+            "labels": self.conn.execute("SELECT label, lang FROM labels WHERE orpha_code = ?", (code,)).fetchall(),
+            "synonyms": self.conn.execute("SELECT synonym, lang FROM synonyms WHERE orpha_code = ?", (code,)).fetchall(),
+            "parents": self.conn.execute("SELECT parent, parent_label FROM parents WHERE orpha_code = ?", (code,)).fetchall(),
+        }
+
+    def export_ntriples(self, path=EXPORT_FILE):
+        """rdfs:label / efo:alternative_term / rdfs:subClassOf / owl:deprecated triples of the subset"""
+        def literal(text, lang):
+            escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+            return f'"{escaped}"@{lang}' if lang else f'"{escaped}"'
+
+        count = 0
+        with open(path, "w", encoding="utf-8") as out:
+            for table, predicate in (("labels", RDFS_LABEL), ("synonyms", EFO_ALTERNATIVE_TERM)):
+                for code, text, lang in self.conn.execute(f"SELECT * FROM {table} ORDER BY orpha_code, rowid"):
+                    out.write(f"<{ORDO_PREFIX}{code}> <{predicate}> {literal(text, lang)} .\n")
+                    count += 1
+            for code, parent, label in self.conn.execute("SELECT * FROM parents ORDER BY orpha_code, rowid"):
+                out.write(f"<{ORDO_PREFIX}{code}> <http://www.w3.org/2000/01/rdf-schema#subClassOf> <{parent}> .\n")
+                count += 1
+            for code, in self.conn.execute("SELECT orpha_code FROM diseases WHERE obsolete = 1 ORDER BY orpha_code"):
+                out.write(f"<{ORDO_PREFIX}{code}> <http://www.w3.org/2002/07/owl#deprecated> "
+                          '"true"^^<http://www.w3.org/2001/XMLSchema#boolean> .\n')
+                count += 1
+        return count
+
+
+def open_subset(ordo_file, annotations_file=ANNOTATIONS_FILE, cache_file=CACHE_FILE):
+    """
+    OrdoSubset covering the disorders of annotations_file. The cache is reused when it was built
+    from the same ORDO version and already covers these disorders, otherwise ORDO is streamed again.
+    Returns (subset, rebuilt)
+    """
+    codes = referenced_codes(annotations_file)
+    version = ordo_version(ordo_file)
+    cached_version, requested = _cache_state(cache_file)
+    rebuilt = cached_version is None or cached_version != version or not codes <= requested
+    if rebuilt:
+        if cached_version == version:
+            # same release: keep covering the disorders requested before
+            codes |= requested
+        write_cache(cache_file, version, codes, extract_subset(ordo_file, codes))
+    return OrdoSubset(cache_file), rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache the ORDO classes referenced by the disorder annotations")
+    parser.add_argument("ordo", help="ORDO release (RDF/XML), e.g. ORDO_en_4.7.owl")
+    parser.add_argument("codes", nargs="*", help="OrphaCodes to show")
+    parser.add_argument("--annotations", default=ANNOTATIONS_FILE)
+    parser.add_argument("--cache", default=CACHE_FILE)
+    parser.add_argument("--export-nt", nargs="?", const=EXPORT_FILE, metavar="PATH",
+                        help=f"write the subset as N-Triples (default: {EXPORT_FILE})")
+    args = parser.parse_args()
+
+    try:
+        subset, rebuilt = open_subset(args.ordo, args.annotations, args.cache)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+    with subset:
+        print(f"ORDO {subset.version}: {len(subset)} disorders in {args.cache}"
+              + (" (rebuilt)" if rebuilt else " (cached)"))
+        if args.export_nt:
+            print(f"{subset.export_ntriples(args.export_nt)} triples written to {args.export_nt}")
+        status = 0
+        for code in args.codes:
+            entry = subset.get(code)
+            if entry is None:
+                print(f"{code}: not in the subset")
+                status = 1
+                continue
+            print(f"{entry['iri']}\t{entry['label']}" + ("\t[obsolete]" if entry["obsolete"] else ""))
+            for synonym, lang in entry["synonyms"]:
+                print(f"\tsynonym\t{synonym}")
+            for parent, label in entry["parents"]:
+                print(f"\tparent\t{parent}\t{label or ''}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
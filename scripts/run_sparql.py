@@ -0,0 +1,166 @@
+# Batch runner for the SPARQL queries of sparql/ (no GraphDB needed)
+# Marc Hanauer @Orphanet 2025
+# pip install rdflib
+# OFCO_thesaurus.owl, Diseases_annotated_with_OFCO.owl and optionally ORDO are loaded once into
+# an in-memory rdflib graph, then the query files are run (with --jobs N across N forked processes
+# sharing the loaded graph). Results are written as CSV or JSON (SPARQL 1.1 results format).
+# Results are cached in .sparql_cache/, keyed by the SHA-256 of the query text and of the input
+# files: when every query is cached the graph is not even loaded.
+#
+# Usage : python run_sparql.py [query.sparql ...] [--ofco OFCO_thesaurus.owl]
+#                              [--annotations Diseases_annotated_with_OFCO.owl] [--ordo ORDO_en_4.7.owl]
+#                              [--output-dir sparql_results] [--format csv|json] [--jobs N] [--no-cache]
+
+import io
+import os
+import json
+import sys
+import glob
+import time
+import hashlib
+import argparse
+import multiprocessing
+
+from ofco_snapshot import owl_sha256
+
+SPARQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sparql")
+OFCO_FILE = "OFCO_thesaurus.owl"
+ANNOTATIONS_FILE = "Diseases_annotated_with_OFCO.owl"
+OUTPUT_DIR = "sparql_results"
+CACHE_DIR = ".sparql_cache"
+
+# Graph shared with the forked workers (set before the pool is created)
+_graph = None
+
+
+def cache_key(query_text, input_hashes):
+    digest = hashlib.sha256(query_text.encode("utf-8"))
+    for file_hash in input_hashes:
+        digest.update(file_hash.encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_graph(files):
+    """One rdflib graph with all the input files, returns (graph, load time in seconds)"""
+    from rdflib import Graph
+    start = time.perf_counter()
+    graph = Graph()
+    for path in files:
+        graph.parse(path, format="nt" if path.endswith(".nt") else "xml")
+    return graph, time.perf_counter() - start
+
+
+def run_query(query_text):
+    """Worker: run one query on the shared graph, returns (SPARQL JSON results, rows, seconds)"""
+    start = time.perf_counter()
+    result = _graph.query(query_text)
+    if result.type not in ("SELECT", "ASK"):
+        raise ValueError(f"{result.type} queries are not supported (SELECT / ASK only)")
+    rows = len(result) if result.type == "SELECT" else 1
+    data = result.serialize(format="json")
+    return data, rows, time.perf_counter() - start
+
+
+def write_result(data, path, output_format):
+    """Write cached SPARQL JSON results as JSON or CSV"""
+    if output_format == "csv":
+        from rdflib.query import Result
+        data = Result.parse(io.BytesIO(data), format="json").serialize(format="csv")
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _outcome(func, *args):
+    """Result of func(*args), or the exception it raised"""
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+
+def _count_rows(data):
+    content = json.loads(data)
+    return len(content["results"]["bindings"]) if "results" in content else 1
+
+
+def main():
+    global _graph
+    parser = argparse.ArgumentParser(description="Run the sparql/*.sparql queries on a local in-memory graph")
+    parser.add_argument("queries", nargs="*", help=f"query files (default: all the .sparql files of {SPARQL_DIR})")
+    parser.add_argument("--ofco", default=OFCO_FILE)
+    parser.add_argument("--annotations", default=ANNOTATIONS_FILE)
+    parser.add_argument("--ordo", help="ORDO OWL file or its subset exported by ordo_subset.py --export-nt (optional)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--jobs", type=int, default=1, help="parallel queries (forked processes)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not write cached results")
+    args = parser.parse_args()
+
+    query_files = args.queries or sorted(glob.glob(os.path.join(SPARQL_DIR, "*.sparql")))
+    input_files = [args.ofco, args.annotations] + ([args.ordo] if args.ordo else [])
+    try:
+        input_hashes = [owl_sha256(path) for path in input_files]
+        queries = {}
+        for path in query_files:
+            with open(path, encoding="utf-8") as f:
+                queries[path] = f.read()
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if not args.no_cache:
+        os.makedirs(args.cache_dir, exist_ok=True)
+
+    results, pending = {}, []
+    for path, text in queries.items():
+        cached = os.path.join(args.cache_dir, cache_key(text, input_hashes) + ".json")
+        if not args.no_cache and os.path.exists(cached):
+            with open(cached, "rb") as f:
+                results[path] = (f.read(), None, 0.0, True)
+        else:
+            pending.append(path)
+
+    load_time = 0.0
+    failed = 0
+    if pending:
+        print(f"Loading {', '.join(input_files)}...")
+        _graph, load_time = load_graph(input_files)
+        print(f"{len(_graph)} triples loaded in {load_time:.2f} s")
+        texts = [queries[path] for path in pending]
+        if args.jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(min(args.jobs, len(pending))) as pool:
+                outcomes = [pool.apply_async(run_query, (text,)) for text in texts]
+                outcomes = [_outcome(outcome.get) for outcome in outcomes]
+        else:
+            outcomes = [_outcome(run_query, text) for text in texts]
+        for path, outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"✗ {os.path.basename(path)}: {outcome}")
+                failed += 1
+                continue
+            data, rows, seconds = outcome
+            results[path] = (data, rows, seconds, False)
+            if not args.no_cache:
+                with open(os.path.join(args.cache_dir, cache_key(queries[path], input_hashes) + ".json"), "wb") as f:
+                    f.write(data)
+
+    print(f"{'query':<56}{'rows':>7}{'time':>12}")
+    for path in query_files:
+        if path not in results:
+            continue
+        data, rows, seconds, cached = results[path]
+        name = os.path.splitext(os.path.basename(path))[0]
+        output = os.path.join(args.output_dir, f"{name}.{args.format}")
+        write_result(data, output, args.format)
+        if rows is None:
+            rows = _count_rows(data)
+        timing = "cached" if cached else f"{seconds * 1000:.1f} ms"
+        print(f"{os.path.basename(path):<56}{rows:>7}{timing:>12}")
+    print(f"Graph load: {load_time:.2f} s  Results in: {args.output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())